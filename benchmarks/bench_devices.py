@@ -0,0 +1,40 @@
+"""
+Benchmarks how the sample rate scales with the number of devices, each polled by its own acquisition loop over
+its own emulated 9600 baud serial link.
+
+Run from the repository root with `python -m benchmarks.bench_devices`
+"""
+
+import logging
+import time
+
+from ps_controller.acquisition.AcquisitionLoop import AcquisitionLoop
+from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.logging.CustomLogger import CustomLogger
+
+DEVICE_COUNTS = (1, 4, 8, 16)
+RUN_SECONDS = 3.0
+
+
+def run():
+    logger = CustomLogger(logging.ERROR)
+    print("Polling as fast as possible for {0} s per run".format(RUN_SECONDS))
+    single_device_rate = None
+    for device_count in DEVICE_COUNTS:
+        devices = DeviceFactory().get_devices("simulated", logger, simulated_count=device_count)
+        loops = [AcquisitionLoop(device, logger, interval=0.0) for device in devices.values()]
+        for device in devices.values():
+            device.connect()
+        for loop in loops:
+            loop.start()
+        time.sleep(RUN_SECONDS)
+        for loop in loops:
+            loop.stop()
+        rate = sum(loop.sample_count() for loop in loops) / RUN_SECONDS
+        single_device_rate = single_device_rate or rate
+        print("{0:>3} devices {1:8.1f} samples/s  {2:6.1f} per device  speedup {3:5.2f}".format(
+            device_count, rate, rate / device_count, rate / single_device_rate))
+
+
+if __name__ == "__main__":
+    run()
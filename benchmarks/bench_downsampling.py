@@ -0,0 +1,43 @@
+"""
+Benchmarks the history downsampling functions on 1M sample inputs.
+
+Run from the repository root with `python -m benchmarks.bench_downsampling`
+"""
+
+import timeit
+
+import numpy
+
+from ps_controller.utilities import Downsampling
+
+NUMBER_OF_SAMPLES = 1000000
+MAX_POINTS = (500, 2000, 10000)
+REPEAT = 5
+
+
+def _create_samples(number_of_samples):
+    """Creates 20 Hz timestamps and a noisy, stepped voltage signal
+
+    :param number_of_samples: Number of samples to create
+    :type number_of_samples: int
+    :return: tuple(numpy.ndarray, numpy.ndarray) -- (timestamps, values)
+    """
+    random = numpy.random.RandomState(0)
+    timestamps = numpy.arange(number_of_samples) * 0.05
+    values = numpy.repeat(random.randint(0, 20000, number_of_samples // 1000 + 1), 1000)[:number_of_samples]
+    values = values + random.normal(0, 25, number_of_samples)
+    return timestamps, values
+
+
+def run():
+    timestamps, values = _create_samples(NUMBER_OF_SAMPLES)
+    print("Downsampling {0} samples, best of {1}".format(NUMBER_OF_SAMPLES, REPEAT))
+    for method in (Downsampling.MIN_MAX, Downsampling.LTTB):
+        for max_points in MAX_POINTS:
+            best = min(timeit.repeat(lambda: Downsampling.downsample(timestamps, values, max_points, method),
+                                     number=1, repeat=REPEAT))
+            print("{0:>8} max_points={1:<6} {2:8.2f} ms".format(method, max_points, best * 1000))
+
+
+if __name__ == "__main__":
+    run()
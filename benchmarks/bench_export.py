@@ -0,0 +1,41 @@
+"""
+Benchmarks encoding throughput of the streaming recording export.
+
+Run from the repository root with `python -m benchmarks.bench_export`
+"""
+
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_range_query import create_recording
+from ps_controller.recording import Export
+from ps_controller.recording.RecordingReader import RecordingReader
+
+NUMBER_OF_RECORDS = 1000000
+BATCH_SIZE = 10000
+
+
+def run():
+    directory = tempfile.mkdtemp()
+    try:
+        create_recording(directory, NUMBER_OF_RECORDS)
+        reader = RecordingReader(directory)
+        print("Exporting {0} records in batches of {1}".format(NUMBER_OF_RECORDS, BATCH_SIZE))
+        for export_format in (Export.CSV, Export.NDJSON):
+            start_time = time.perf_counter()
+            first_chunk_time = None
+            total_bytes = 0
+            for chunk in Export.encode(export_format, reader.iter_range(batch_size=BATCH_SIZE)):
+                if first_chunk_time is None and chunk:
+                    first_chunk_time = time.perf_counter() - start_time
+                total_bytes += len(chunk)
+            elapsed = time.perf_counter() - start_time
+            print("{0:>7} {1:10.0f} rows/s  {2:7.1f} MB/s  first bytes after {3:6.2f} ms".format(
+                export_format, NUMBER_OF_RECORDS / elapsed, total_bytes / elapsed / 1e6, first_chunk_time * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,208 @@
+"""
+Load test of the web server. Starts psControllerMain against a simulated device in a process of its own and
+drives a weighted mix of endpoints from concurrent clients, then reports throughput, latency percentiles and error
+rates per endpoint, and the device transactions made per HTTP request (from /metrics). The transactions include
+those of the background acquisition, whose rate without load is reported next to them.
+
+Run from the repository root with `python -m benchmarks.bench_http_load`. Options:
+    --clients N         Concurrent clients. Default 8
+    --seconds S         Seconds of load. Default 10
+    --no_keep_alive     Open a new connection for every request
+    --mix NAME:WEIGHT,...  Endpoints and their weights, from the names in ENDPOINTS
+    --url URL           Load an already running server instead of starting one
+    --server_args ARGS  Extra arguments for the started server, e.g. "-x" or "-s 4"
+    --json FILE         Write the results as JSON
+"""
+
+import argparse
+import collections
+import http.client
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import numpy
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Name: (method, path, function giving the parameters)
+ENDPOINTS = collections.OrderedDict((
+    ("all_values", ("GET", "/all_values", lambda rng: {})),
+    ("devices_all_values", ("GET", "/devices/all_values", lambda rng: {})),
+    ("history", ("GET", "/history", lambda rng: {"seconds": 10, "max_points": 200})),
+    ("stats", ("GET", "/stats", lambda rng: {})),
+    ("get_output_on", ("GET", "/output_on", lambda rng: {})),
+    ("set_voltage", ("POST", "/voltage", lambda rng: {"target_voltage_V": round(rng.uniform(0, 12), 1)})),
+    ("set_current", ("POST", "/current", lambda rng: {"current_limit_mA": rng.randint(100, 500)})),
+))
+DEFAULT_MIX = "all_values:10,devices_all_values:2,history:2,stats:1,get_output_on:1,set_voltage:1,set_current:1"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port, server_args):
+    server = subprocess.Popen([sys.executable, "psControllerMain.py", "-s", "-p", str(port)] + server_args,
+                              cwd=REPOSITORY_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/all_values")
+            if connection.getresponse().status == 200:
+                return server
+        except (http.client.HTTPException, OSError):
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not start on port {0}".format(port))
+
+
+def _transaction_count(host, port):
+    """Gets the number of device transactions the server has made
+
+    :return: int or None -- The count. None if the server has no /metrics
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    connection.request("GET", "/metrics")
+    response = connection.getresponse()
+    if response.status != 200:
+        return None
+    return sum(int(float(line.rsplit(" ", 1)[1])) for line in response.read().decode().splitlines()
+               if line.startswith("ps201_transaction_seconds_count"))
+
+
+def _client(host, port, names, weights, deadline, keep_alive, seed, latencies, errors):
+    rng = random.Random(seed)
+    headers = {} if keep_alive else {"Connection": "close"}
+    connection = None
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, parameters = ENDPOINTS[name]
+        encoded_parameters = urllib.parse.urlencode(parameters(rng))
+        if connection is None:
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+        start = time.perf_counter()
+        try:
+            if method == "GET":
+                connection.request(method, path + ("?" + encoded_parameters if encoded_parameters else ""),
+                                   headers=headers)
+            else:
+                connection.request(method, path, encoded_parameters,
+                                   dict(headers, **{"Content-Type": "application/x-www-form-urlencoded"}))
+            response = connection.getresponse()
+            response.read()
+            failed = response.status != 200
+        except (http.client.HTTPException, OSError):
+            failed = True
+            connection.close()
+            connection = None
+        latencies[name].append(time.perf_counter() - start)
+        if failed:
+            errors[name] += 1
+        if not keep_alive and connection is not None:
+            connection.close()
+            connection = None
+    if connection is not None:
+        connection.close()
+
+
+def _summary(latencies, errors, seconds):
+    all_latencies = numpy.array([latency for name in latencies for latency in latencies[name]] or [0.0]) * 1000
+    summary = collections.OrderedDict()
+    for name in list(latencies) + ["total"]:
+        values = all_latencies if name == "total" else numpy.array(latencies[name] or [0.0]) * 1000
+        count = sum(len(v) for v in latencies.values()) if name == "total" else len(latencies[name])
+        error_count = sum(errors.values()) if name == "total" else errors[name]
+        p50, p95, p99 = numpy.percentile(values, [50, 95, 99])
+        summary[name] = {"requests": count, "requests_per_s": count / seconds, "errors": error_count,
+                         "error_rate": error_count / count if count else 0.0, "p50_ms": p50, "p95_ms": p95,
+                         "p99_ms": p99, "max_ms": values.max()}
+    return summary
+
+
+def run(args=None):
+    parser = argparse.ArgumentParser(description="Load test of the web server against a simulated device")
+    parser.add_argument('--clients', help='Concurrent clients. Default 8', type=int, default=8)
+    parser.add_argument('--seconds', help='Seconds of load. Default 10', type=float, default=10.0)
+    parser.add_argument('--no_keep_alive', help='Open a new connection for every request', action='store_true')
+    parser.add_argument('--mix', help='Endpoints and weights, default ' + DEFAULT_MIX, default=DEFAULT_MIX)
+    parser.add_argument('--url', help='Load an already running server instead of starting one')
+    parser.add_argument('--server_args', help='Extra arguments for the started server', default='')
+    parser.add_argument('--json', help='Write the results as JSON to this file')
+    args = parser.parse_args(args)
+
+    mix = collections.OrderedDict((name, float(weight)) for name, weight in
+                                  (item.split(":") for item in args.mix.split(",")))
+    unknown = [name for name in mix if name not in ENDPOINTS]
+    if unknown:
+        parser.error("Unknown endpoints: " + ", ".join(unknown) + ". Known are " + ", ".join(ENDPOINTS))
+
+    server = None
+    if args.url:
+        parsed_url = urllib.parse.urlsplit(args.url)
+        host, port = parsed_url.hostname, parsed_url.port or 80
+    else:
+        host, port = "127.0.0.1", _free_port()
+        server = _start_server(port, shlex.split(args.server_args))
+    try:
+        idle_seconds = 2.0
+        idle_start_count = _transaction_count(host, port)
+        time.sleep(idle_seconds)
+        idle_end_count = _transaction_count(host, port)
+
+        latencies = collections.OrderedDict((name, []) for name in mix)
+        errors = collections.Counter()
+        deadline = time.perf_counter() + args.seconds
+        clients = [threading.Thread(target=_client, args=(host, port, list(mix), list(mix.values()), deadline,
+                                                          not args.no_keep_alive, i, latencies, errors))
+                   for i in range(args.clients)]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+        end_count = _transaction_count(host, port)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = _summary(latencies, errors, elapsed)
+    transactions_per_request = None
+    idle_transactions_per_s = None
+    if idle_start_count is not None and summary["total"]["requests"]:
+        idle_transactions_per_s = (idle_end_count - idle_start_count) / idle_seconds
+        transactions_per_request = (end_count - idle_end_count) / summary["total"]["requests"]
+
+    print("{0} clients, keep-alive {1}, {2:.1f} s".format(args.clients, "off" if args.no_keep_alive else "on",
+                                                          elapsed))
+    print("{0:>20} {1:>9} {2:>9} {3:>8} {4:>9} {5:>9} {6:>9} {7:>9}".format(
+        "endpoint", "requests", "req/s", "errors", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    for name, result in summary.items():
+        print("{0:>20} {1:9d} {2:9.1f} {3:7.2f}% {4:9.2f} {5:9.2f} {6:9.2f} {7:9.2f}".format(
+            name, result["requests"], result["requests_per_s"], result["error_rate"] * 100, result["p50_ms"],
+            result["p95_ms"], result["p99_ms"], result["max_ms"]))
+    if transactions_per_request is not None:
+        print("Device transactions per request: {0:.2f}, background acquisition without load: {1:.1f} "
+              "transactions/s".format(transactions_per_request, idle_transactions_per_s))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"clients": args.clients, "keep_alive": not args.no_keep_alive, "seconds": elapsed,
+                       "endpoints": summary, "device_transactions_per_request": transactions_per_request,
+                       "idle_device_transactions_per_s": idle_transactions_per_s}, f, indent=2)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,68 @@
+"""
+Benchmarks acquisition timing jitter under load of the web process, with device I/O in the web process and in a
+worker process. The load is threads serializing JSON, like busy request handlers.
+
+Run from the repository root with `python -m benchmarks.bench_isolation`
+"""
+
+import json
+import logging
+import threading
+import time
+
+import numpy
+
+from ps_controller.acquisition.AcquisitionLoop import AcquisitionLoop
+from ps_controller.acquisition.RingAcquisitionLoop import RingAcquisitionLoop
+from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.device.ProcessDevice import ProcessDevice
+from ps_controller.logging.CustomLogger import CustomLogger
+
+SAMPLE_INTERVAL = 0.05
+RUN_SECONDS = 5.0
+LOAD_THREADS = 8
+
+
+def _load(stop_event):
+    document = {"values": list(range(2000))}
+    while not stop_event.is_set():
+        json.loads(json.dumps(document))
+
+
+def _measure(acquisition, load_threads):
+    timestamps = []
+    acquisition.add_listener(lambda timestamp, device_values: timestamps.append(timestamp))
+    stop_event = threading.Event()
+    threads = [threading.Thread(target=_load, args=(stop_event,), daemon=True) for _ in range(load_threads)]
+    acquisition.start()
+    time.sleep(1.0)
+    del timestamps[:]
+    for thread in threads:
+        thread.start()
+    time.sleep(RUN_SECONDS)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    acquisition.stop()
+    return numpy.diff(timestamps)
+
+
+def run():
+    logger = CustomLogger(logging.ERROR)
+    print("Sample interval {0} ms, {1} s per run".format(SAMPLE_INTERVAL * 1000, RUN_SECONDS))
+    for load_threads in (0, LOAD_THREADS):
+        in_process_device = DeviceFactory().create_device("simulated", logger)
+        in_process_device.connect()
+        process_device = ProcessDevice("simulated", sample_interval=SAMPLE_INTERVAL)
+        process_device.connect()
+        for name, acquisition in (
+                ("in process", AcquisitionLoop(in_process_device, logger, interval=SAMPLE_INTERVAL)),
+                ("worker process", RingAcquisitionLoop(process_device, logger))):
+            intervals = _measure(acquisition, load_threads) * 1000
+            print("{0:>15}, {1} load threads: {2:4d} samples  interval mean {3:6.2f} ms  std {4:6.2f} ms  "
+                  "max {5:7.2f} ms".format(name, load_threads, len(intervals) + 1, intervals.mean(),
+                                           intervals.std(), intervals.max()))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,85 @@
+"""
+Benchmarks the overhead of the metrics instrumentation per device transaction, against a simulated device without
+serial transfer time so the overhead is not hidden by the line.
+
+Run from the repository root with `python -m benchmarks.bench_metrics`
+"""
+
+import logging
+import time
+
+from ps_controller.device import UsbDevice
+from ps_controller.metrics.Metrics import Counter, Histogram
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_controller.connection.ConnectionFactory import ConnectionFactory
+from ps_controller.logging.CustomLogger import CustomLogger
+
+NUMBER_OF_TRANSACTIONS = 5000
+ROUNDS = 5
+NUMBER_OF_OBSERVATIONS = 500000
+INSTRUMENTS = ("TRANSACTION_SECONDS", "TRANSACTION_FAILURES", "LOCK_WAIT_SECONDS", "ACKNOWLEDGEMENTS", "CRC_ERRORS",
+               "BYTES_SENT", "BYTES_RECEIVED")
+
+
+class _NullMetric:
+    def labels(self, *label_values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+def _time_transactions(device):
+    start_time = time.perf_counter()
+    for i in range(NUMBER_OF_TRANSACTIONS):
+        device.get_all_values()
+    return (time.perf_counter() - start_time) / NUMBER_OF_TRANSACTIONS
+
+
+def _time_calls(function):
+    start_time = time.perf_counter()
+    for i in range(NUMBER_OF_OBSERVATIONS):
+        function()
+    return (time.perf_counter() - start_time) / NUMBER_OF_OBSERVATIONS
+
+
+def run():
+    logger = CustomLogger(logging.ERROR)
+    connection = ConnectionFactory(logger).create_simulated_connection(SimulatedPs201(), baudrate=None)
+    device = UsbDevice.UsbDevice(connection, logger)
+    device.connect()
+
+    histogram = Histogram("bench_seconds", "Benchmark", ("command",), registry=None)
+    counter = Counter("bench_total", "Benchmark", registry=None)
+    print("Per call cost over {0} calls".format(NUMBER_OF_OBSERVATIONS))
+    print("{0:>30} {1:8.3f} us".format("counter inc", _time_calls(counter.inc) * 1e6))
+    print("{0:>30} {1:8.3f} us".format("labeled histogram observe",
+                                       _time_calls(lambda: histogram.labels("WRT").observe(0.003)) * 1e6))
+
+    # Alternate the runs and keep the best of each so drift of the machine does not count as overhead
+    instruments = dict((name, getattr(UsbDevice, name)) for name in INSTRUMENTS)
+    instrumented_times = []
+    plain_times = []
+    for i in range(ROUNDS):
+        instrumented_times.append(_time_transactions(device))
+        for name in INSTRUMENTS:
+            setattr(UsbDevice, name, _NullMetric())
+        try:
+            plain_times.append(_time_transactions(device))
+        finally:
+            for name, instrument in instruments.items():
+                setattr(UsbDevice, name, instrument)
+    instrumented = min(instrumented_times)
+    plain = min(plain_times)
+    print("Per transaction cost, best of {0} rounds of {1} get_all_values".format(ROUNDS, NUMBER_OF_TRANSACTIONS))
+    print("{0:>30} {1:8.2f} us".format("without metrics", plain * 1e6))
+    print("{0:>30} {1:8.2f} us".format("with metrics", instrumented * 1e6))
+    print("{0:>30} {1:8.2f} us ({2:.1f} %)".format("overhead", (instrumented - plain) * 1e6,
+                                                  (instrumented - plain) / plain * 100))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,181 @@
+"""
+Microbenchmarks of the protocol and device hot paths: frame encoding and decoding, crc codes, parsing of the
+'all data' response, reading a frame from a serial link held in memory, and a full get_all_values round trip
+against a simulated device without serial transfer time.
+
+Every case is timed with timeit: the loop count is calibrated to take at least 0.2 s, and the best of the repeats
+is reported, so other load on the machine only makes a case slower, never faster. The repeats of all cases are
+interleaved, and a fixed pure Python calibration case runs with them, so a machine that is slower during the whole
+run is measured as such and compared with the baseline after scaling by the calibration case. A case only counts as
+regressed if its scaled median is slower than the baseline median by more than the threshold and by more than the
+spread of the baseline repeats, so run to run noise of a noisy case is not reported.
+
+Run from the repository root with `python -m benchmarks.bench_protocol`. Options:
+    --json FILE         Write the results as JSON, e.g. to keep as a baseline
+    --baseline FILE     Compare with the results of an earlier run. Exits with 1 if a case regressed
+    --threshold RATIO   Median slowdown that counts as a regression. Default 0.1 (10 %)
+    --filter TEXT       Only run cases whose name contains TEXT
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import timeit
+
+from ps_controller import SerialParser
+from ps_controller.Constants import Constants
+from ps_controller.connection.ConnectionFactory import ConnectionFactory
+from ps_controller.device.UsbDevice import UsbDevice
+from ps_controller.logging.CustomLogger import CustomLogger
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_controller.utilities.Crc import CrcHelper
+
+REPEATS = 9
+CALIBRATION = "calibration"
+ALL_DATA = "12000;250;12000;500;1"
+
+
+class _MemorySerialLink:
+    """Serial link double that endlessly repeats the same bytes"""
+
+    def __init__(self, data):
+        self._data = data
+        self._position = 0
+
+    def read(self, number_of_bytes):
+        if self._position >= len(self._data):
+            self._position = 0
+        chunk = self._data[self._position:self._position + number_of_bytes]
+        self._position += len(chunk)
+        return chunk
+
+
+def _cases():
+    """Creates the benchmarked cases
+
+    :return: list[tuple(str, callable)] -- (name, function without arguments) of every case
+    """
+    logger = CustomLogger(logging.ERROR)
+    connection_factory = ConnectionFactory(logger)
+    all_frame = SerialParser.to_serial(Constants.WRITE_ALL_RESPOND, ALL_DATA)
+    all_response = SerialParser.from_serial(all_frame)
+
+    usb_connection = connection_factory.create_usb_connection(port_range=[])
+    memory_link = _MemorySerialLink(SerialParser.to_serial(Constants.ACKNOWLEDGE_COMMAND) + all_frame)
+
+    device = UsbDevice(connection_factory.create_simulated_connection(SimulatedPs201(), baudrate=None), logger)
+    device.connect()
+
+    return [
+        ("SerialParser.to_serial", lambda: SerialParser.to_serial(Constants.SET_VOLTAGE_COMMAND, "12000")),
+        ("SerialParser.from_serial", lambda: SerialParser.from_serial(all_frame)),
+        ("SerialParser.from_all_data_to_device_values", lambda: SerialParser.from_all_data_to_device_values(ALL_DATA)),
+        ("CrcHelper.create", lambda: CrcHelper.create(Constants.WRITE_ALL_RESPOND, all_response.data_length_hex,
+                                                      ALL_DATA)),
+        ("CrcHelper.verify_crc_code", lambda: CrcHelper.verify_crc_code(all_response)),
+        ("UsbConnection._read_device_response", lambda: usb_connection._read_device_response(memory_link)),
+        ("UsbDevice.get_all_values", device.get_all_values),
+    ]
+
+
+def _calibration():
+    total = 0
+    for i in range(1000):
+        total += i * i
+    return total
+
+
+def _measure(cases):
+    """Times functions, interleaving their repeats so changes of the machine speed during the run affect all of them
+
+    :param cases: (name, function without arguments) of every case
+    :type cases: list[tuple(str, callable)]
+    :return: dict[str, dict] -- By case name, keys 'per_call_us' (best of the repeats), 'median_us', 'max_us'
+        (slowest of the repeats) and 'loops'
+    """
+    timers = [(name, timeit.Timer(function)) for name, function in cases]
+    loops = dict((name, timer.autorange()[0]) for name, timer in timers)
+    per_call = dict((name, []) for name, timer in timers)
+    for _ in range(REPEATS):
+        for name, timer in timers:
+            per_call[name].append(timer.timeit(loops[name]) / loops[name])
+    results = dict()
+    for name, timer in timers:
+        times = sorted(per_call[name])
+        results[name] = {"per_call_us": times[0] * 1e6, "median_us": times[len(times) // 2] * 1e6,
+                         "max_us": times[-1] * 1e6, "loops": loops[name]}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Compares results with a baseline
+
+    :param results: Results by case name, as in the 'results' of the JSON output
+    :type results: dict
+    :param baseline: Results of the baseline by case name
+    :type baseline: dict
+    :param threshold: Least slowdown ratio of the medians that counts as a regression, e.g. 0.1 for 10 %. Cases
+        whose baseline repeats spread more need to slow down by more than their spread
+    :type threshold: float
+    :return: list[str] -- Names of the cases that regressed
+    """
+    regressions = []
+    scale = 1.0
+    if CALIBRATION in results and CALIBRATION in baseline:
+        scale = results[CALIBRATION]["median_us"] / baseline[CALIBRATION]["median_us"]
+        print("Machine speed relative to the baseline: {0:.2f}x slower, results scaled".format(scale))
+    print("{0:>45} {1:>12} {2:>12} {3:>8} {4:>8}".format("case", "baseline us", "now us", "change", "allowed"))
+    for name, result in results.items():
+        if name == CALIBRATION:
+            continue
+        if name not in baseline:
+            print("{0:>45} {1:>12} {2:12.3f}".format(name, "-", result["median_us"]))
+            continue
+        before = baseline[name]
+        ratio = result["median_us"] / scale / before["median_us"]
+        # Within the spread of the baseline repeats the difference can be noise
+        noise = (before.get("max_us", before["median_us"]) - before["per_call_us"]) / before["median_us"]
+        allowed = max(threshold, noise)
+        regressed = ratio > 1 + allowed
+        if regressed:
+            regressions.append(name)
+        print("{0:>45} {1:12.3f} {2:12.3f} {3:+7.1f}% {4:+7.1f}%{5}".format(
+            name, before["median_us"], result["median_us"] / scale, (ratio - 1) * 100, allowed * 100,
+            "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def run(args=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the protocol and device hot paths")
+    parser.add_argument('--json', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare with the JSON results of an earlier run')
+    parser.add_argument('--threshold', help='Median slowdown that counts as a regression. Default 0.1', type=float,
+                        default=0.1)
+    parser.add_argument('--filter', help='Only run cases whose name contains this text', default='')
+    args = parser.parse_args(args)
+
+    cases = [(name, function) for name, function in _cases() if args.filter in name]
+    results = _measure([(CALIBRATION, _calibration)] + cases)
+    for name, result in results.items():
+        print("{0:>45} {1:12.3f} us  ({2} loops)".format(name, result["per_call_us"], result["loops"]))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "time": time.time(),
+                       "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("{0} of {1} cases regressed by more than {2:.0f} % and their noise".format(
+                len(regressions), len(cases), args.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
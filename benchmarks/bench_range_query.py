@@ -0,0 +1,72 @@
+"""
+Benchmarks time range queries over recordings of increasing size, with and without the sparse segment index.
+
+Run from the repository root with `python -m benchmarks.bench_range_query`
+"""
+
+import shutil
+import tempfile
+import timeit
+
+import numpy
+
+from ps_controller.recording import SegmentFormat
+from ps_controller.recording import SegmentIndex
+from ps_controller.recording.RecordingReader import RecordingReader
+
+RECORDING_SIZES = (10000, 100000, 1000000, 5000000)
+SEGMENT_RECORDS = 1000000
+SAMPLE_INTERVAL = 0.05
+QUERY_SECONDS = 300
+REPEAT = 20
+
+
+def create_recording(directory, number_of_records):
+    """Writes a recording of 20 Hz samples directly in the segment format
+
+    :param directory: The recording directory
+    :type directory: str
+    :param number_of_records: Number of records in the recording
+    :type number_of_records: int
+    :return: None
+    """
+    for segment_number, first in enumerate(range(0, number_of_records, SEGMENT_RECORDS), start=1):
+        count = min(SEGMENT_RECORDS, number_of_records - first)
+        records = numpy.zeros(count, dtype=SegmentFormat.RECORD_DTYPE)
+        records['timestamp'] = (numpy.arange(count) + first) * SAMPLE_INTERVAL
+        records['output_voltage'] = 5000
+        with open(SegmentFormat.segment_path(directory, segment_number), 'wb') as f:
+            f.write(SegmentFormat.create_header())
+            f.write(records.tobytes())
+        SegmentIndex.rebuild_index(directory, segment_number, records)
+
+
+def linear_scan(reader, start, end):
+    records = reader.read_all()
+    return records[(records['timestamp'] >= start) & (records['timestamp'] <= end)]
+
+
+def run():
+    random = numpy.random.RandomState(0)
+    print("Reading {0} s ranges, mean time per query".format(QUERY_SECONDS))
+    for number_of_records in RECORDING_SIZES:
+        directory = tempfile.mkdtemp()
+        try:
+            create_recording(directory, number_of_records)
+            reader = RecordingReader(directory)
+            duration = number_of_records * SAMPLE_INTERVAL
+            starts = random.uniform(0, max(duration - QUERY_SECONDS, 0), REPEAT)
+
+            indexed = min(timeit.repeat(
+                lambda: [reader.read_range(start, start + QUERY_SECONDS) for start in starts], number=1, repeat=3))
+            linear = min(timeit.repeat(
+                lambda: [linear_scan(reader, start, start + QUERY_SECONDS) for start in starts[:3]],
+                number=1, repeat=3))
+            print("{0:>9} records  indexed {1:8.3f} ms  linear scan {2:9.3f} ms".format(
+                number_of_records, indexed / REPEAT * 1000, linear / 3 * 1000))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run()
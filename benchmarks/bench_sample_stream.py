@@ -0,0 +1,58 @@
+"""
+Benchmarks decoding samples on the client, from one JSON document per sample as served by /all_values and from
+frames of the binary sample stream of /sample_stream.
+
+Run from the repository root with `python -m benchmarks.bench_sample_stream`
+"""
+
+import io
+import json
+import timeit
+
+from ps_controller.DeviceValues import DeviceValues
+from ps_controller.recording import SampleStream
+from ps_web_server.PsWebWrapper import Wrapper
+
+SAMPLES = 100000
+FRAME_SAMPLES = 20
+
+
+def _samples():
+    samples = []
+    for i in range(SAMPLES):
+        device_values = DeviceValues()
+        device_values.output_voltage = 5000 + i % 7
+        device_values.output_current = 100 + i % 3
+        device_values.target_voltage = 5000
+        device_values.target_current = 500
+        device_values.output_is_on = True
+        samples.append((1.7e9 + i * 0.05, device_values))
+    return samples
+
+
+def run():
+    samples = _samples()
+    documents = []
+    for timestamp, device_values in samples:
+        values = {"timestamp": timestamp}
+        values.update(Wrapper.values_to_dict(device_values))
+        documents.append(json.dumps(values).encode('utf-8'))
+    stream = SampleStream.create_header() + b''.join(
+        SampleStream.encode_frame(samples[i:i + FRAME_SAMPLES]) for i in range(0, SAMPLES, FRAME_SAMPLES))
+
+    def decode_json():
+        return [json.loads(document) for document in documents]
+
+    def decode_stream():
+        return list(SampleStream.read_batches(io.BytesIO(stream)))
+
+    print("{0} samples, {1} samples per frame".format(SAMPLES, FRAME_SAMPLES))
+    print("{0:>14} {1:>12} {2:>16}".format("format", "bytes", "decode us/sample"))
+    for name, size, decode in (("json", sum(len(d) for d in documents), decode_json),
+                               ("sample stream", len(stream), decode_stream)):
+        seconds = min(timeit.repeat(decode, number=1, repeat=3))
+        print("{0:>14} {1:12d} {2:16.3f}".format(name, size, seconds / SAMPLES * 1e6))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,46 @@
+"""
+Benchmarks the per sample cost of the statistics accumulators fed by the acquisition loop.
+
+Run from the repository root with `python -m benchmarks.bench_statistics`
+"""
+
+import time
+
+from ps_controller.DeviceValues import DeviceValues
+from ps_controller.acquisition.SampleHistory import SampleHistory
+from ps_controller.acquisition.Statistics import StatisticsWindows
+
+NUMBER_OF_SAMPLES = 200000
+
+
+def _samples():
+    samples = []
+    for i in range(NUMBER_OF_SAMPLES):
+        device_values = DeviceValues()
+        device_values.output_voltage = 5000 + i % 7
+        device_values.output_current = 100 + i % 3
+        samples.append((i * 0.05, device_values))
+    return samples
+
+
+def _time_listener(listener, samples):
+    start_time = time.perf_counter()
+    for timestamp, device_values in samples:
+        listener(timestamp, device_values)
+    return (time.perf_counter() - start_time) / len(samples)
+
+
+def run():
+    samples = _samples()
+    print("Per sample cost over {0} samples".format(NUMBER_OF_SAMPLES))
+    print("{0:>24} {1:8.2f} us".format("history", _time_listener(SampleHistory().add, samples) * 1e6))
+    for number_of_windows in (1, 4, 16):
+        windows = StatisticsWindows()
+        for i in range(number_of_windows - 1):
+            windows.reset("window {0}".format(i))
+        cost = _time_listener(windows.add, samples)
+        print("{0:>24} {1:8.2f} us".format("statistics, {0} windows".format(number_of_windows), cost * 1e6))
+
+
+if __name__ == "__main__":
+    run()
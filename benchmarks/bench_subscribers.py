@@ -0,0 +1,115 @@
+"""
+Holds many /stream subscribers on the asyncio front-end (psControllerMain --asyncio) against a simulated device and
+reports how late the samples reach them, how many samples each got, the /all_values latency of another client in
+the meantime and the memory of the server.
+
+Run from the repository root with `python -m benchmarks.bench_subscribers`. Options:
+    --subscribers N     Concurrent /stream clients. Default 2000
+    --seconds S         Seconds of streaming. Default 10
+    --interval S        Least seconds between events of a subscriber. Default 0, every sample
+    --processes N       Client processes the subscribers are spread over, so the clients keep up. Default 1
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import time
+
+import numpy
+
+from benchmarks.bench_http_load import _free_port, _start_server
+
+
+async def _subscribe(port, interval, deadline, delays, counts):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write("GET /stream?interval={0} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".format(interval).encode())
+    await reader.readuntil(b"\r\n\r\n")
+    count = 0
+    try:
+        while time.time() < deadline:
+            event = await asyncio.wait_for(reader.readuntil(b"\n\n"), max(deadline - time.time(), 0.01))
+            if event.startswith(b"data: "):
+                delays.append(time.time() - json.loads(event[6:].decode())["timestamp"])
+                count += 1
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        counts.append(count)
+        writer.close()
+
+
+async def _subscribe_all(port, subscribers, interval, deadline):
+    delays = []
+    counts = []
+    await asyncio.gather(*(_subscribe(port, interval, deadline, delays, counts) for _ in range(subscribers)))
+    return delays, counts
+
+
+def _client_process(arguments):
+    return asyncio.run(_subscribe_all(*arguments))
+
+
+def _all_values_latencies(port, seconds):
+    latencies = []
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        connection.request("GET", "/all_values")
+        connection.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+    connection.close()
+    return numpy.array(latencies) * 1000
+
+
+def _resident_mb(pid):
+    with open("/proc/{0}/status".format(pid)) as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+
+def run(args=None):
+    parser = argparse.ArgumentParser(description="Many /stream subscribers on the asyncio front-end")
+    parser.add_argument('--subscribers', help='Concurrent /stream clients. Default 2000', type=int, default=2000)
+    parser.add_argument('--seconds', help='Seconds of streaming. Default 10', type=float, default=10.0)
+    parser.add_argument('--interval', help='Least seconds between events. Default 0', type=float, default=0.0)
+    parser.add_argument('--processes', help='Client processes. Default 1', type=int, default=1)
+    args = parser.parse_args(args)
+
+    port = _free_port()
+    server = _start_server(port, ["--asyncio"])
+    try:
+        idle_mb = _resident_mb(server.pid)
+        deadline = time.time() + args.seconds
+        shares = [args.subscribers // args.processes + (i < args.subscribers % args.processes)
+                  for i in range(args.processes)]
+        with multiprocessing.Pool(args.processes) as pool:
+            subscription = pool.map_async(_client_process,
+                                          [(port, share, args.interval, deadline) for share in shares])
+            time.sleep(min(args.seconds / 2, 3.0))
+            all_values_ms = _all_values_latencies(port, args.seconds / 3)
+            loaded_mb = _resident_mb(server.pid)
+            results = subscription.get()
+        delays = [delay for process_delays, process_counts in results for delay in process_delays]
+        counts = [count for process_delays, process_counts in results for count in process_counts]
+    finally:
+        server.terminate()
+        server.wait()
+
+    delays = numpy.array(delays or [0.0]) * 1000
+    print("{0} subscribers, {1:.0f} s, interval {2} s".format(args.subscribers, args.seconds, args.interval))
+    print("Samples per subscriber: min {0} mean {1:.1f} max {2}".format(min(counts), numpy.mean(counts),
+                                                                        max(counts)))
+    print("Sample delay ms: p50 {0:.2f} p95 {1:.2f} p99 {2:.2f} max {3:.2f}".format(
+        *numpy.percentile(delays, [50, 95, 99, 100])))
+    print("/all_values ms meanwhile: p50 {0:.2f} p99 {1:.2f} max {2:.2f}".format(
+        *numpy.percentile(all_values_ms, [50, 99, 100])))
+    print("Server memory: {0:.1f} MB idle, {1:.1f} MB with subscribers".format(idle_mb, loaded_mb))
+
+
+if __name__ == "__main__":
+    run()
@@ -12,7 +12,7 @@ data_files = ['msvcr100.dll',
               os.path.join('ps_web_server', 'js'),
               os.path.join('ps_web_server', 'fonts')]
 
-build_exe_options = {"packages": ["cherrypy", "crcmod", "serial"], "include_files": data_files}
+build_exe_options = {"packages": ["cherrypy", "crcmod", "serial", "numpy"], "include_files": data_files}
 
 setup(
     name="PsController"
@@ -22,10 +22,12 @@ setup(
     , install_requires=[
         "crcmod == 1.7",
         "pyserial == 2.7",
-        "cherrypy == 3.2.4"
+        "cherrypy == 3.2.4",
+        "numpy"
     ]
-    , scripts=["psControllerMain.py"]
-    , entry_points={"console_scripts": ["PsController = psControllerMain:run"]}
-    , executables=[Executable("psControllerMain.py", targetName="ps_controller.exe")]
+    , scripts=["psControllerMain.py", "psBridgeMain.py"]
+    , entry_points={"console_scripts": ["PsController = psControllerMain:run", "PsBridge = psBridgeMain:run"]}
+    , executables=[Executable("psControllerMain.py", targetName="ps_controller.exe"),
+                   Executable("psBridgeMain.py", targetName="ps_bridge.exe")]
     , options={"build_exe": build_exe_options}
 )
@@ -11,9 +11,10 @@ import urllib.request
 import json
 import sys
 
-time_points = 50
-
-data_list = []
+# Seconds of history shown and maximum number of points fetched per line. The server downsamples the
+# history so long windows cost the same to transfer and draw as short ones
+time_window = 50
+max_points = 1000
 
 fig = plt.figure(figsize=(20, 8))
 fig.suptitle("PS201 readings", fontsize=12)
@@ -33,9 +34,9 @@ current_plot.grid(True)
 voltage_plot.grid(True)
 
 current_plot.set_ylim(0, 1000)
-current_plot.set_xlim(0, time_points)
+current_plot.set_xlim(-time_window, 0)
 voltage_plot.set_ylim(0, 20)
-voltage_plot.set_xlim(0, time_points)
+voltage_plot.set_xlim(-time_window, 0)
 
 output_current_line, = current_plot.plot([], 'b', label='Output current')
 current_limit_line, = current_plot.plot([], 'g', label='Current limit')
@@ -50,10 +51,10 @@ voltage_plot.legend([output_voltage_line, target_voltage_line],
 lines = [output_current_line, current_limit_line, output_voltage_line, target_voltage_line]
 
 
-def get_values():
-    request = 'http://localhost:8080/all_values'
+def get_history():
+    request = 'http://localhost:8080/history?seconds={0}&max_points={1}'.format(time_window, max_points)
     response = urllib.request.urlopen(request)
-    str_response = response.readall().decode('utf-8')
+    str_response = response.read().decode('utf-8')
     return json.loads(str_response)
 
 
@@ -65,23 +66,21 @@ def init():
 
 def animate(i):
     try:
-        data_list.append(get_values())
+        history = get_history()
     except:
         print("Error connecting to PS201 server")
         sys.exit()
 
-    time_values = [x for x in range(len(data_list))]
-
-    global time_points
-    if len(data_list) > time_points:
-        time_points *= 2
-        current_plot.set_xlim(0, time_points)
-        voltage_plot.set_xlim(0, time_points)
+    series = history['output_voltage_V']['t']
+    if not series:
+        return lines
+    newest = series[-1]
 
-    output_current_line.set_data(time_values, [value['output_current_mA'] for value in data_list])
-    current_limit_line.set_data(time_values, [value['current_limit_mA'] for value in data_list])
-    output_voltage_line.set_data(time_values, [value['output_voltage_V'] for value in data_list])
-    target_voltage_line.set_data(time_values, [value['target_voltage_V'] for value in data_list])
+    for line, key in ((output_current_line, 'output_current_mA'),
+                      (current_limit_line, 'current_limit_mA'),
+                      (output_voltage_line, 'output_voltage_V'),
+                      (target_voltage_line, 'target_voltage_V')):
+        line.set_data([t - newest for t in history[key]['t']], history[key]['y'])
     return lines
 
 plt.legend()
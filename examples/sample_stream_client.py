@@ -0,0 +1,31 @@
+"""
+Records every sample of a running PsController server through its binary sample stream, without parsing JSON.
+
+Usage: python sample_stream_client.py [server url] [seconds]
+"""
+
+import http.client
+import sys
+import urllib.parse
+
+import numpy
+
+from ps_controller.recording import SampleStream
+
+url = urllib.parse.urlsplit(sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8080")
+seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+connection.request("GET", "/sample_stream?seconds={0}".format(seconds))
+response = connection.getresponse()
+if response.status != 200:
+    print("Server answered " + str(response.status))
+    sys.exit()
+
+# Every batch is a structured array straight on top of the received bytes
+samples = numpy.concatenate(list(SampleStream.read_batches(response)) or [numpy.zeros(0, SampleStream.RECORD_DTYPE)])
+print("{0} samples in {1} s".format(len(samples), seconds))
+if len(samples):
+    print("Output voltage mean {0:.1f} mV, output current mean {1:.1f} mA, output on {2:.0%} of the time".format(
+        samples['output_voltage'].mean(), samples['output_current'].mean(),
+        numpy.mean(samples['flags'] & SampleStream.FLAG_OUTPUT_ON > 0)))
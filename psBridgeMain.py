@@ -0,0 +1,54 @@
+import argparse
+import logging
+import time
+
+import serial
+
+from ps_controller import __version__
+from ps_controller.connection.SerialTcpBridge import SerialTcpBridge
+from ps_controller.logging.CustomLogger import CustomLogger
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_controller.simulation.SimulatedSerialLink import SimulatedSerialLink
+
+
+parser = argparse.ArgumentParser(description='Makes a PS201 on a serial port available to a PsController on '
+                                             'another machine, see the --tcp option of psControllerMain.py')
+parser.add_argument('serial_port', help='Serial port of the PS201, for example /dev/ttyUSB0 or COM3', nargs='?')
+parser.add_argument('-p', '--port', help='TCP port to listen on. Default is 4001', type=int, default=4001)
+parser.add_argument('-l', '--listen', help='Address to listen on. Default is all addresses', default='0.0.0.0')
+parser.add_argument('-s', '--simulate', help='Bridge a simulated PS201 instead of a serial port', action='store_true')
+parser.add_argument('-d', '--debug', help='Receive debug messages', action='store_true')
+parser.add_argument('-v', '--version', help='Software version', action='store_true')
+
+# Seconds a read of the serial port waits for more bytes. Bounds the latency the bridge adds
+SERIAL_READ_TIMEOUT = 0.005
+
+
+def run():
+    args = parser.parse_args()
+    if args.version:
+        print(__version__)
+        return
+    if not args.simulate and not args.serial_port:
+        parser.error('serial_port is required unless --simulate is given')
+
+    logger = CustomLogger(logging.DEBUG if args.debug else logging.ERROR)
+    if args.simulate:
+        serial_link = SimulatedSerialLink(SimulatedPs201(), timeout=SERIAL_READ_TIMEOUT)
+    else:
+        serial_link = serial.Serial(port=args.serial_port, baudrate=9600, timeout=SERIAL_READ_TIMEOUT)
+
+    bridge = SerialTcpBridge(serial_link, logger, host=args.listen, port=args.port)
+    bridge.start()
+    print("Bridging {0} on {1}:{2}".format(args.serial_port or "simulated PS201", *bridge.address()))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bridge.stop()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,6 +1,9 @@
+import ps_web_server.AsyncWebServer
+import ps_web_server.GatewayServer
 import ps_web_server.PsWebServer
 import argparse
 import logging
+import multiprocessing
 import os
 import sys
 from ps_controller import __version__
@@ -11,11 +14,32 @@ parser.add_argument('-p', '--port', help='Port that server should listen on. Def
 parser.add_argument('-v', '--version', help='Software version', action='store_true')
 parser.add_argument('-d', '--debug', help='Receive debug message from PsController', action='store_true')
 parser.add_argument('-dw', '--debugWebServer', help='Receive debug message from web server', action='store_true')
-
-args = parser.parse_args()
+parser.add_argument('-i', '--sample_interval', help='Seconds between background device samples. Default is 0.05',
+                    type=float, default=0.05)
+parser.add_argument('-s', '--simulate', help='Control simulated PS201s instead of usb connected ones. Optionally '
+                    'the number of simulated devices, default is 1', nargs='?', type=int, const=1, default=0)
+parser.add_argument('-a', '--all_devices', help='Serve every PS201 found at startup under /devices/<id>/',
+                    action='store_true')
+parser.add_argument('-t', '--tcp', help='Control the PS201s behind serial to TCP bridges at these host:port '
+                    'addresses, see psBridgeMain.py', nargs='+', metavar='ADDRESS')
+parser.add_argument('-x', '--isolate_io', help='Run the serial I/O of every device in a worker process of its own',
+                    action='store_true')
+parser.add_argument('-g', '--gateway', help='Serve the devices of the PsController servers at these urls as one '
+                    'instead of devices of this host', nargs='+', metavar='URL')
+parser.add_argument('--trace', help='Trace the phases of every device transaction from the start, see '
+                    '/debug/traces', action='store_true')
+parser.add_argument('--profile', help='Allow sampling the stacks of all threads through /debug/profile?seconds=N',
+                    action='store_true')
+parser.add_argument('--lean', help='Serve the API without sessions, with a larger thread pool and all_values from '
+                    'the latest background sample', action='store_true')
+parser.add_argument('--asyncio', help='Serve a single device with the asyncio front-end instead of CherryPy. It '
+                    'holds many idle clients and adds /poll and /stream of the background samples',
+                    action='store_true')
+parser.add_argument('-r', '--record', help='Continuously record all samples to segment files in this directory')
 
 
 def run():
+    args = parser.parse_args()
     if args.version:
         print(__version__)
         return
@@ -34,14 +58,42 @@ def run():
         print(args.port)
         port = args.port
 
+    if args.gateway:
+        gateway = ps_web_server.GatewayServer.GatewayServer(port, args.gateway, web_server_debugging)
+        gateway.start()
+        return
+
     executable_path = None
     if hasattr(sys, "frozen"):
         executable_path = os.path.dirname(os.path.abspath(sys.executable))
 
-    server = ps_web_server.PsWebServer.PsWebServer(port, ps_log_level, web_server_debugging, executable_path)
+    device_type = "usb"
+    if args.simulate:
+        device_type = "simulated"
+    elif args.tcp:
+        device_type = "tcp"
+
+    if args.asyncio:
+        if args.all_devices or args.simulate > 1 or (args.tcp and len(args.tcp) > 1):
+            parser.error("--asyncio serves a single device. Use it without -a, with at most one simulated device "
+                         "and at most one --tcp address")
+        server = ps_web_server.AsyncWebServer.AsyncWebServer(
+            port, ps_log_level, executable_path, sample_interval=args.sample_interval, recording_dir=args.record,
+            device_type=device_type, bridge_address=args.tcp[0] if args.tcp else None, isolate_io=args.isolate_io)
+        server.start()
+        return
+
+    server = ps_web_server.PsWebServer.PsWebServer(
+        port, ps_log_level, web_server_debugging, executable_path, sample_interval=args.sample_interval,
+        recording_dir=args.record, device_type=device_type,
+        all_devices=args.all_devices or args.simulate > 1 or bool(args.tcp), simulated_devices=args.simulate,
+        isolate_io=args.isolate_io, bridge_addresses=args.tcp,
+        trace_transactions=args.trace, profiling=args.profile, lean_api=args.lean)
 
     server.start()
 
 
 if __name__ == "__main__":
+    # Device worker processes of frozen executables start through the executable
+    multiprocessing.freeze_support()
     run()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import threading
+import time
+
+from ps_controller import PsControllerException
+from ..device.BaseDeviceInterface import BaseDeviceInterface
+from ..logging.CustomLoggerInterface import CustomLoggerInterface
+
+
+class AcquisitionLoop:
+    """Polls a device on a background thread and hands every sample to the registered listeners"""
+
+    def __init__(self, device, logger, interval=0.05, reconnect_interval=1.0):
+        """Constructor
+
+        :param device: The device to poll
+        :type device: BaseDeviceInterface
+        :param logger: Used to log messages
+        :type logger: CustomLoggerInterface
+        :param interval: Minimum time between samples in seconds
+        :type interval: float
+        :param reconnect_interval: Time between connection attempts when the device is not connected
+        :type reconnect_interval: float
+        """
+        self._device = device
+        self._logger = logger
+        self._interval = interval
+        self._reconnect_interval = reconnect_interval
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._paused = False
+        self._thread = None
+        self._latest = (None, None)
+        self._sample_count = 0
+
+    def add_listener(self, listener):
+        """Registers a function that is called with every acquired sample
+
+        Listeners run on the acquisition thread and should return quickly.
+
+        :param listener: Called with the sample wall clock timestamp and the device values
+        :type listener: lambda x: func(timestamp: float, device_values: DeviceValues) -> None
+        :return: None
+        """
+        with self._listeners_lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        """Unregisters a listener added with add_listener
+
+        :param listener: The listener to remove
+        :return: None
+        """
+        with self._listeners_lock:
+            self._listeners = [x for x in self._listeners if x is not listener]
+
+    def start(self):
+        """Starts polling the device. Does nothing if already running
+
+        :return: None
+        """
+        if self.running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AcquisitionLoop", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops polling the device and waits for the polling thread to finish
+
+        :return: None
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def pause(self):
+        """Stops reading the device without stopping the loop, e.g. while another component reads it faster.
+
+        That component can keep the listeners fed with publish.
+
+        :return: None
+        """
+        self._paused = True
+
+    def resume(self):
+        """Resumes reading the device after pause
+
+        :return: None
+        """
+        self._paused = False
+
+    def paused(self):
+        """Returns if reading the device is paused
+
+        :return: bool -- If paused
+        """
+        return self._paused
+
+    def publish(self, timestamp, device_values):
+        """Hands a sample to all listeners as if it had been acquired by the loop
+
+        :param timestamp: Sample wall clock timestamp
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        self._latest = (timestamp, device_values)
+        self._sample_count += 1
+        for listener in self._listeners:
+            try:
+                listener(timestamp, device_values)
+            except Exception as e:
+                self._logger.log_error("Acquisition listener failed: " + repr(e))
+
+    def running(self):
+        """Returns if the loop is currently polling the device
+
+        :return: bool -- If running
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self):
+        """Returns the most recently acquired sample
+
+        :return: tuple(float, DeviceValues) -- (timestamp, values). Both are None if nothing has been acquired
+        """
+        return self._latest
+
+    def sample_count(self):
+        """Returns the number of samples acquired since the loop was created
+
+        :return: int -- Number of samples
+        """
+        return self._sample_count
+
+    def _run(self):
+        next_sample_time = time.monotonic()
+        while not self._stop_event.is_set():
+            if self._paused:
+                self._stop_event.wait(self._interval)
+                next_sample_time = time.monotonic()
+                continue
+            if not self._device.connected() and not self._device.connect():
+                self._stop_event.wait(self._reconnect_interval)
+                next_sample_time = time.monotonic()
+                continue
+
+            self._acquire()
+
+            next_sample_time += self._interval
+            delay = next_sample_time - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                # Can not keep up with the interval. Do not try to catch up on missed samples
+                next_sample_time = time.monotonic()
+
+    def _acquire(self):
+        """Reads a single sample from the device and publishes it to all listeners
+
+        :return: None
+        """
+        try:
+            device_values = self._device.get_all_values()
+        except PsControllerException as e:
+            self._logger.log_debug("Acquisition failed: " + str(e))
+            return
+        except Exception as e:
+            # E.g. a garbled response the parser can not read. Keep polling, the next read may succeed
+            self._logger.log_error("Acquisition failed unexpectedly: " + repr(e))
+            return
+        if device_values is None:
+            return
+        self.publish(time.time(), device_values)
@@ -0,0 +1,62 @@
+from ps_controller import PsControllerException
+from .AcquisitionLoop import AcquisitionLoop
+from . import SharedSampleRing
+from ..logging.CustomLoggerInterface import CustomLoggerInterface
+
+
+class RingAcquisitionLoop(AcquisitionLoop):
+    """Acquisition of a ProcessDevice. Samples are taken by the worker process and this loop only hands the samples
+    it finds in the shared ring to the listeners, with the timestamps of the worker"""
+
+    def __init__(self, device, logger, poll_interval=0.01):
+        """Constructor
+
+        :param device: The device whose worker takes the samples
+        :type device: ProcessDevice
+        :param logger: Used to log messages
+        :type logger: CustomLoggerInterface
+        :param poll_interval: Seconds between checks of the ring for new samples
+        :type poll_interval: float
+        """
+        AcquisitionLoop.__init__(self, device, logger, interval=poll_interval)
+        self._read_count = 0
+
+    def start(self):
+        """Starts the worker process if needed and then handing its samples to the listeners
+
+        :return: None
+        """
+        self._device.start()
+        AcquisitionLoop.start(self)
+
+    def stop(self):
+        """Stops handing samples to the listeners and stops the worker process
+
+        :return: None
+        """
+        AcquisitionLoop.stop(self)
+        self._device.stop()
+
+    def pause(self):
+        AcquisitionLoop.pause(self)
+        self._forward(self._device.pause_acquisition)
+
+    def resume(self):
+        self._forward(self._device.resume_acquisition)
+        AcquisitionLoop.resume(self)
+
+    def _forward(self, command):
+        try:
+            command()
+        except PsControllerException as e:
+            self._logger.log_error("Could not forward to device worker: " + str(e))
+
+    def _run(self):
+        ring = self._device.ring()
+        self._read_count = ring.count()
+        while not self._stop_event.is_set():
+            slots, self._read_count = ring.read_since(self._read_count)
+            if not self._paused:
+                for slot in slots:
+                    self.publish(float(slot['timestamp']), SharedSampleRing.to_device_values(slot))
+            self._stop_event.wait(self._interval)
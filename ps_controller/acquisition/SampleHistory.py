@@ -0,0 +1,83 @@
+import threading
+
+import numpy
+
+from ..DeviceValues import DeviceValues
+
+TIMESTAMP = "timestamp"
+OUTPUT_VOLTAGE = "output_voltage"
+OUTPUT_CURRENT = "output_current"
+TARGET_VOLTAGE = "target_voltage"
+TARGET_CURRENT = "target_current"
+OUTPUT_IS_ON = "output_is_on"
+
+COLUMNS = (TIMESTAMP, OUTPUT_VOLTAGE, OUTPUT_CURRENT, TARGET_VOLTAGE, TARGET_CURRENT, OUTPUT_IS_ON)
+
+
+class SampleHistory:
+    """Fixed capacity in memory history of acquired samples, stored column wise in NumPy ring buffers"""
+
+    def __init__(self, capacity=72000):
+        """Constructor
+
+        :param capacity: Maximum number of samples kept. Oldest samples are overwritten first
+        :type capacity: int
+        """
+        self._capacity = capacity
+        self._columns = dict((name, numpy.zeros(capacity, dtype=numpy.float64)) for name in COLUMNS)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, device_values):
+        """Adds a sample to the history. Can be registered directly as an acquisition listener
+
+        :param timestamp: Sample wall clock timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        with self._lock:
+            position = self._count % self._capacity
+            self._columns[TIMESTAMP][position] = timestamp
+            self._columns[OUTPUT_VOLTAGE][position] = device_values.output_voltage
+            self._columns[OUTPUT_CURRENT][position] = device_values.output_current
+            self._columns[TARGET_VOLTAGE][position] = device_values.target_voltage
+            self._columns[TARGET_CURRENT][position] = device_values.target_current
+            self._columns[OUTPUT_IS_ON][position] = 1 if device_values.output_is_on else 0
+            self._count += 1
+
+    def __len__(self):
+        return min(self._count, self._capacity)
+
+    def oldest_timestamp(self):
+        """Gets the timestamp of the oldest sample still in the history
+
+        :return: float or None -- The timestamp. None if the history is empty
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            first = max(self._count - self._capacity, 0)
+            return float(self._columns[TIMESTAMP][first % self._capacity])
+
+    def get_range(self, start=None, end=None):
+        """Gets all samples with start <= timestamp <= end in time order
+
+        :param start: Earliest timestamp to include. None for no lower bound
+        :type start: float
+        :param end: Latest timestamp to include. None for no upper bound
+        :type end: float
+        :return: dict[str, numpy.ndarray] -- Copy of each column in COLUMNS
+        """
+        with self._lock:
+            size = min(self._count, self._capacity)
+            first = self._count - size
+            order = (numpy.arange(first, self._count) % self._capacity) if first else slice(0, size)
+            timestamps = self._columns[TIMESTAMP][order]
+            low = 0 if start is None else numpy.searchsorted(timestamps, start, side="left")
+            high = size if end is None else numpy.searchsorted(timestamps, end, side="right")
+            if isinstance(order, slice):
+                return dict((name, column[low:high].copy()) for name, column in self._columns.items())
+            selected = order[low:high]
+            return dict((name, column[selected]) for name, column in self._columns.items())
@@ -0,0 +1,172 @@
+"""Ring buffer of samples in shared memory, written by one process and read by others without locks.
+
+The memory holds a header followed by the slots. Every slot carries a sequence number that the writer makes odd
+while it writes the slot and sets to 2 * (sample number + 1) when done, so a reader detects a slot that was written
+while it read it, and the sample number the slot holds.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy
+
+from ..DeviceValues import DeviceValues
+
+HEADER_DTYPE = numpy.dtype([
+    ('capacity', '<u8'),
+    ('count', '<u8'),
+    ('connected', '<u8')])
+
+SLOT_DTYPE = numpy.dtype([
+    ('sequence', '<u8'),
+    ('timestamp', '<f8'),
+    ('output_voltage', '<f8'),
+    ('output_current', '<f8'),
+    ('target_voltage', '<f8'),
+    ('target_current', '<f8'),
+    ('input_voltage', '<f8'),
+    ('pre_reg_voltage', '<f8'),
+    ('output_is_on', '<u8')])
+
+_READ_ATTEMPTS = 10
+
+
+class SharedSampleRing:
+    """Fixed capacity ring of samples in shared memory. Only one process may write"""
+
+    def __init__(self, capacity=72000, name=None):
+        """Creates a new ring, or attaches to the ring with the given name
+
+        :param capacity: Number of samples kept when creating a ring. Ignored when attaching
+        :type capacity: int
+        :param name: Name of the shared memory of an existing ring. None to create a new ring
+        :type name: str
+        """
+        if name is None:
+            self._memory = shared_memory.SharedMemory(
+                create=True, size=HEADER_DTYPE.itemsize + capacity * SLOT_DTYPE.itemsize)
+            self._owner = True
+        else:
+            # Processes started by the creating process share its resource tracker, which unlinks the memory only
+            # if the creating process does not
+            self._memory = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._header = numpy.ndarray((), dtype=HEADER_DTYPE, buffer=self._memory.buf)
+        if self._owner:
+            self._header['capacity'] = capacity
+            self._header['count'] = 0
+            self._header['connected'] = 0
+        self._capacity = int(self._header['capacity'])
+        self._slots = numpy.ndarray((self._capacity,), dtype=SLOT_DTYPE, buffer=self._memory.buf,
+                                    offset=HEADER_DTYPE.itemsize)
+
+    @property
+    def name(self):
+        """Name of the shared memory, used to attach to the ring from another process"""
+        return self._memory.name
+
+    def add(self, timestamp, device_values):
+        """Writes a sample. Can be registered directly as an acquisition listener of the writing process
+
+        :param timestamp: Sample wall clock timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        count = int(self._header['count'])
+        position = count % self._capacity
+        self._slots['sequence'][position] = 2 * count + 1
+        self._slots[position] = (2 * count + 1, timestamp, device_values.output_voltage,
+                                 device_values.output_current, device_values.target_voltage,
+                                 device_values.target_current, device_values.input_voltage,
+                                 device_values.pre_reg_voltage, 1 if device_values.output_is_on else 0)
+        self._slots['sequence'][position] = 2 * count + 2
+        self._header['count'] = count + 1
+
+    def count(self):
+        """Gets the number of samples written since the ring was created
+
+        :return: int -- Number of samples
+        """
+        return int(self._header['count'])
+
+    def set_connected(self, connected):
+        """Publishes if the device of the writing process is connected
+
+        :param connected: If connected
+        :type connected: bool
+        :return: None
+        """
+        self._header['connected'] = 1 if connected else 0
+
+    def connected(self):
+        """Gets the connection state published with set_connected
+
+        :return: bool -- If connected
+        """
+        return bool(self._header['connected'])
+
+    def read_since(self, start_count):
+        """Reads the samples written after the first start_count samples that are still in the ring
+
+        :param start_count: Number of samples already read
+        :type start_count: int
+        :return: tuple(numpy.ndarray, int) -- (copies of the slots with dtype SLOT_DTYPE in write order, count to
+            pass as start_count on the next call)
+        """
+        count = self.count()
+        start = max(start_count, count - self._capacity + 1, 0)
+        if start >= count:
+            return numpy.empty(0, dtype=SLOT_DTYPE), count
+        numbers = numpy.arange(start, count)
+        positions = numbers % self._capacity
+        slots = self._slots[positions]
+        # A slot the writer started on before or while it was copied no longer holds the expected sequence number.
+        # Overwritten slots can only be at the start of the range
+        sequences = 2 * numbers.astype(numpy.uint64) + 2
+        valid = (slots['sequence'] == sequences) & (self._slots['sequence'][positions] == sequences)
+        return slots[valid], count
+
+    def latest(self):
+        """Reads the most recently written sample
+
+        :return: tuple(float, DeviceValues) -- (timestamp, values). Both are None if nothing has been written
+        """
+        for _ in range(_READ_ATTEMPTS):
+            count = self.count()
+            if not count:
+                return None, None
+            position = (count - 1) % self._capacity
+            slot = self._slots[position].copy()
+            if slot['sequence'] == 2 * count and self._slots['sequence'][position] == 2 * count:
+                return float(slot['timestamp']), to_device_values(slot)
+        return None, None
+
+    def close(self):
+        """Detaches from the ring. The process that created the ring also frees the shared memory
+
+        :return: None
+        """
+        self._header = None
+        self._slots = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+def to_device_values(slot):
+    """Converts a slot to device values
+
+    :param slot: A slot with dtype SLOT_DTYPE
+    :type slot: numpy.void
+    :return: DeviceValues -- The values
+    """
+    device_values = DeviceValues()
+    device_values.output_voltage = int(slot['output_voltage'])
+    device_values.output_current = int(slot['output_current'])
+    device_values.target_voltage = int(slot['target_voltage'])
+    device_values.target_current = int(slot['target_current'])
+    device_values.input_voltage = int(slot['input_voltage'])
+    device_values.pre_reg_voltage = int(slot['pre_reg_voltage'])
+    device_values.output_is_on = bool(slot['output_is_on'])
+    return device_values
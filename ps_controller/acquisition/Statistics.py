@@ -0,0 +1,186 @@
+"""Incremental statistics of acquired samples.
+
+Every sample updates the accumulators in O(1): charge and energy are integrated with the trapezoidal rule over the
+real sample timestamps, and mean and variance are kept with Welford's algorithm, so missed samples only lower the
+resolution of the integrals instead of biasing them.
+"""
+
+import math
+import threading
+import time
+
+from ..DeviceValues import DeviceValues
+
+TOTAL = "total"
+
+
+class RunningStatistics:
+    """Count, mean, variance, minimum and maximum of a stream of values"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.minimum = None
+        self.maximum = None
+        self._m2 = 0.0
+
+    def add(self, value):
+        """Adds a value
+
+        :param value: The value
+        :type value: float
+        :return: None
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.count == 1:
+            self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+
+    def variance(self):
+        """Gets the population variance of the values
+
+        :return: float -- The variance. 0 if there are no values
+        """
+        return self._m2 / self.count if self.count else 0.0
+
+    def to_dict(self):
+        """Gets the statistics
+
+        :return: dict -- JSON serializable statistics. Ripple is the peak to peak range, ripple_rms the standard
+            deviation
+        """
+        if not self.count:
+            return {"mean": None, "min": None, "max": None, "ripple": None, "ripple_rms": None}
+        return {
+            "mean": self.mean,
+            "min": self.minimum,
+            "max": self.maximum,
+            "ripple": self.maximum - self.minimum,
+            "ripple_rms": math.sqrt(self.variance())}
+
+
+class SampleStatistics:
+    """Charge, energy and voltage, current and power statistics of the samples since the statistics were created"""
+
+    def __init__(self, max_gap=5.0):
+        """Constructor
+
+        :param max_gap: Longest seconds between two samples that are integrated over. Longer gaps, e.g. while the
+            device was disconnected, are not integrated and counted instead
+        :type max_gap: float
+        """
+        self.started = time.time()
+        self.charge = 0.0
+        self.energy = 0.0
+        self.gaps = 0
+        self.output_voltage = RunningStatistics()
+        self.output_current = RunningStatistics()
+        self.output_power = RunningStatistics()
+        self._max_gap = max_gap
+        self._first_timestamp = None
+        self._previous = None
+
+    def add(self, timestamp, device_values):
+        """Adds a sample
+
+        :param timestamp: Sample wall clock timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        current = device_values.output_current
+        power = device_values.output_voltage * current / 1000.0
+        if self._previous is None:
+            self._first_timestamp = timestamp
+        else:
+            previous_timestamp, previous_current, previous_power = self._previous
+            dt = timestamp - previous_timestamp
+            if dt > self._max_gap:
+                self.gaps += 1
+            elif dt > 0:
+                self.charge += (current + previous_current) * dt / 2.0
+                self.energy += (power + previous_power) * dt / 2.0
+        self._previous = (timestamp, current, power)
+        self.output_voltage.add(device_values.output_voltage)
+        self.output_current.add(current)
+        self.output_power.add(power)
+
+    def to_dict(self):
+        """Gets the statistics
+
+        :return: dict -- JSON serializable statistics
+        """
+        duration = self._previous[0] - self._first_timestamp if self._previous else 0.0
+        return {
+            "started": self.started,
+            "duration_s": duration,
+            "samples": self.output_current.count,
+            "gaps": self.gaps,
+            # mA s to mAh and mW s to Wh
+            "charge_mAh": self.charge / 3600.0,
+            "energy_Wh": self.energy / 3600000.0,
+            "output_voltage_mV": self.output_voltage.to_dict(),
+            "output_current_mA": self.output_current.to_dict(),
+            "output_power_mW": self.output_power.to_dict()}
+
+
+class StatisticsWindows:
+    """Named SampleStatistics that can be reset independently. The TOTAL window exists from the start"""
+
+    def __init__(self, max_gap=5.0):
+        """Constructor
+
+        :param max_gap: Longest seconds between two samples that are integrated over
+        :type max_gap: float
+        """
+        self._max_gap = max_gap
+        self._windows = {TOTAL: SampleStatistics(max_gap)}
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, device_values):
+        """Adds a sample to every window. Can be registered directly as an acquisition listener
+
+        :param timestamp: Sample wall clock timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        with self._lock:
+            for window in self._windows.values():
+                window.add(timestamp, device_values)
+
+    def reset(self, name=TOTAL):
+        """Starts a window over, creating it if it does not exist
+
+        :param name: Name of the window
+        :type name: str
+        :return: None
+        """
+        with self._lock:
+            self._windows[name] = SampleStatistics(self._max_gap)
+
+    def remove(self, name):
+        """Removes a window
+
+        :param name: Name of the window
+        :type name: str
+        :return: bool -- If there was a window with that name
+        """
+        with self._lock:
+            return self._windows.pop(name, None) is not None
+
+    def to_dict(self):
+        """Gets the statistics of all windows
+
+        :return: dict[str, dict] -- Statistics by window name
+        """
+        with self._lock:
+            return dict((name, window.to_dict()) for name, window in self._windows.items())
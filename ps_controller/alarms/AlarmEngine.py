@@ -0,0 +1,103 @@
+import itertools
+import threading
+import time
+
+from ps_controller import PsControllerException
+from . import AlarmRule
+from ..device.BaseDeviceInterface import BaseDeviceInterface
+from ..logging.CustomLoggerInterface import CustomLoggerInterface
+
+
+class AlarmEngine:
+    """Evaluates alarm rules on every acquired sample and runs the protective actions of triggered rules.
+
+    Actions run immediately on the acquisition thread and are sent to the device as high priority commands, so
+    they go before any waiting web or job requests.
+    """
+
+    def __init__(self, device, logger):
+        """Constructor
+
+        :param device: The device protective actions are sent to
+        :type device: BaseDeviceInterface
+        :param logger: Used to log messages
+        :type logger: CustomLoggerInterface
+        """
+        self._device = device
+        self._logger = logger
+        self._rules = dict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add_rule(self, rule):
+        """Adds a rule. It is evaluated from the next sample on
+
+        :param rule: The rule to add
+        :type rule: AlarmRule.AlarmRule
+        :return: int -- Id of the rule
+        """
+        with self._lock:
+            rule_id = next(self._ids)
+            rules = dict(self._rules)
+            rules[rule_id] = rule
+            self._rules = rules
+            return rule_id
+
+    def remove_rule(self, rule_id):
+        """Removes a rule
+
+        :param rule_id: Id returned by add_rule
+        :type rule_id: int
+        :return: bool -- If there was a rule with that id
+        """
+        with self._lock:
+            if rule_id not in self._rules:
+                return False
+            rules = dict(self._rules)
+            del rules[rule_id]
+            self._rules = rules
+            return True
+
+    def rules(self):
+        """Gets all rules with their trigger statistics
+
+        :return: dict[int, dict] -- Rule descriptions by rule id
+        """
+        return dict((rule_id, rule.to_dict()) for rule_id, rule in self._rules.items())
+
+    def evaluate(self, timestamp, device_values):
+        """Evaluates all rules on a sample. Can be registered directly as an acquisition listener
+
+        :param timestamp: Sample timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        for rule in self._rules.values():
+            if rule.evaluate(timestamp, device_values):
+                self._run_action(rule)
+
+    def _run_action(self, rule):
+        """Runs the action of a triggered rule and records the trigger to action latency
+
+        :param rule: The triggered rule
+        :type rule: AlarmRule.AlarmRule
+        :return: None
+        """
+        trigger_time = time.monotonic()
+        rule.trigger_count += 1
+        rule.last_trigger_time = time.time()
+        try:
+            if rule.action == AlarmRule.OUTPUT_OFF:
+                self._device.set_output_on(False, high_priority=True)
+            elif rule.action == AlarmRule.SET_VOLTAGE:
+                self._device.set_target_voltage(rule.value, high_priority=True)
+            elif rule.action == AlarmRule.SET_CURRENT:
+                self._device.set_target_current(rule.value, high_priority=True)
+            rule.last_error = None
+        except PsControllerException as e:
+            rule.last_error = str(e)
+            self._logger.log_error("Alarm action " + rule.action + " failed: " + str(e))
+        rule.last_latency = time.monotonic() - trigger_time
+        self._logger.log_error("Alarm triggered on " + rule.quantity + ", ran action " + rule.action)
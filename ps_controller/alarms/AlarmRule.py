@@ -0,0 +1,150 @@
+OUTPUT_VOLTAGE = "output_voltage"
+OUTPUT_CURRENT = "output_current"
+OUTPUT_POWER = "output_power"
+
+THRESHOLD = "threshold"
+RATE = "rate"
+
+ABOVE = ">"
+BELOW = "<"
+
+OUTPUT_OFF = "output_off"
+SET_VOLTAGE = "set_voltage"
+SET_CURRENT = "set_current"
+
+QUANTITIES = (OUTPUT_VOLTAGE, OUTPUT_CURRENT, OUTPUT_POWER)
+RULE_TYPES = (THRESHOLD, RATE)
+OPERATORS = (ABOVE, BELOW)
+ACTIONS = (OUTPUT_OFF, SET_VOLTAGE, SET_CURRENT)
+
+
+def quantity_value(quantity, device_values):
+    """Gets a quantity from device values
+
+    :param quantity: One of QUANTITIES
+    :type quantity: str
+    :param device_values: The device values
+    :type device_values: DeviceValues
+    :return: float -- Voltage in mV, current in mA or power in mW
+    """
+    if quantity == OUTPUT_VOLTAGE:
+        return device_values.output_voltage
+    elif quantity == OUTPUT_CURRENT:
+        return device_values.output_current
+    return device_values.output_voltage * device_values.output_current / 1000.0
+
+
+class AlarmRule:
+    """A condition on acquired samples and the protective action taken when it holds for enough samples.
+
+    A threshold rule compares the quantity itself and a rate rule compares its change per second between
+    consecutive samples. Once triggered the rule does not trigger again until the condition has cleared.
+    """
+
+    def __init__(self, quantity, rule_type, operator, limit, samples=1, action=OUTPUT_OFF, value=0):
+        """Constructor
+
+        :param quantity: One of QUANTITIES
+        :type quantity: str
+        :param rule_type: THRESHOLD or RATE
+        :type rule_type: str
+        :param operator: ABOVE or BELOW
+        :type operator: str
+        :param limit: The limit. Unit is that of the quantity, per second for RATE rules
+        :type limit: float
+        :param samples: Number of consecutive samples the condition has to hold
+        :type samples: int
+        :param action: One of ACTIONS
+        :type action: str
+        :param value: Voltage in mV for SET_VOLTAGE or current in mA for SET_CURRENT
+        :type value: int
+        :raise: ValueError if a parameter is invalid
+        """
+        if quantity not in QUANTITIES:
+            raise ValueError("Unknown quantity: " + str(quantity))
+        if rule_type not in RULE_TYPES:
+            raise ValueError("Unknown rule type: " + str(rule_type))
+        if operator not in OPERATORS:
+            raise ValueError("Unknown operator: " + str(operator))
+        if action not in ACTIONS:
+            raise ValueError("Unknown action: " + str(action))
+        if samples < 1:
+            raise ValueError("Samples must be at least 1")
+        self.quantity = quantity
+        self.rule_type = rule_type
+        self.operator = operator
+        self.limit = float(limit)
+        self.samples = int(samples)
+        self.action = action
+        self.value = int(value)
+
+        self.trigger_count = 0
+        self.last_trigger_time = None
+        self.last_latency = None
+        self.last_error = None
+        self._consecutive = 0
+        self._triggered = False
+        self._previous_timestamp = None
+        self._previous_value = None
+
+    @classmethod
+    def from_dict(cls, rule_dict):
+        """Creates a rule from a dict with the constructor parameters as keys. 'type' is used for rule_type
+
+        :param rule_dict: Rule parameters
+        :type rule_dict: dict
+        :return: AlarmRule -- The rule
+        :raise: ValueError if a parameter is missing or invalid
+        """
+        try:
+            return cls(rule_dict['quantity'], rule_dict.get('type', THRESHOLD), rule_dict.get('operator', ABOVE),
+                       rule_dict['limit'], rule_dict.get('samples', 1), rule_dict.get('action', OUTPUT_OFF),
+                       rule_dict.get('value', 0))
+        except KeyError as e:
+            raise ValueError("Missing rule parameter: " + str(e))
+
+    def to_dict(self):
+        """Gets the rule parameters and trigger statistics
+
+        :return: dict -- JSON serializable rule description
+        """
+        return {
+            "quantity": self.quantity,
+            "type": self.rule_type,
+            "operator": self.operator,
+            "limit": self.limit,
+            "samples": self.samples,
+            "action": self.action,
+            "value": self.value,
+            "trigger_count": self.trigger_count,
+            "last_trigger_time": self.last_trigger_time,
+            "last_latency_ms": None if self.last_latency is None else round(self.last_latency * 1000, 3),
+            "last_error": self.last_error}
+
+    def evaluate(self, timestamp, device_values):
+        """Evaluates the rule on a new sample
+
+        :param timestamp: Sample timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: bool -- If the rule triggers on this sample
+        """
+        value = quantity_value(self.quantity, device_values)
+        if self.rule_type == RATE:
+            previous_timestamp, previous_value = self._previous_timestamp, self._previous_value
+            self._previous_timestamp, self._previous_value = timestamp, value
+            if previous_timestamp is None or timestamp <= previous_timestamp:
+                return False
+            value = (value - previous_value) / (timestamp - previous_timestamp)
+
+        holds = value > self.limit if self.operator == ABOVE else value < self.limit
+        if not holds:
+            self._consecutive = 0
+            self._triggered = False
+            return False
+        self._consecutive += 1
+        if self._triggered or self._consecutive < self.samples:
+            return False
+        self._triggered = True
+        return True
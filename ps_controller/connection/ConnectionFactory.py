@@ -1,8 +1,16 @@
+import collections
+import os
+import re
+
+from ..connection.TcpConnection import TcpConnection
 from ..connection.UsbConnection import UsbConnection
 from ps_controller import SerialParser
 from ..logging.CustomLoggerInterface import CustomLoggerInterface
+from ..simulation.SimulatedPs201 import SimulatedPs201
+from ..simulation.SimulatedSerialLink import SimulatedSerialLink
 
 import serial
+import serial.tools.list_ports
 from ps_controller.Constants import Constants
 
 
@@ -16,6 +24,7 @@ class ConnectionFactory:
         :return: None
         """
         self._usb_connection = None
+        self._simulated_connection = None
         self.logger = logger
 
     def get_connection(self, connection_type):
@@ -29,13 +38,89 @@ class ConnectionFactory:
             if self._usb_connection:
                 return self._usb_connection
             else:
-                self._usb_connection = UsbConnection(
-                    logger=self.logger,
-                    serial_link_generator=self._get_serial_link,
-                    handshake_message=ConnectionFactory._get_device_message_id(),
-                    device_verification_func=self._device_id_response_function,
-                    device_start_end_byte=ord(Constants.START))
+                self._usb_connection = self.create_usb_connection()
             return self._usb_connection
+        elif connection_type == "simulated":
+            if not self._simulated_connection:
+                self._simulated_connection = self.create_simulated_connection(SimulatedPs201())
+            return self._simulated_connection
+
+    def discover_usb_ports(self):
+        """Finds the ports of every device connected to the host
+
+        :return: collections.OrderedDict[str, str] -- Port names by device id. The id is the USB serial number of
+            the port, or the port name if the port has no serial number
+        """
+        ports = collections.OrderedDict()
+        # pyserial 2.7 lists ports as (port, description, hwid) tuples. Later versions still unpack the same way
+        for port, description, hardware_id in sorted(serial.tools.list_ports.comports(), key=lambda x: x[0]):
+            connection = self.create_usb_connection(port_range=[port])
+            if not connection.connect():
+                continue
+            connection.disconnect()
+            device_id = ConnectionFactory._serial_number(hardware_id) or os.path.basename(port)
+            if device_id in ports:
+                device_id += "-" + os.path.basename(port)
+            self.logger.log_debug("Found device " + device_id + " on port " + port)
+            ports[device_id] = port
+        return ports
+
+    @staticmethod
+    def _serial_number(hardware_id):
+        """Gets the USB serial number from the hardware id of a port, e.g. "USB VID:PID=0403:6001 SER=A900B1C2"
+
+        :param hardware_id: The hardware id as listed by pyserial
+        :type hardware_id: str
+        :return: str or None -- The serial number. None if the hardware id has none
+        """
+        match = re.search(r'\bS(?:ER|NR)=(\S+)', hardware_id or "")
+        return match.group(1) if match else None
+
+    def create_usb_connection(self, port_range=None):
+        """Creates a connection to a device on a USB port
+
+        :param port_range: Ports to look for the device on. None for the typical usb ports of the OS
+        :type port_range: list[str|int]
+        :return: BaseConnectionInterface -- Connection object
+        """
+        return UsbConnection(
+            logger=self.logger,
+            serial_link_generator=self._get_serial_link,
+            handshake_message=ConnectionFactory._get_device_message_id(),
+            device_verification_func=self._device_id_response_function,
+            device_start_end_byte=ord(Constants.START),
+            port_range=port_range)
+
+    def create_tcp_connection(self, address):
+        """Creates a connection to a device behind a serial to TCP bridge, see psBridgeMain
+
+        :param address: "host:port" of the bridge
+        :type address: str
+        :return: BaseConnectionInterface -- Connection object
+        """
+        return TcpConnection(
+            logger=self.logger,
+            address=address,
+            device_start_end_byte=ord(Constants.START),
+            handshake_message=ConnectionFactory._get_device_message_id(),
+            device_verification_func=self._device_id_response_function)
+
+    def create_simulated_connection(self, simulated_device, baudrate=9600):
+        """Creates a connection to a simulated device
+
+        :param simulated_device: The simulated device to connect to
+        :type simulated_device: SimulatedPs201
+        :param baudrate: Baud rate of the emulated serial line. None to transfer instantly
+        :type baudrate: int
+        :return: BaseConnectionInterface -- Connection object
+        """
+        return UsbConnection(
+            logger=self.logger,
+            serial_link_generator=lambda: SimulatedSerialLink(simulated_device, baudrate=baudrate),
+            handshake_message=ConnectionFactory._get_device_message_id(),
+            device_verification_func=self._device_id_response_function,
+            device_start_end_byte=ord(Constants.START),
+            port_range=["simulated"])
 
     @staticmethod
     def _get_device_message_id():
@@ -0,0 +1,129 @@
+import socket
+import threading
+
+import serial
+
+from .SerialConnectionInterface import SerialConnectionInterface
+from ..logging.CustomLoggerInterface import CustomLoggerInterface
+
+
+class SerialTcpBridge:
+    """Makes a serial link available on a TCP port, one client at a time.
+
+    Bytes are forwarded unchanged in both directions, so a TcpConnection on another machine talks to the device as
+    if it were plugged in there.
+    """
+
+    def __init__(self, serial_link, logger, host="0.0.0.0", port=4001, read_size=256):
+        """Constructor
+
+        :param serial_link: The serial link to the device. Its read timeout bounds the added latency
+        :type serial_link: SerialConnectionInterface
+        :param logger: Used to log messages
+        :type logger: CustomLoggerInterface
+        :param host: Address to listen on
+        :type host: str
+        :param port: Port to listen on. 0 to pick a free port
+        :type port: int
+        :param read_size: Maximum bytes read from the serial link at once
+        :type read_size: int
+        """
+        self._serial_link = serial_link
+        self._logger = logger
+        self._host = host
+        self._port = port
+        self._read_size = read_size
+        self._server_socket = None
+        self._client = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Opens the serial link and starts accepting clients on a background thread
+
+        :return: None
+        """
+        if not self._serial_link.isOpen():
+            self._serial_link.open()
+        self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server_socket.bind((self._host, self._port))
+        self._server_socket.listen(1)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._accept_clients, name="SerialTcpBridge", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Disconnects the client, stops listening and closes the serial link
+
+        :return: None
+        """
+        self._stop_event.set()
+        self._close_client()
+        if self._server_socket is not None:
+            # Closing alone does not wake up a thread blocked in accept
+            try:
+                self._server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server_socket.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._serial_link.close()
+
+    def address(self):
+        """Gets the address the bridge listens on
+
+        :return: tuple(str, int) -- (host, port)
+        """
+        return self._server_socket.getsockname()[:2]
+
+    def _accept_clients(self):
+        while not self._stop_event.is_set():
+            try:
+                client, client_address = self._server_socket.accept()
+            except OSError:
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._logger.log_debug("Bridge client connected from " + str(client_address))
+            self._client = client
+            serial_reader = threading.Thread(target=self._forward_from_serial, args=(client,),
+                                             name="SerialTcpBridgeReader", daemon=True)
+            serial_reader.start()
+            self._forward_to_serial(client)
+            self._close_client()
+            serial_reader.join()
+            self._logger.log_debug("Bridge client disconnected")
+
+    def _forward_to_serial(self, client):
+        while not self._stop_event.is_set():
+            try:
+                data = client.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            try:
+                self._serial_link.write(data)
+            except serial.SerialException as e:
+                self._logger.log_error("Bridge could not write to serial link: " + str(e))
+                return
+
+    def _forward_from_serial(self, client):
+        while self._client is client:
+            try:
+                data = self._serial_link.read(self._read_size)
+                if data:
+                    client.sendall(data)
+            except (OSError, serial.SerialException):
+                return
+
+    def _close_client(self):
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
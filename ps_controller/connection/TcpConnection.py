@@ -0,0 +1,161 @@
+import socket
+import time
+
+from .BaseConnectionInterface import BaseConnectionInterface
+from ..logging.CustomLoggerInterface import CustomLoggerInterface
+
+
+def parse_address(address, default_port=4001):
+    """Splits a network address into host and port
+
+    :param address: "host:port" or "host"
+    :type address: str
+    :param default_port: Port used if the address has none
+    :type default_port: int
+    :return: tuple(str, int) -- (host, port)
+    :raise: ValueError if the port is not a number
+    """
+    host, separator, port = address.rpartition(':')
+    if not separator:
+        return address, default_port
+    return host, int(port)
+
+
+class TcpConnection(BaseConnectionInterface):
+    """Connection to a device behind a serial to TCP bridge on another machine.
+
+    The socket is kept open between transactions, Nagle's algorithm is disabled so small frames are sent at once,
+    and every read has a deadline instead of a per byte timeout.
+    """
+
+    def __init__(
+            self,
+            logger,
+            address,
+            device_start_end_byte,
+            handshake_message=None,
+            device_verification_func=None,
+            timeout=1.0,
+            connect_timeout=2.0):
+        """Constructor
+
+        :param logger: Logger to log messages
+        :type logger: CustomLoggerInterface
+        :param address: "host:port" of the bridge
+        :type address: str
+        :param device_start_end_byte: The byte that should start and end all device communications
+        :type device_start_end_byte: int
+        :param handshake_message: Serial package sent to device for handshake when connecting. None for no handshake
+        :type handshake_message: bytes
+        :param device_verification_func: Function used to verify handshake sent to device
+        :type device_verification_func: lambda x: func(device_serial_response: bytes , address: str) -> bool
+        :param timeout: Seconds a read of a response may take
+        :type timeout: float
+        :param connect_timeout: Seconds connecting to the bridge may take
+        :type connect_timeout: float
+        :return: None
+        """
+        self._logger = logger
+        self._address = address
+        self._host, self._port = parse_address(address)
+        self._device_start_end_byte = device_start_end_byte
+        self._handshake_message = handshake_message
+        self._device_verification_func = device_verification_func
+        self._timeout = timeout
+        self._connect_timeout = connect_timeout
+        self._socket = None
+        self._buffer = bytearray()
+
+    def connect(self):
+        if self._socket is not None:
+            return True
+        try:
+            self._socket = socket.create_connection((self._host, self._port), self._connect_timeout)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            self._logger.log_debug("Could not connect to " + self._address + ": " + str(e))
+            self._socket = None
+            return False
+        self._buffer = bytearray()
+        if self._handshake_message is not None:
+            self._logger.log_debug("Sending handshake data to " + self._address)
+            self.set(self._handshake_message)
+            response = self.get()
+            if not response or not self._device_verification_func(response, self._address):
+                self.disconnect()
+                return False
+        return True
+
+    def disconnect(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._buffer = bytearray()
+
+    def connected(self):
+        return self._socket is not None
+
+    def get(self):
+        if self._socket is None:
+            return None
+        deadline = time.monotonic() + self._timeout
+        while True:
+            frame = self._take_frame()
+            if frame is not None:
+                return frame
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # A partial frame would corrupt the next response
+                self._buffer = bytearray()
+                return b''
+            try:
+                self._socket.settimeout(remaining)
+                data = self._socket.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                self._lost(e)
+                return None
+            if not data:
+                self._lost("closed by bridge")
+                return None
+            self._buffer += data
+
+    def set(self, sending_data):
+        if self._socket is None:
+            return
+        # Anything still buffered belongs to an earlier transaction that timed out
+        self._buffer = bytearray()
+        try:
+            self._socket.settimeout(self._timeout)
+            self._socket.sendall(sending_data)
+        except OSError as e:
+            self._lost(e)
+
+    def has_available_ports(self):
+        # No local ports are involved, so there are no permission problems to report
+        return True
+
+    def _take_frame(self):
+        """Removes the first complete frame from the receive buffer
+
+        :return: bytes or None -- The frame. None if no complete frame has been received
+        """
+        start = self._buffer.find(self._device_start_end_byte)
+        if start < 0:
+            self._buffer = bytearray()
+            return None
+        end = self._buffer.find(self._device_start_end_byte, start + 1)
+        if end < 0:
+            del self._buffer[:start]
+            return None
+        frame = bytes(self._buffer[start:end + 1])
+        del self._buffer[:end + 1]
+        return frame
+
+    def _lost(self, reason):
+        self._logger.log_error("Lost connection to " + self._address + ": " + str(reason))
+        self.disconnect()
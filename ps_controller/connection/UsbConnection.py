@@ -1,8 +1,15 @@
 import glob
+import time
 import serial
 from .BaseConnectionInterface import BaseConnectionInterface
 import ps_controller.utilities.OsHelper as osHelper
 from ..logging.CustomLoggerInterface import CustomLoggerInterface
+from ..metrics.Metrics import Counter, Histogram
+from ..tracing import Tracing
+
+CONNECTS = Counter("ps201_usb_connects_total", "Attempts to connect to a device over USB", ("result",))
+PORT_SCAN_SECONDS = Histogram("ps201_usb_port_scan_seconds", "Duration of scanning the USB ports for a device",
+                              buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
 
 
 class UsbConnection(BaseConnectionInterface):
@@ -12,7 +19,8 @@ class UsbConnection(BaseConnectionInterface):
             serial_link_generator,
             handshake_message,
             device_verification_func,
-            device_start_end_byte):
+            device_start_end_byte,
+            port_range=None):
         """
 
         :param logger: Logger to log messages
@@ -25,6 +33,8 @@ class UsbConnection(BaseConnectionInterface):
         :type device_verification_func: lambda x: func(device_serial_response: bytes , usb_port: int) -> bool
         :param device_start_end_byte: The byte that should start and end all device communications
         :type device_start_end_byte: int
+        :param port_range: Ports to look for the device on. None for the typical usb ports of the OS
+        :type port_range: list[str|int]
         :return: None
         """
         self._logger = logger
@@ -34,19 +44,33 @@ class UsbConnection(BaseConnectionInterface):
         self._base_connection = serial_link_generator()
         self._connected = False
         self._device_start_end_byte = device_start_end_byte
+        self._port_range = port_range
 
     def connect(self):
         if self._connected:
             return True
+        start = time.perf_counter()
+        trace = Tracing.begin("connect", start) if Tracing.hooks else None
         available_ports = self._available_usb_ports()
+        if trace:
+            trace.mark("list_ports")
         for port in available_ports:
-            if self._device_on_port(port):
+            device_on_port = self._device_on_port(port)
+            if trace:
+                trace.mark("handshake " + str(port))
+            if device_on_port:
                 if self._base_connection.isOpen():
                     self._base_connection.close()
                 self._base_connection.port = port
                 self._base_connection.open()
                 self._connected = self._base_connection.isOpen()
+                if trace:
+                    trace.mark("open")
                 break
+        PORT_SCAN_SECONDS.observe(time.perf_counter() - start)
+        CONNECTS.labels("connected" if self._connected else "not_found").inc()
+        if trace:
+            Tracing.finish(trace, None if self._connected else "No device found")
         return self._connected
 
     def disconnect(self):
@@ -70,7 +94,7 @@ class UsbConnection(BaseConnectionInterface):
             self._connected = False
 
     def has_available_ports(self):
-        usb_ports_range = self._usb_port_range()
+        usb_ports_range = self._ports_to_scan()
         for port in usb_ports_range:
             try:
                 tmp_connection = self._serial_link_generator()
@@ -88,7 +112,7 @@ class UsbConnection(BaseConnectionInterface):
         :return: list[str|int] -- List of available ports. Contains port name or port number
         """
         available = []
-        usb_ports = self._usb_port_range()
+        usb_ports = self._ports_to_scan()
         for port in usb_ports:
             try:
                 tmp_connection = self._serial_link_generator()
@@ -107,11 +131,17 @@ class UsbConnection(BaseConnectionInterface):
         :type serial_connection: SerialConnectionInterface
         :return: bytes -- Serial response from device
         """
+        trace = Tracing.current() if Tracing.hooks else None
+        if trace:
+            read_start = first_byte_time = time.perf_counter()
         line = bytearray()
         start_count = 0
         while True:
             c = serial_connection.read(1)
             if c:
+                if trace and not line:
+                    first_byte_time = time.perf_counter()
+                    trace.add_span("connection.first_byte", read_start, first_byte_time)
                 line += c
             else:
                 break
@@ -120,6 +150,8 @@ class UsbConnection(BaseConnectionInterface):
                 start_count += 1
             if start_count == 2:
                 break
+        if trace:
+            trace.add_span("connection.frame" if line else "connection.timeout", first_byte_time, time.perf_counter())
         return bytes(line)
 
     def _device_on_port(self, usb_port):
@@ -141,6 +173,15 @@ class UsbConnection(BaseConnectionInterface):
         tmp_connection.close()
         return self._device_verification_func(device_serial_response, usb_port)
 
+    def _ports_to_scan(self):
+        """Gets the ports to look for the device on
+
+        :return: list[int|str] -- List of port numbers or names
+        """
+        if self._port_range is not None:
+            return self._port_range
+        return self._usb_port_range()
+
     @staticmethod
     def _usb_port_range():
         """Gets typical USB port ranges for each OS
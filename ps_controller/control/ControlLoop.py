@@ -0,0 +1,178 @@
+import collections
+import math
+import time
+
+from ps_controller import PsControllerException
+from .Controllers import Controller
+from .SafetyEnvelope import SafetyEnvelope
+from ..acquisition.AcquisitionLoop import AcquisitionLoop
+from ..device.BaseDeviceInterface import BaseDeviceInterface
+from ..jobs.Job import Job, JobCancelled
+
+
+class ControlLoopJob(Job):
+    """Runs a software control loop on the device as fast as the link allows.
+
+    Every iteration reads the device, checks the reading against the safety envelope, lets the controller compute
+    new targets and writes the targets that changed. The loop stops when the output is turned off, e.g. by an alarm.
+    While running, background acquisition is paused and the loop readings are published to the acquisition
+    listeners instead, so the link is not shared and the history, recording and alarms keep receiving samples.
+    """
+
+    name = "control"
+
+    def __init__(self, device, controller, envelope, duration=None, min_period=0.0, acquisition=None,
+                 recent_errors=100):
+        """Constructor
+
+        :param device: The device to control
+        :type device: BaseDeviceInterface
+        :param controller: Computes the targets
+        :type controller: Controller
+        :param envelope: Limits of the targets and readings
+        :type envelope: SafetyEnvelope
+        :param duration: Seconds to run. None to run until cancelled
+        :type duration: float
+        :param min_period: Minimum seconds between iterations. 0 to run as fast as possible
+        :type min_period: float
+        :param acquisition: Acquisition loop to pause and publish readings to. None if there is none
+        :type acquisition: AcquisitionLoop
+        :param recent_errors: Number of latest iterations the recent error statistics are computed over
+        :type recent_errors: int
+        """
+        Job.__init__(self)
+        self._device = device
+        self._controller = controller
+        self._envelope = envelope
+        self._duration = duration
+        self._min_period = min_period
+        self._acquisition = acquisition
+        self._iterations = 0
+        self._writes = 0
+        self._loop_time = 0.0
+        self._max_period = 0.0
+        self._error_sum = 0.0
+        self._error_square_sum = 0.0
+        self._last_error = None
+        self._recent_errors = collections.deque(maxlen=recent_errors)
+        self._targets = (None, None)
+        self._tripped = None
+
+    def result(self):
+        recent = list(self._recent_errors)
+        return {
+            "controller": self._controller.description(),
+            "envelope": self._envelope.description(),
+            "iterations": self._iterations,
+            "writes": self._writes,
+            "loop_rate_hz": round(self._iterations / self._loop_time, 2) if self._loop_time else 0.0,
+            "period_max_ms": round(self._max_period * 1000, 3),
+            "error_unit": self._controller.error_unit,
+            "error_last": self._last_error,
+            "error_mean": self._error_sum / self._iterations if self._iterations else None,
+            "error_rms": math.sqrt(self._error_square_sum / self._iterations) if self._iterations else None,
+            "error_recent_rms": math.sqrt(sum(x * x for x in recent) / len(recent)) if recent else None,
+            "target_voltage_mV": self._targets[0],
+            "target_current_mA": self._targets[1],
+            "tripped": self._tripped}
+
+    def run(self):
+        if self._acquisition:
+            self._acquisition.pause()
+        try:
+            self._control()
+        except JobCancelled:
+            raise
+        except Exception:
+            if not self._tripped:
+                self._turn_output_off()
+            raise
+        finally:
+            if self._acquisition:
+                self._acquisition.resume()
+
+    def _control(self):
+        device_values = self._read()
+        self._controller.reset(device_values)
+        self._targets = (device_values.target_voltage, device_values.target_current)
+        start = time.monotonic()
+        previous = start
+        while True:
+            self._check_cancelled()
+            device_values = self._read()
+            now = time.monotonic()
+
+            violation = self._envelope.violation(device_values)
+            if violation:
+                self._trip(violation)
+            if not device_values.output_is_on:
+                raise PsControllerException("Output is off")
+
+            voltage, current = self._envelope.clamp(*self._controller.update(device_values, now - previous))
+            self._write(voltage, current)
+
+            error = self._controller.error(device_values)
+            self._last_error = error
+            self._error_sum += error
+            self._error_square_sum += error * error
+            self._recent_errors.append(error)
+            self._iterations += 1
+            self._max_period = max(self._max_period, now - previous)
+            previous = now
+            self._loop_time = time.monotonic() - start
+
+            if self._duration is not None:
+                if self._loop_time >= self._duration:
+                    return
+                self._set_progress(self._loop_time / self._duration)
+            if self._min_period:
+                self._wait(previous + self._min_period - time.monotonic())
+
+    def _read(self):
+        """Reads the device and publishes the reading to the acquisition listeners
+
+        :return: DeviceValues -- The reading
+        :raise: PsControllerException if the device could not be read
+        """
+        device_values = self._device.get_all_values()
+        if device_values is None:
+            raise PsControllerException("Could not read the device")
+        if self._acquisition:
+            self._acquisition.publish(time.time(), device_values)
+        return device_values
+
+    def _write(self, voltage, current):
+        """Writes the targets that differ from the last written targets
+
+        :return: None
+        """
+        if current != self._targets[1]:
+            self._device.set_target_current(current)
+            self._writes += 1
+        if voltage != self._targets[0]:
+            self._device.set_target_voltage(voltage)
+            self._writes += 1
+        self._targets = (voltage, current)
+
+    def _turn_output_off(self):
+        """Turns the output off after the loop failed, so it is not left on at the last written targets.
+        Best effort, as the failure may be a lost connection
+
+        :return: None
+        """
+        try:
+            self._device.set_output_on(False, high_priority=True)
+        except PsControllerException:
+            pass
+
+    def _trip(self, violation):
+        """Turns the output off and stops the loop
+
+        :param violation: Description of the exceeded limit
+        :type violation: str
+        :return: None
+        :raise: PsControllerException always
+        """
+        self._tripped = violation
+        self._device.set_output_on(False, high_priority=True)
+        raise PsControllerException("Safety envelope exceeded: " + violation)
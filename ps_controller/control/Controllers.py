@@ -0,0 +1,191 @@
+from ps_controller.DeviceValues import DeviceValues
+
+CONSTANT_POWER = "constant_power"
+CONSTANT_RESISTANCE = "constant_resistance"
+
+
+class Controller:
+    """Computes new device targets from the latest reading. Subclasses implement one regulation mode"""
+
+    name = "controller"
+    error_unit = ""
+
+    def reset(self, device_values):
+        """Initializes the controller state from the reading taken before the first update
+
+        :param device_values: The device values when the control loop starts
+        :type device_values: DeviceValues
+        :return: None
+        """
+        pass
+
+    def error(self, device_values):
+        """Gets the control error of a reading
+
+        :param device_values: The device values
+        :type device_values: DeviceValues
+        :return: float -- Set point minus measured value in error_unit
+        """
+        raise NotImplementedError()
+
+    def update(self, device_values, dt):
+        """Computes the targets to write after a reading
+
+        :param device_values: The latest device values
+        :type device_values: DeviceValues
+        :param dt: Seconds since the previous reading
+        :type dt: float
+        :return: tuple(float, float) -- (target voltage in mV, target current in mA)
+        """
+        raise NotImplementedError()
+
+    def description(self):
+        """Gets the controller parameters
+
+        :return: dict -- JSON serializable parameters
+        """
+        return {"mode": self.name}
+
+
+class PiController:
+    """Discrete PI controller with output clamping and anti windup by stopping integration while saturated"""
+
+    def __init__(self, kp, ki, output_min, output_max):
+        """Constructor
+
+        :param kp: Proportional gain
+        :type kp: float
+        :param ki: Integral gain per second
+        :type ki: float
+        :param output_min: Lowest output
+        :type output_min: float
+        :param output_max: Highest output
+        :type output_max: float
+        """
+        self.kp = kp
+        self.ki = ki
+        self.output_min = output_min
+        self.output_max = output_max
+        self._integral = 0.0
+
+    def reset(self, output):
+        """Sets the integral so the output with zero error equals output, for a bumpless start
+
+        :param output: The current output
+        :type output: float
+        :return: None
+        """
+        self._integral = min(max(output, self.output_min), self.output_max)
+
+    def update(self, error, dt):
+        """Computes the output for a new error
+
+        :param error: Set point minus measured value
+        :type error: float
+        :param dt: Seconds since the previous update
+        :type dt: float
+        :return: float -- Clamped output
+        """
+        integral = self._integral + self.ki * error * dt
+        output = integral + self.kp * error
+        if output > self.output_max:
+            output = self.output_max
+            integral = min(integral, self._integral)
+        elif output < self.output_min:
+            output = self.output_min
+            integral = max(integral, self._integral)
+        self._integral = integral
+        return output
+
+
+class ConstantPowerController(Controller):
+    """Regulates the target voltage so the output delivers a constant power. The current limit is kept fixed"""
+
+    name = CONSTANT_POWER
+    error_unit = "mW"
+
+    def __init__(self, power, max_voltage, current_limit, kp=4.0, ki=40.0):
+        """Constructor
+
+        :param power: Power set point in mW
+        :type power: float
+        :param max_voltage: Highest target voltage the controller may write in mV
+        :type max_voltage: float
+        :param current_limit: Current limit written with every voltage in mA
+        :type current_limit: float
+        :param kp: Proportional gain in mV per mW of error
+        :type kp: float
+        :param ki: Integral gain in mV per mW of error and second
+        :type ki: float
+        """
+        self.power = float(power)
+        self.current_limit = current_limit
+        self._pi = PiController(kp, ki, 0.0, max_voltage)
+
+    def reset(self, device_values):
+        self._pi.reset(device_values.target_voltage)
+
+    def error(self, device_values):
+        return self.power - device_values.output_voltage * device_values.output_current / 1000.0
+
+    def update(self, device_values, dt):
+        return self._pi.update(self.error(device_values), dt), self.current_limit
+
+    def description(self):
+        return {"mode": self.name, "power_mW": self.power, "kp": self._pi.kp, "ki": self._pi.ki}
+
+
+class ConstantResistanceController(Controller):
+    """Makes the output behave like a voltage source with a constant series resistance.
+
+    The target voltage follows open_voltage - resistance * output current. Each update moves the target by the
+    fraction smoothing of the remaining difference, which keeps the loop stable for series resistances up to about
+    (2 / smoothing - 1) times the load resistance.
+    """
+
+    name = CONSTANT_RESISTANCE
+    error_unit = "mV"
+
+    def __init__(self, resistance, open_voltage, current_limit, smoothing=0.5):
+        """Constructor
+
+        :param resistance: Series resistance in ohm
+        :type resistance: float
+        :param open_voltage: Output voltage without load in mV
+        :type open_voltage: float
+        :param current_limit: Current limit written with every voltage in mA
+        :type current_limit: float
+        :param smoothing: Fraction of the difference to the wanted voltage applied per update. 0 < smoothing <= 1
+        :type smoothing: float
+        """
+        if not 0 < smoothing <= 1:
+            raise ValueError("Smoothing must be in (0, 1]")
+        self.resistance = float(resistance)
+        self.open_voltage = float(open_voltage)
+        self.current_limit = current_limit
+        self.smoothing = smoothing
+        self._target_voltage = 0.0
+
+    def reset(self, device_values):
+        self._target_voltage = float(device_values.target_voltage)
+
+    def wanted_voltage(self, device_values):
+        """Gets the output voltage of the emulated source at the measured current
+
+        :param device_values: The device values
+        :type device_values: DeviceValues
+        :return: float -- Voltage in mV, never below zero
+        """
+        # mA * ohm gives mV
+        return max(self.open_voltage - self.resistance * device_values.output_current, 0.0)
+
+    def error(self, device_values):
+        return self.wanted_voltage(device_values) - device_values.output_voltage
+
+    def update(self, device_values, dt):
+        self._target_voltage += self.smoothing * (self.wanted_voltage(device_values) - self._target_voltage)
+        return self._target_voltage, self.current_limit
+
+    def description(self):
+        return {"mode": self.name, "resistance_ohm": self.resistance, "open_voltage_mV": self.open_voltage,
+                "smoothing": self.smoothing}
@@ -0,0 +1,71 @@
+from ps_controller.DeviceValues import DeviceValues
+
+# Highest targets the PS201 accepts. UsbDevice does not send higher targets
+DEVICE_MAX_VOLTAGE = 20000
+DEVICE_MAX_CURRENT = 1000
+
+
+class SafetyEnvelope:
+    """Hard limits of a control loop.
+
+    Targets written by the loop are clamped to the envelope, and a reading outside of it stops the loop and turns
+    the output off.
+    """
+
+    def __init__(self, max_voltage, max_current, max_power=None):
+        """Constructor
+
+        :param max_voltage: Highest target and output voltage in mV
+        :type max_voltage: float
+        :param max_current: Highest target and output current in mA
+        :type max_current: float
+        :param max_power: Highest output power in mW. None for no power limit
+        :type max_power: float
+        :raise: ValueError if a limit is not positive or above what the device accepts
+        """
+        if max_voltage <= 0 or max_current <= 0 or (max_power is not None and max_power <= 0):
+            raise ValueError("Safety limits must be positive")
+        if max_voltage > DEVICE_MAX_VOLTAGE or max_current > DEVICE_MAX_CURRENT:
+            raise ValueError("Safety limits must be at most {0} mV and {1} mA".format(DEVICE_MAX_VOLTAGE,
+                                                                                   DEVICE_MAX_CURRENT))
+        self.max_voltage = max_voltage
+        self.max_current = max_current
+        self.max_power = max_power
+
+    def clamp(self, voltage, current):
+        """Clamps targets to the envelope
+
+        :param voltage: Target voltage in mV
+        :type voltage: float
+        :param current: Target current in mA
+        :type current: float
+        :return: tuple(int, int) -- (target voltage in mV, target current in mA) within the envelope
+        """
+        voltage = int(round(min(max(voltage, 0), self.max_voltage)))
+        current = int(round(min(max(current, 0), self.max_current)))
+        return voltage, current
+
+    def violation(self, device_values):
+        """Checks a reading against the envelope
+
+        :param device_values: The device values
+        :type device_values: DeviceValues
+        :return: str or None -- Description of the exceeded limit. None if the reading is within the envelope
+        """
+        if device_values.output_voltage > self.max_voltage:
+            return "Output voltage {0} mV above {1} mV".format(device_values.output_voltage, self.max_voltage)
+        if device_values.output_current > self.max_current:
+            return "Output current {0} mA above {1} mA".format(device_values.output_current, self.max_current)
+        if self.max_power is not None:
+            power = device_values.output_voltage * device_values.output_current / 1000.0
+            if power > self.max_power:
+                return "Output power {0:.0f} mW above {1} mW".format(power, self.max_power)
+        return None
+
+    def description(self):
+        """Gets the limits
+
+        :return: dict -- JSON serializable limits
+        """
+        return {"max_voltage_mV": self.max_voltage, "max_current_mA": self.max_current,
+                "max_power_mW": self.max_power}
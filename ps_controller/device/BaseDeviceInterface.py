@@ -33,31 +33,37 @@ class BaseDeviceInterface:
         """
         raise NotImplementedError()
 
-    def set_target_voltage(self, voltage):
+    def set_target_voltage(self, voltage, high_priority=False):
         """Set the target voltage of the connected device
 
         :param voltage: The voltage to set in mV
         :type voltage: int
+        :param high_priority: If True the command is sent before waiting normal priority commands
+        :type high_priority: bool
         :return: None
         :raise: PsControllerException
         """
         raise NotImplementedError()
 
-    def set_target_current(self, current):
+    def set_target_current(self, current, high_priority=False):
         """Set the target current of the connected device
 
         :param current: The current to set in mA
         :type current: int
+        :param high_priority: If True the command is sent before waiting normal priority commands
+        :type high_priority: bool
         :return: None
         :raise: PsControllerException
         """
         raise NotImplementedError()
 
-    def set_output_on(self, is_on):
+    def set_output_on(self, is_on, high_priority=False):
         """Set if output on connected device is on or off
 
         :param is_on: Whether output should be set on or off
         :type is_on: bool
+        :param high_priority: If True the command is sent before waiting normal priority commands
+        :type high_priority: bool
         :return: None
         :raise: PsControllerException
         """
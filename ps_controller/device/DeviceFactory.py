@@ -1,4 +1,7 @@
+import collections
+
 from ..connection.ConnectionFactory import ConnectionFactory
+from ..simulation.SimulatedPs201 import SimulatedPs201
 from .UsbDevice import UsbDevice
 from ..logging.CustomLogger import CustomLogger
 from ..logging.CustomLoggerInterface import CustomLoggerInterface
@@ -10,11 +13,12 @@ class DeviceFactory:
     """Generates device interfaces"""
     def __init__(self):
         self._usb_device = None
+        self._simulated_device = None
 
     def get_device(self, device_type, logger=None):
         """Gets a device of device type
 
-        :param device_type: Which device type to get
+        :param device_type: Which device type to get, "usb" or "simulated"
         :type device_type: str
         :param logger: Logger used for logging messages
         :type logger: CustomLoggerInterface
@@ -29,3 +33,75 @@ class DeviceFactory:
             else:
                 self._usb_device = UsbDevice(connection, logger)
                 return self._usb_device
+        elif device_type == "simulated":
+            if not self._simulated_device:
+                self._simulated_device = UsbDevice(connection, logger)
+            return self._simulated_device
+
+    def discover(self, device_type, logger=None, simulated_count=1, addresses=None):
+        """Finds every device of device type without keeping connections open
+
+        :param device_type: Which device type to find, "usb", "tcp" or "simulated"
+        :type device_type: str
+        :param logger: Logger used for logging messages
+        :type logger: CustomLoggerInterface
+        :param simulated_count: Number of devices to report if device_type is "simulated"
+        :type simulated_count: int
+        :param addresses: "host:port" of the bridge of every device if device_type is "tcp"
+        :type addresses: list[str]
+        :return: collections.OrderedDict[str, str] -- Port of every device by a device id that stays the same
+            between runs. For "usb" the id is the USB serial number. For "tcp" both the id and the port are the
+            bridge address. Simulated devices have no port
+        """
+        if device_type == "usb":
+            return ConnectionFactory(logger or CustomLogger(logging.ERROR)).discover_usb_ports()
+        elif device_type == "tcp":
+            return collections.OrderedDict((address, address) for address in addresses or [])
+        elif device_type == "simulated":
+            return collections.OrderedDict(("sim{0}".format(i), None) for i in range(simulated_count))
+        return collections.OrderedDict()
+
+    def create_device(self, device_type, logger=None, port=None):
+        """Creates a new device with its own connection. Unlike get_device nothing is cached
+
+        :param device_type: Which device type to create, "usb", "tcp" or "simulated"
+        :type device_type: str
+        :param logger: Logger used for logging messages
+        :type logger: CustomLoggerInterface
+        :param port: Port of a "usb" device as returned by discover. None to use the first device found. For "tcp"
+            the "host:port" of the bridge
+        :type port: str
+        :return: BaseDeviceInterface -- The device
+        """
+        if not logger:
+            logger = CustomLogger(logging.ERROR)
+        connection_factory = ConnectionFactory(logger)
+        if device_type == "usb":
+            connection = connection_factory.create_usb_connection(None if port is None else [port])
+        elif device_type == "tcp":
+            if not port:
+                raise ValueError("A tcp device needs the address of its bridge")
+            connection = connection_factory.create_tcp_connection(port)
+        elif device_type == "simulated":
+            connection = connection_factory.create_simulated_connection(SimulatedPs201())
+        else:
+            raise ValueError("Unknown device type: " + str(device_type))
+        return UsbDevice(connection, logger)
+
+    def get_devices(self, device_type, logger=None, simulated_count=1, addresses=None):
+        """Gets every device of device type, each with its own connection
+
+        :param device_type: Which device type to get, "usb", "tcp" or "simulated"
+        :type device_type: str
+        :param logger: Logger used for logging messages
+        :type logger: CustomLoggerInterface
+        :param simulated_count: Number of devices to create if device_type is "simulated"
+        :type simulated_count: int
+        :param addresses: "host:port" of the bridge of every device if device_type is "tcp"
+        :type addresses: list[str]
+        :return: collections.OrderedDict[str, BaseDeviceInterface] -- Devices by a device id that stays the same
+            between runs, see discover
+        """
+        return collections.OrderedDict(
+            (device_id, self.create_device(device_type, logger, port))
+            for device_id, port in self.discover(device_type, logger, simulated_count, addresses).items())
@@ -0,0 +1,235 @@
+import itertools
+import logging
+import multiprocessing
+import time
+
+from ps_controller import PsControllerException
+from .BaseDeviceInterface import BaseDeviceInterface
+from .DeviceFactory import DeviceFactory
+from ..acquisition.AcquisitionLoop import AcquisitionLoop
+from ..acquisition.SharedSampleRing import SharedSampleRing
+from ..logging.CustomLogger import CustomLogger
+from ..utilities.PriorityLock import PriorityLock
+
+_PAUSE_ACQUISITION = "pause_acquisition"
+_RESUME_ACQUISITION = "resume_acquisition"
+_COMMANDS = ("connect", "disconnect", "authentication_errors_on_machine", "get_all_values", "set_target_voltage",
+             "set_target_current", "set_output_on", _PAUSE_ACQUISITION, _RESUME_ACQUISITION)
+
+# Spawn instead of fork so the worker does not inherit the threads and locks of the web server
+_context = multiprocessing.get_context("spawn")
+
+
+class ProcessDevice(BaseDeviceInterface):
+    """A device whose serial I/O runs in a worker process of its own.
+
+    The worker polls the device and writes every sample to a SharedSampleRing that this process reads without
+    locks, so acquisition timing does not depend on the load of this process. Commands are sent to the worker over
+    a pipe, one at a time, high priority commands first.
+    """
+
+    def __init__(self, device_type, port=None, sample_interval=0.05, log_level=logging.ERROR, ring_capacity=72000,
+                 timeout=5.0):
+        """Constructor. The worker is started by start or by the first command
+
+        :param device_type: Type of the device the worker creates, "usb" or "simulated"
+        :type device_type: str
+        :param port: Port of a "usb" device as returned by DeviceFactory.discover. None for the first device found
+        :type port: str
+        :param sample_interval: Seconds between samples of the worker
+        :type sample_interval: float
+        :param log_level: Log level of the worker
+        :type log_level: int
+        :param ring_capacity: Number of samples kept in the shared ring
+        :type ring_capacity: int
+        :param timeout: Seconds to wait for the worker to answer a command
+        :type timeout: float
+        """
+        self._device_type = device_type
+        self._port = port
+        self._sample_interval = sample_interval
+        self._log_level = log_level
+        self._ring_capacity = ring_capacity
+        self._timeout = timeout
+        self._process = None
+        self._connection = None
+        self._ring = None
+        self._request_ids = itertools.count()
+        self._command_lock = PriorityLock()
+
+    def start(self):
+        """Starts the worker process. Does nothing if it is running
+
+        :return: None
+        """
+        self._command_lock.acquire(high_priority=True)
+        try:
+            if self._process is not None and self._process.is_alive():
+                return
+            self._close()
+            self._ring = SharedSampleRing(self._ring_capacity)
+            self._connection, worker_connection = _context.Pipe()
+            self._process = _context.Process(
+                target=_run_worker, name="DeviceWorker", daemon=True,
+                args=(self._device_type, self._port, self._log_level, self._ring.name, self._sample_interval,
+                      worker_connection))
+            self._process.start()
+            worker_connection.close()
+        finally:
+            self._command_lock.release()
+
+    def stop(self):
+        """Stops the worker process and frees the shared ring
+
+        :return: None
+        """
+        self._command_lock.acquire(high_priority=True)
+        try:
+            if self._process is None:
+                return
+            try:
+                self._connection.send(None)
+            except (OSError, ValueError):
+                pass
+            self._process.join(self._timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+            self._close()
+        finally:
+            self._command_lock.release()
+
+    def ring(self):
+        """Gets the ring the worker writes its samples to, starting the worker if needed
+
+        :return: SharedSampleRing -- The ring
+        """
+        self.start()
+        return self._ring
+
+    def pause_acquisition(self):
+        """Pauses the polling of the worker, e.g. while a control loop reads the device itself
+
+        :return: None
+        """
+        self._call(_PAUSE_ACQUISITION)
+
+    def resume_acquisition(self):
+        """Resumes the polling of the worker after pause_acquisition
+
+        :return: None
+        """
+        self._call(_RESUME_ACQUISITION)
+
+    def connect(self):
+        return self._call("connect")
+
+    def disconnect(self):
+        self._call("disconnect")
+
+    def connected(self):
+        ring = self._ring
+        return ring is not None and ring.connected()
+
+    def authentication_errors_on_machine(self):
+        return self._call("authentication_errors_on_machine")
+
+    def get_all_values(self):
+        return self._call("get_all_values")
+
+    def set_target_voltage(self, voltage, high_priority=False):
+        self._call("set_target_voltage", voltage, high_priority=high_priority)
+
+    def set_target_current(self, current, high_priority=False):
+        self._call("set_target_current", current, high_priority=high_priority)
+
+    def set_output_on(self, is_on, high_priority=False):
+        self._call("set_output_on", is_on, high_priority=high_priority)
+
+    def _call(self, command, *args, high_priority=False):
+        """Runs a command on the device of the worker
+
+        :param command: Name of the device method
+        :type command: str
+        :param args: Arguments of the device method
+        :param high_priority: If True the command is sent before all waiting normal priority commands
+        :type high_priority: bool
+        :return: object -- Return value of the device method
+        :raise: PsControllerException if the worker does not answer or the device method raised it
+        """
+        self.start()
+        if high_priority:
+            args += (True,)
+        self._command_lock.acquire(high_priority)
+        try:
+            if self._connection is None:
+                raise PsControllerException("Device worker stopped")
+            request_id = next(self._request_ids)
+            deadline = time.monotonic() + self._timeout
+            self._connection.send((request_id, command, args))
+            while True:
+                if not self._connection.poll(max(deadline - time.monotonic(), 0)):
+                    raise PsControllerException("Device worker did not answer " + command)
+                response_id, result, error = self._connection.recv()
+                # Answers to commands that timed out earlier are dropped
+                if response_id == request_id:
+                    break
+        except (EOFError, OSError) as e:
+            raise PsControllerException("Device worker stopped: " + repr(e))
+        finally:
+            self._command_lock.release()
+        if error is not None:
+            raise error
+        return result
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        self._process = None
+
+
+def _run_worker(device_type, port, log_level, ring_name, sample_interval, connection):
+    """Entry point of the worker process. Polls the device into the ring and runs commands until told to stop
+
+    :return: None
+    """
+    logger = CustomLogger(log_level)
+    device = DeviceFactory().create_device(device_type, logger, port)
+    ring = SharedSampleRing(name=ring_name)
+    acquisition = AcquisitionLoop(device, logger, interval=sample_interval)
+    acquisition.add_listener(ring.add)
+    acquisition.start()
+    try:
+        while True:
+            ring.set_connected(device.connected())
+            if not connection.poll(0.1):
+                continue
+            request = connection.recv()
+            if request is None:
+                break
+            request_id, command, args = request
+            try:
+                if command not in _COMMANDS:
+                    raise PsControllerException("Unknown device command " + str(command))
+                if command == _PAUSE_ACQUISITION:
+                    result = acquisition.pause()
+                elif command == _RESUME_ACQUISITION:
+                    result = acquisition.resume()
+                else:
+                    result = getattr(device, command)(*args)
+                connection.send((request_id, result, None))
+            except Exception as e:
+                if not isinstance(e, PsControllerException):
+                    e = PsControllerException(repr(e))
+                connection.send((request_id, None, e))
+    except (EOFError, OSError, KeyboardInterrupt):
+        # The server went away or is shutting down
+        pass
+    finally:
+        acquisition.stop()
+        device.disconnect()
+        ring.close()
@@ -1,13 +1,27 @@
-import threading
+import time
 
 from .BaseDeviceInterface import BaseDeviceInterface
 from ps_controller import SerialParser, PsControllerException
 from ps_controller.Constants import Constants
 from ..utilities.Crc import CrcHelper
+from ..utilities.PriorityLock import PriorityLock
 from ..DeviceResponse import DeviceResponse
 from ..DeviceValues import DeviceValues
 from ..connection.BaseConnectionInterface import BaseConnectionInterface
 from ..logging.CustomLoggerInterface import CustomLoggerInterface
+from ..metrics.Metrics import Counter, Histogram
+from ..tracing import Tracing
+
+TRANSACTION_SECONDS = Histogram(
+    "ps201_transaction_seconds", "Duration of device transactions, without waiting for the transaction lock", ("command",))
+TRANSACTION_FAILURES = Counter(
+    "ps201_transaction_failures_total", "Device transactions that failed", ("command", "reason"))
+LOCK_WAIT_SECONDS = Histogram(
+    "ps201_lock_wait_seconds", "Time transactions waited for the device", ("priority",))
+ACKNOWLEDGEMENTS = Counter("ps201_acknowledgements_total", "Acknowledgements received from devices", ("result",))
+CRC_ERRORS = Counter("ps201_crc_errors_total", "Responses from devices with an incorrect crc code")
+BYTES_SENT = Counter("ps201_sent_bytes_total", "Bytes sent to devices")
+BYTES_RECEIVED = Counter("ps201_received_bytes_total", "Bytes received from devices")
 
 
 class UsbDevice(BaseDeviceInterface):
@@ -23,7 +37,7 @@ class UsbDevice(BaseDeviceInterface):
         """
         self._connection = connection
         self._logger = logger
-        self._transactionLock = threading.Lock()
+        self._transactionLock = PriorityLock()
 
     def connect(self):
         self._connection.connect()
@@ -46,19 +60,19 @@ class UsbDevice(BaseDeviceInterface):
             return DeviceValues()
         return SerialParser.from_all_data_to_device_values(response.data)
 
-    def set_target_voltage(self, voltage):
+    def set_target_voltage(self, voltage, high_priority=False):
         if voltage <= 20000:
-            self._send_to_device(Constants.SET_VOLTAGE_COMMAND, data=str(voltage))
+            self._send_to_device(Constants.SET_VOLTAGE_COMMAND, data=str(voltage), high_priority=high_priority)
 
-    def set_target_current(self, current):
+    def set_target_current(self, current, high_priority=False):
         if current <= 1000:
-            self._send_to_device(Constants.SET_CURRENT_COMMAND, data=str(current))
+            self._send_to_device(Constants.SET_CURRENT_COMMAND, data=str(current), high_priority=high_priority)
 
-    def set_output_on(self, is_on):
+    def set_output_on(self, is_on, high_priority=False):
         command = Constants.SET_OUTPUT_ON_COMMAND
-        self._send_to_device(command, data="1" if is_on else "0")
+        self._send_to_device(command, data="1" if is_on else "0", high_priority=high_priority)
 
-    def _send_to_device(self, command, data, expect_response=False):
+    def _send_to_device(self, command, data, expect_response=False, high_priority=False):
         """Sends command and data to device. Verifies the acknowledge response from device and
             verifies response from device if expect_response is True
 
@@ -68,34 +82,71 @@ class UsbDevice(BaseDeviceInterface):
         :type data: str
         :param expect_response: If we expect a response from device aside from Acknowledge
         :type expect_response: bool
+        :param high_priority: If True the transaction goes before all waiting normal priority transactions
+        :type high_priority: bool
         :return: DeviceResponse or None -- None if no expected response, otherwise the device response from the device
         :raise: PsControllerException
         """
-        with self._transactionLock:
+        wait_start = time.perf_counter()
+        self._transactionLock.acquire(high_priority)
+        start = time.perf_counter()
+        LOCK_WAIT_SECONDS.labels("high" if high_priority else "normal").observe(start - wait_start)
+        trace = None
+        if Tracing.hooks:
+            trace = Tracing.begin(command, wait_start)
+            trace.mark("lock_wait")
+        error = None
+        try:
             serial_data_to_device = SerialParser.to_serial(command, data)
             self._logger.log_sending(serial_data_to_device)
+            if trace:
+                trace.mark("encode")
             self._connection.set(serial_data_to_device)
+            BYTES_SENT.inc(len(serial_data_to_device))
+            if trace:
+                trace.mark("write")
 
             acknowledgement_response = self._get_response_from_device()
+            if trace:
+                trace.mark("acknowledge")
             if not acknowledgement_response:
+                TRANSACTION_FAILURES.labels(command, "empty_acknowledge").inc()
                 raise PsControllerException("Empty acknowledge from device")
 
             acknowledge_ok = self._verify_acknowledgement(acknowledgement_response)
             if not acknowledge_ok:
+                TRANSACTION_FAILURES.labels(command, "not_acknowledged").inc()
                 raise PsControllerException("Did not receive acknowledge from device")
 
             crc_ok = self._verify_crc_code(acknowledgement_response)
             if not crc_ok:
+                    TRANSACTION_FAILURES.labels(command, "crc").inc()
                     raise PsControllerException("Incorrect crc code received in acknowledgement")
+            if trace:
+                trace.mark("verify_acknowledge")
 
             if expect_response:
                 response = self._get_response_from_device()
+                if trace:
+                    trace.mark("response")
                 if not response:
+                    TRANSACTION_FAILURES.labels(command, "empty_response").inc()
                     raise PsControllerException("Empty response from device")
                 crc_ok = self._verify_crc_code(response)
                 if not crc_ok:
+                    TRANSACTION_FAILURES.labels(command, "crc").inc()
                     raise PsControllerException("Incorrect crc code received in response")
+                if trace:
+                    trace.mark("verify_response")
                 return response
+        except PsControllerException as e:
+            error = str(e)
+            raise
+        finally:
+            self._transactionLock.release()
+            TRANSACTION_SECONDS.labels(command).observe(time.perf_counter() - start)
+            if trace:
+                Tracing.finish(trace, error)
 
     def _get_response_from_device(self):
         """Gets a single response from the connected device.
@@ -103,6 +154,8 @@ class UsbDevice(BaseDeviceInterface):
         :return: DeviceResponse or None -- None if something went wrong, otherwise the device response from the device
         """
         serial_response = self._connection.get()
+        if serial_response:
+            BYTES_RECEIVED.inc(len(serial_response))
         device_response = SerialParser.from_serial(serial_response)
         if not device_response:
             return None
@@ -118,6 +171,7 @@ class UsbDevice(BaseDeviceInterface):
         """
         (error, expected_value, actual_value) = CrcHelper.verify_crc_code(response)
         if error:
+            CRC_ERRORS.inc()
             error_message = "Unexpected crc code from device. Got " + actual_value + " but expected " + expected_value
             self._logger.log_error(error_message)
             return False
@@ -135,12 +189,15 @@ class UsbDevice(BaseDeviceInterface):
             self._logger.log_error(log_string)
             return False
         elif acknowledgement_response.command == Constants.NOT_ACKNOWLEDGE_COMMAND:
+            ACKNOWLEDGEMENTS.labels("nak").inc()
             log_string = "Received 'NOT ACKNOWLEDGE' from device."
             self._logger.log_error(log_string)
             return False
         elif acknowledgement_response.command != Constants.ACKNOWLEDGE_COMMAND:
+            ACKNOWLEDGEMENTS.labels("invalid").inc()
             log_string = ("Received neither 'ACKNOWLEDGE' nor 'NOT ACKNOWLEDGE' from device. "
                           "Received : " + acknowledgement_response.decoded_response + " from device")
             self._logger.log_error(log_string)
             return False
+        ACKNOWLEDGEMENTS.labels("ack").inc()
         return True
@@ -0,0 +1,136 @@
+import threading
+import time
+
+PENDING = "pending"
+RUNNING = "running"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled"""
+    pass
+
+
+class Job:
+    """A long running device task that runs on its own thread and reports progress"""
+
+    name = "job"
+
+    def __init__(self):
+        self._state = PENDING
+        self._progress = 0.0
+        self._error = None
+        self._started = None
+        self._finished = None
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts running the job on a background thread
+
+        :return: None
+        """
+        self._state = RUNNING
+        self._started = time.time()
+        self._thread = threading.Thread(target=self._run_job, name=self.name, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Requests the job to stop. The job stops at its next cancellation check
+
+        :return: None
+        """
+        self._cancel_event.set()
+
+    def join(self, timeout=None):
+        """Waits for the job to finish
+
+        :param timeout: Maximum seconds to wait. None to wait until finished
+        :type timeout: float
+        :return: bool -- If the job is done
+        """
+        if self._thread:
+            self._thread.join(timeout)
+        return self.done()
+
+    def done(self):
+        """Returns if the job has stopped running
+
+        :return: bool -- If finished, cancelled or failed
+        """
+        return self._state in (FINISHED, CANCELLED, FAILED)
+
+    def state(self):
+        """Returns the state of the job
+
+        :return: str -- One of PENDING, RUNNING, FINISHED, CANCELLED, FAILED
+        """
+        return self._state
+
+    def status(self):
+        """Returns a JSON serializable summary of the job
+
+        :return: dict -- Job status with keys state, progress, error, started, finished and result
+        """
+        return {
+            "name": self.name,
+            "state": self._state,
+            "progress": round(self._progress, 4),
+            "error": self._error,
+            "started": self._started,
+            "finished": self._finished,
+            "result": self.result()}
+
+    def result(self):
+        """Returns the JSON serializable result of the job so far
+
+        :return: object -- Job specific result
+        """
+        return None
+
+    def run(self):
+        """Runs the job. Implemented by subclasses, which should call _check_cancelled and _set_progress regularly
+
+        :return: None
+        :raise: JobCancelled if cancelled
+        """
+        raise NotImplementedError()
+
+    def _set_progress(self, progress):
+        self._progress = progress
+
+    def _check_cancelled(self):
+        """Raises JobCancelled if the job has been cancelled
+
+        :return: None
+        :raise: JobCancelled
+        """
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def _wait(self, seconds):
+        """Waits for seconds or until cancelled
+
+        :param seconds: Seconds to wait
+        :type seconds: float
+        :return: None
+        :raise: JobCancelled
+        """
+        if seconds > 0:
+            self._cancel_event.wait(seconds)
+        self._check_cancelled()
+
+    def _run_job(self):
+        try:
+            self.run()
+            self._progress = 1.0
+            self._state = FINISHED
+        except JobCancelled:
+            self._state = CANCELLED
+        except Exception as e:
+            self._error = str(e)
+            self._state = FAILED
+        finally:
+            self._finished = time.time()
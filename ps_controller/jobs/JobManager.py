@@ -0,0 +1,54 @@
+import itertools
+import threading
+
+from ps_controller import PsControllerException
+from .Job import Job
+
+
+class JobManager:
+    """Keeps track of jobs and makes sure only one job drives the device at a time"""
+
+    def __init__(self, max_kept_jobs=100):
+        """Constructor
+
+        :param max_kept_jobs: Number of jobs kept for status queries. Oldest done jobs are forgotten first
+        :type max_kept_jobs: int
+        """
+        self._jobs = dict()
+        self._ids = itertools.count(1)
+        self._max_kept_jobs = max_kept_jobs
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        """Starts a job if no other job is running
+
+        :param job: The job to start
+        :type job: Job
+        :return: int -- Id of the job
+        :raise: PsControllerException if another job is running
+        """
+        with self._lock:
+            if any(not x.done() for x in self._jobs.values()):
+                raise PsControllerException("Another job is already running")
+            job_id = next(self._ids)
+            self._jobs[job_id] = job
+            for old_id in sorted(self._jobs)[:-self._max_kept_jobs]:
+                del self._jobs[old_id]
+            job.start()
+            return job_id
+
+    def get(self, job_id):
+        """Gets a job by id
+
+        :param job_id: Id returned by submit
+        :type job_id: int
+        :return: Job or None -- The job. None if there is no job with that id
+        """
+        return self._jobs.get(job_id)
+
+    def statuses(self):
+        """Gets the status of all kept jobs
+
+        :return: dict[int, dict] -- Job status by job id
+        """
+        return dict((job_id, job.status()) for job_id, job in list(self._jobs.items()))
@@ -0,0 +1,144 @@
+import collections
+import time
+
+import numpy
+
+from .Job import Job
+from ..acquisition.Statistics import RunningStatistics
+from ..device.BaseDeviceInterface import BaseDeviceInterface
+
+
+def create_profile(t, voltage, current):
+    """Validates a profile and converts it to arrays
+
+    :param t: Seconds from the start of playback of each point. Must be non decreasing
+    :type t: list[float] or numpy.ndarray
+    :param voltage: Target voltage of each point in mV
+    :type voltage: list[int] or numpy.ndarray
+    :param current: Target current of each point in mA
+    :type current: list[int] or numpy.ndarray
+    :return: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray) -- (t, voltage, current)
+    :raise: ValueError if the profile is invalid
+    """
+    t = numpy.asarray(t, dtype=numpy.float64)
+    voltage = numpy.asarray(voltage, dtype=numpy.int64)
+    current = numpy.asarray(current, dtype=numpy.int64)
+    if t.ndim != 1 or not len(t):
+        raise ValueError("Profile must have at least one point")
+    if len(voltage) != len(t) or len(current) != len(t):
+        raise ValueError("Profile time, voltage and current must have the same length")
+    if numpy.any(numpy.diff(t) < 0) or t[0] < 0:
+        raise ValueError("Profile times must be non negative and non decreasing")
+    return t, voltage, current
+
+
+class PlaybackJob(Job):
+    """Plays a (t, voltage, current) profile on a device on a monotonic clock.
+
+    Writes are issued early by the measured write latency so the set point lands on time. Points whose time has
+    passed when a later point is already due are merged into the later point, and writes that would not change
+    the target are not sent.
+    """
+
+    name = "playback"
+
+    def __init__(self, device, t, voltage, current, repeat=1, latency_smoothing=0.2, recent_errors=1000):
+        """Constructor
+
+        :param device: The device to play the profile on
+        :type device: BaseDeviceInterface
+        :param t: Seconds from the start of playback of each point. Must be non decreasing
+        :type t: list[float] or numpy.ndarray
+        :param voltage: Target voltage of each point in mV
+        :type voltage: list[int] or numpy.ndarray
+        :param current: Target current of each point in mA
+        :type current: list[int] or numpy.ndarray
+        :param repeat: Number of times to play the profile. The first point of a repetition is due at the time of
+            the last point of the previous repetition and replaces it
+        :type repeat: int
+        :param latency_smoothing: Weight of the newest point in the moving average of the point write latency
+        :type latency_smoothing: float
+        :param recent_errors: Number of latest points the timing error percentile is computed over
+        :type recent_errors: int
+        """
+        Job.__init__(self)
+        self._device = device
+        self._t, self._voltage, self._current = create_profile(t, voltage, current)
+        self._repeat = repeat
+        self._latency_smoothing = latency_smoothing
+        self._latency_estimate = 0.0
+        # Running statistics, so a long repeated profile does not grow memory or slow down polling of the result
+        self._timing_errors = RunningStatistics()
+        self._absolute_timing_errors = RunningStatistics()
+        self._recent_absolute_timing_errors = collections.deque(maxlen=recent_errors)
+        self._played_points = 0
+        self._skipped_points = 0
+        self._writes = 0
+
+    def result(self):
+        recent = list(self._recent_absolute_timing_errors)
+        return {
+            "played_points": self._played_points,
+            "skipped_points": self._skipped_points,
+            "writes": self._writes,
+            "latency_estimate_ms": round(self._latency_estimate * 1000, 3),
+            "timing_error_mean_ms": round(self._timing_errors.mean * 1000, 3),
+            "timing_error_abs_mean_ms": round(self._absolute_timing_errors.mean * 1000, 3),
+            "timing_error_p95_ms": round(float(numpy.percentile(recent or [0.0], 95)) * 1000, 3),
+            "timing_error_p95_points": len(recent),
+            "timing_error_max_ms": round((self._absolute_timing_errors.maximum or 0.0) * 1000, 3)}
+
+    def run(self):
+        duration = self._t[-1]
+        number_of_points = len(self._t) * self._repeat
+        last_voltage = None
+        last_current = None
+        start = time.monotonic()
+        point = 0
+        while point < number_of_points:
+            repetition, index = divmod(point, len(self._t))
+            due = start + repetition * duration + self._t[index]
+            self._wait(due - self._latency_estimate - time.monotonic())
+
+            # Merge all points that are already due into the latest one
+            now = time.monotonic() + self._latency_estimate
+            while point + 1 < number_of_points:
+                next_repetition, next_index = divmod(point + 1, len(self._t))
+                next_due = start + next_repetition * duration + self._t[next_index]
+                if next_due > now:
+                    break
+                point, repetition, index, due = point + 1, next_repetition, next_index, next_due
+                self._skipped_points += 1
+
+            voltage, current = int(self._voltage[index]), int(self._current[index])
+            write_start = time.monotonic()
+            writes = self._writes
+            if voltage != last_voltage:
+                self._device.set_target_voltage(voltage)
+                last_voltage = voltage
+                self._writes += 1
+            if current != last_current:
+                self._device.set_target_current(current)
+                last_current = current
+                self._writes += 1
+            write_end = time.monotonic()
+            if self._writes > writes:
+                self._update_latency_estimate(write_end - write_start)
+            self._timing_errors.add(write_end - due)
+            self._absolute_timing_errors.add(abs(write_end - due))
+            self._recent_absolute_timing_errors.append(abs(write_end - due))
+            self._played_points += 1
+            point += 1
+            self._set_progress(point / number_of_points)
+
+    def _update_latency_estimate(self, latency):
+        """Updates the moving average of the time it takes to write a point
+
+        :param latency: Seconds the writes of the latest point took
+        :type latency: float
+        :return: None
+        """
+        if not self._played_points:
+            self._latency_estimate = latency
+        else:
+            self._latency_estimate += self._latency_smoothing * (latency - self._latency_estimate)
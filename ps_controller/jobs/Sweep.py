@@ -0,0 +1,132 @@
+import time
+
+import numpy
+
+from .Job import Job
+from ..device.BaseDeviceInterface import BaseDeviceInterface
+
+RESULT_DTYPE = numpy.dtype([
+    ('target_voltage', '<f8'),
+    ('target_current', '<f8'),
+    ('output_voltage', '<f8'),
+    ('output_current', '<f8'),
+    ('settle_time', '<f8'),
+    ('readings', '<u4'),
+    ('settled', '?')])
+
+
+def wait_until_settled(device, voltage_tolerance=20, current_tolerance=5, settle_count=3, timeout=5.0,
+                       read_interval=0.0, wait=time.sleep):
+    """Reads the device until consecutive readings stay within a tolerance band
+
+    :param device: The device to read
+    :type device: BaseDeviceInterface
+    :param voltage_tolerance: Maximum spread of the output voltage over the settled readings in mV
+    :type voltage_tolerance: float
+    :param current_tolerance: Maximum spread of the output current over the settled readings in mA
+    :type current_tolerance: float
+    :param settle_count: Number of consecutive readings that have to be within the band
+    :type settle_count: int
+    :param timeout: Maximum seconds to wait for the output to settle
+    :type timeout: float
+    :param read_interval: Seconds to wait between readings
+    :type read_interval: float
+    :param wait: Function used to wait between readings
+    :type wait: lambda x: func(seconds: float) -> None
+    :return: tuple(bool, list[DeviceValues], int) -- (settled, last settle_count readings, number of readings)
+    :raise: PsControllerException
+    """
+    start_time = time.monotonic()
+    window = []
+    readings = 0
+    while True:
+        device_values = device.get_all_values()
+        if device_values is not None:
+            window.append(device_values)
+            window = window[-settle_count:]
+            readings += 1
+            if len(window) == settle_count and _within_band(window, voltage_tolerance, current_tolerance):
+                return True, window, readings
+        if time.monotonic() - start_time >= timeout:
+            return False, window, readings
+        wait(read_interval)
+
+
+def _within_band(readings, voltage_tolerance, current_tolerance):
+    voltages = [x.output_voltage for x in readings]
+    currents = [x.output_current for x in readings]
+    return (max(voltages) - min(voltages) <= voltage_tolerance and
+            max(currents) - min(currents) <= current_tolerance)
+
+
+class SweepJob(Job):
+    """Steps the device through (voltage, current) set points and records the settled output of each point"""
+
+    name = "sweep"
+
+    def __init__(self, device, set_points, voltage_tolerance=20, current_tolerance=5, settle_count=3,
+                 settle_timeout=5.0, read_interval=0.0):
+        """Constructor
+
+        :param device: The device to sweep
+        :type device: BaseDeviceInterface
+        :param set_points: (voltage in mV, current in mA) set points in sweep order
+        :type set_points: numpy.ndarray or list[tuple(int, int)]
+        :param voltage_tolerance: Maximum spread of the output voltage over the settled readings in mV
+        :type voltage_tolerance: float
+        :param current_tolerance: Maximum spread of the output current over the settled readings in mA
+        :type current_tolerance: float
+        :param settle_count: Number of consecutive readings that have to be within the band
+        :type settle_count: int
+        :param settle_timeout: Maximum seconds to wait for a point to settle. The point is recorded as not settled
+        :type settle_timeout: float
+        :param read_interval: Seconds to wait between readings
+        :type read_interval: float
+        :raise: ValueError or TypeError if the set points are not (voltage, current) pairs or settle_count is below 1
+        """
+        Job.__init__(self)
+        set_points = numpy.asarray(set_points, dtype=numpy.float64)
+        if set_points.ndim != 2 or set_points.shape[1] != 2 or not len(set_points):
+            raise ValueError("Set points must be a list of [voltage, current] pairs")
+        if settle_count < 1:
+            raise ValueError("Settle count must be at least 1")
+        self._device = device
+        self._voltage_tolerance = voltage_tolerance
+        self._current_tolerance = current_tolerance
+        self._settle_count = settle_count
+        self._settle_timeout = settle_timeout
+        self._read_interval = read_interval
+        self._results = numpy.zeros(len(set_points), dtype=RESULT_DTYPE)
+        self._results['target_voltage'] = set_points[:, 0]
+        self._results['target_current'] = set_points[:, 1]
+        self._completed_points = 0
+
+    def results(self):
+        """Gets the result table of the points swept so far
+
+        :return: numpy.ndarray -- Results with dtype RESULT_DTYPE
+        """
+        return self._results[:self._completed_points]
+
+    def result(self):
+        results = self.results()
+        return dict((name, results[name].tolist()) for name in RESULT_DTYPE.names)
+
+    def run(self):
+        for point in range(len(self._results)):
+            self._check_cancelled()
+            row = self._results[point]
+            self._device.set_target_current(int(row['target_current']))
+            self._device.set_target_voltage(int(row['target_voltage']))
+            point_start = time.monotonic()
+            settled, window, readings = wait_until_settled(
+                self._device, self._voltage_tolerance, self._current_tolerance, self._settle_count,
+                self._settle_timeout, self._read_interval, self._wait)
+            row['settle_time'] = time.monotonic() - point_start
+            if window:
+                row['output_voltage'] = numpy.mean([x.output_voltage for x in window])
+                row['output_current'] = numpy.mean([x.output_current for x in window])
+            row['readings'] = readings
+            row['settled'] = settled
+            self._completed_points = point + 1
+            self._set_progress(self._completed_points / len(self._results))
@@ -0,0 +1,242 @@
+"""Counters, gauges and fixed bucket histograms served in the Prometheus text format.
+
+Updating a metric takes one lock and no allocation, so the instruments can stay in the device transaction path.
+Metrics are process wide and registered in REGISTRY when created.
+"""
+
+import bisect
+import threading
+
+# Seconds. Covers a fast simulated transaction up to a serial read that runs into its timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Registry:
+    """A set of metrics that are rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Adds a metric
+
+        :param metric: The metric
+        :type metric: Metric
+        :return: Metric -- The metric
+        :raise: ValueError if a metric with the same name is registered
+        """
+        with self._lock:
+            if any(registered.name == metric.name for registered in self._metrics):
+                raise ValueError("Metric already registered: " + metric.name)
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Renders all metrics
+
+        :return: str -- The metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append("# HELP {0} {1}".format(metric.name, metric.documentation))
+            lines.append("# TYPE {0} {1}".format(metric.name, metric.type_name))
+            lines.extend(metric.render_samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Base of the metric types. A metric with label names has one child per combination of label values"""
+    type_name = None
+
+    def __init__(self, name, documentation, label_names=(), registry=REGISTRY):
+        """Constructor
+
+        :param name: Name of the metric, e.g. "ps201_transactions_total"
+        :type name: str
+        :param documentation: One line description of the metric
+        :type documentation: str
+        :param label_names: Names of the labels of the metric
+        :type label_names: tuple(str)
+        :param registry: Registry to add the metric to. None to not register it
+        :type registry: Registry
+        """
+        self.name = name
+        self.documentation = documentation
+        self._label_names = tuple(label_names)
+        self._children = dict()
+        self._children_lock = threading.Lock()
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *label_values):
+        """Gets the child of the metric for the label values
+
+        :param label_values: One value per label name
+        :type label_values: str
+        :return: Metric -- The child. Created on first use
+        """
+        child = self._children.get(label_values)
+        if child is None:
+            if len(label_values) != len(self._label_names):
+                raise ValueError("Expected label values for " + ", ".join(self._label_names))
+            with self._children_lock:
+                child = self._children.setdefault(label_values, self._new_child())
+        return child
+
+    def render_samples(self):
+        """Renders the samples of the metric and its children
+
+        :return: list[str] -- One line per sample
+        """
+        if not self._label_names:
+            return self._render_own_samples("")
+        lines = []
+        for label_values, child in sorted(self._children.items()):
+            label_text = ",".join('{0}="{1}"'.format(name, _escape(value))
+                                  for name, value in zip(self._label_names, label_values))
+            lines.extend(child._render_own_samples(label_text))
+        return lines
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+    def _render_own_samples(self, label_text):
+        raise NotImplementedError()
+
+    def _sample(self, suffix, label_text, value):
+        labels = "{" + label_text + "}" if label_text else ""
+        return "{0}{1}{2} {3}".format(self.name, suffix, labels, _format_value(value))
+
+
+class Counter(Metric):
+    """A value that only goes up"""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, label_names=(), registry=REGISTRY):
+        Metric.__init__(self, name, documentation, label_names, registry)
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Increases the counter
+
+        :param amount: Amount to increase by. Not negative
+        :type amount: float
+        :return: None
+        """
+        with self._lock:
+            self.value += amount
+
+    def _new_child(self):
+        return Counter(self.name, self.documentation, registry=None)
+
+    def _render_own_samples(self, label_text):
+        return [self._sample("", label_text, self.value)]
+
+
+class Gauge(Metric):
+    """A value that goes up and down"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, label_names=(), registry=REGISTRY):
+        Metric.__init__(self, name, documentation, label_names, registry)
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Increases the gauge
+
+        :param amount: Amount to increase by
+        :type amount: float
+        :return: None
+        """
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        """Decreases the gauge
+
+        :param amount: Amount to decrease by
+        :type amount: float
+        :return: None
+        """
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        """Sets the gauge
+
+        :param value: The value
+        :type value: float
+        :return: None
+        """
+        self.value = value
+
+    def _new_child(self):
+        return Gauge(self.name, self.documentation, registry=None)
+
+    def _render_own_samples(self, label_text):
+        return [self._sample("", label_text, self.value)]
+
+
+class Histogram(Metric):
+    """Counts observations in fixed buckets and keeps their count and sum"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        """Constructor
+
+        :param buckets: Sorted upper bounds of the buckets. A +Inf bucket is added
+        :type buckets: tuple(float)
+        """
+        Metric.__init__(self, name, documentation, label_names, registry)
+        self._upper_bounds = tuple(buckets)
+        self._bucket_counts = [0] * (len(self._upper_bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Adds an observation
+
+        :param value: The observed value, e.g. seconds
+        :type value: float
+        :return: None
+        """
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._bucket_counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def _new_child(self):
+        return Histogram(self.name, self.documentation, buckets=self._upper_bounds, registry=None)
+
+    def _render_own_samples(self, label_text):
+        with self._lock:
+            bucket_counts = list(self._bucket_counts)
+            count, total = self.count, self.sum
+        separator = "," if label_text else ""
+        lines = []
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self._upper_bounds + (float("inf"),), bucket_counts):
+            cumulative_count += bucket_count
+            bucket_label = '{0}{1}le="{2}"'.format(label_text, separator, _format_value(upper_bound))
+            lines.append(self._sample("_bucket", bucket_label, cumulative_count))
+        lines.append(self._sample("_count", label_text, count))
+        lines.append(self._sample("_sum", label_text, total))
+        return lines
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,67 @@
+"""Text encodings of recorded samples for streaming exports.
+
+Every encoder takes an iterable of record batches, as yielded by RecordingReader.iter_range, and yields one encoded
+chunk per batch so memory use only depends on the batch size.
+"""
+
+from . import SegmentFormat
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+CONTENT_TYPES = {CSV: "text/csv", NDJSON: "application/x-ndjson"}
+
+_FIELDS = SegmentFormat.RECORD_DTYPE.names
+_VALUE_FORMATS = dict((name, '%g') for name in _FIELDS)
+_VALUE_FORMATS['timestamp'] = '%.6f'
+_VALUE_FORMATS['output_is_on'] = '%d'
+
+_CSV_ROW = ','.join(_VALUE_FORMATS[name] for name in _FIELDS)
+_NDJSON_ROW = '{' + ','.join('"{0}":{1}'.format(name, _VALUE_FORMATS[name]) for name in _FIELDS) + '}'
+
+
+def encode_csv(batches):
+    """Encodes records as CSV with a header row
+
+    :param batches: Record batches with dtype SegmentFormat.RECORD_DTYPE
+    :type batches: iterable of numpy.ndarray
+    :return: generator of bytes -- Encoded chunks
+    """
+    yield (','.join(_FIELDS) + '\n').encode('ascii')
+    for batch in batches:
+        yield _encode_rows(_CSV_ROW, batch)
+
+
+def encode_ndjson(batches):
+    """Encodes records as newline delimited JSON objects
+
+    :param batches: Record batches with dtype SegmentFormat.RECORD_DTYPE
+    :type batches: iterable of numpy.ndarray
+    :return: generator of bytes -- Encoded chunks
+    """
+    for batch in batches:
+        yield _encode_rows(_NDJSON_ROW, batch)
+
+
+def encode(export_format, batches):
+    """Encodes records in the given format
+
+    :param export_format: CSV or NDJSON
+    :type export_format: str
+    :param batches: Record batches with dtype SegmentFormat.RECORD_DTYPE
+    :type batches: iterable of numpy.ndarray
+    :return: generator of bytes -- Encoded chunks
+    :raise: ValueError if export_format is unknown
+    """
+    if export_format == CSV:
+        return encode_csv(batches)
+    elif export_format == NDJSON:
+        return encode_ndjson(batches)
+    raise ValueError("Unknown export format: " + str(export_format))
+
+
+def _encode_rows(row_format, batch):
+    if not len(batch):
+        return b''
+    rows = batch.tolist()
+    return ('\n'.join([row_format % row for row in rows]) + '\n').encode('ascii')
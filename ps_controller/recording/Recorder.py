@@ -0,0 +1,257 @@
+import os
+import queue
+import threading
+import time
+
+import numpy
+
+from . import SegmentFormat
+from . import SegmentIndex
+from . import Rollup
+from ..DeviceValues import DeviceValues
+from ..logging.CustomLoggerInterface import CustomLoggerInterface
+
+
+class Recorder:
+    """Appends acquired samples to segment files in a recording directory.
+
+    Samples are handed over through a bounded queue and written by a background thread, so adding a sample never
+    blocks on disk. If the writer falls behind and the queue is full the sample is dropped and counted. The writer
+    thread also keeps the rollups of the recording up to date.
+    """
+
+    def __init__(self, directory, logger, segment_records=1000000, fsync_interval=5.0, queue_size=100000,
+                 index_interval=SegmentIndex.INDEX_INTERVAL, stop_timeout=10.0):
+        """Constructor
+
+        :param directory: The recording directory. Created if it does not exist
+        :type directory: str
+        :param logger: Used to log messages
+        :type logger: CustomLoggerInterface
+        :param segment_records: Number of records in a segment before a new segment is started
+        :type segment_records: int
+        :param fsync_interval: Maximum seconds between forcing written records to disk
+        :type fsync_interval: float
+        :param queue_size: Maximum number of samples waiting to be written
+        :type queue_size: int
+        :param index_interval: Every index_interval-th record of a segment is added to the segment time index
+        :type index_interval: int
+        :param stop_timeout: Maximum seconds stop waits for the writer thread to write the queued samples
+        :type stop_timeout: float
+        """
+        self._directory = directory
+        self._logger = logger
+        self._segment_records = segment_records
+        self._fsync_interval = fsync_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._index_interval = index_interval
+        self._stop_timeout = stop_timeout
+        self._thread = None
+        self._dropped_count = 0
+        self._written_count = 0
+        self._segment_file = None
+        self._index_file = None
+        self._segment_number = 0
+        self._records_in_segment = 0
+        self._last_fsync = 0.0
+        self._rollup_aggregator = Rollup.RollupAggregator(self._bucket_finished)
+        self._finished_buckets = dict((level, []) for level in Rollup.LEVELS)
+        self._rollup_files = dict()
+
+    def start(self):
+        """Starts the writer thread. Does nothing if already started
+
+        :return: None
+        """
+        if self._thread is not None:
+            return
+        os.makedirs(self._directory, exist_ok=True)
+        existing_segments = SegmentFormat.segment_numbers(self._directory)
+        self._segment_number = existing_segments[-1] if existing_segments else 0
+        self._resume_rollups()
+        self._thread = threading.Thread(target=self._run, name="Recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Writes all queued samples, syncs them to disk and stops the writer thread. Waits at most stop_timeout
+
+        :return: None
+        """
+        if self._thread is None:
+            return
+        # The writer thread may have died, and then nobody empties a full queue
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join(self._stop_timeout)
+        if self._thread.is_alive():
+            self._logger.log_error("Recording writer did not stop within {0} s".format(self._stop_timeout))
+        self._thread = None
+
+    def add(self, timestamp, device_values):
+        """Queues a sample for writing. Can be registered directly as an acquisition listener
+
+        :param timestamp: Sample wall clock timestamp in seconds
+        :type timestamp: float
+        :param device_values: The sampled device values
+        :type device_values: DeviceValues
+        :return: None
+        """
+        sample = (timestamp,
+                  device_values.output_voltage,
+                  device_values.output_current,
+                  device_values.target_voltage,
+                  device_values.target_current,
+                  device_values.input_voltage,
+                  device_values.pre_reg_voltage,
+                  1 if device_values.output_is_on else 0)
+        try:
+            self._queue.put_nowait(sample)
+        except queue.Full:
+            self._dropped_count += 1
+
+    def dropped_count(self):
+        """Returns the number of samples dropped because the writer could not keep up
+
+        :return: int -- Number of dropped samples
+        """
+        return self._dropped_count
+
+    def written_count(self):
+        """Returns the number of samples written since the recorder was started
+
+        :return: int -- Number of written samples
+        """
+        return self._written_count
+
+    def directory(self):
+        """Returns the recording directory
+
+        :return: str -- The recording directory
+        """
+        return self._directory
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self._fsync_interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch and batch[-1] is None:
+                batch.pop()
+                stopping = True
+
+            try:
+                self._write(batch)
+                if stopping:
+                    self._rollup_aggregator.flush()
+                self._write_finished_buckets()
+                if stopping or time.monotonic() - self._last_fsync >= self._fsync_interval:
+                    self._sync()
+            except OSError as e:
+                self._logger.log_error("Unable to write recording: " + str(e))
+        self._close_segment()
+        for rollup_file in self._rollup_files.values():
+            rollup_file.close()
+        self._rollup_files = dict()
+
+    def _write(self, samples):
+        """Writes samples to the current segment, starting new segments as needed
+
+        :param samples: Sample tuples in RECORD_DTYPE field order
+        :type samples: list[tuple]
+        :return: None
+        """
+        while samples:
+            if self._segment_file is None or self._records_in_segment >= self._segment_records:
+                self._start_new_segment()
+            count = min(len(samples), self._segment_records - self._records_in_segment)
+            records = numpy.array(samples[:count], dtype=SegmentFormat.RECORD_DTYPE)
+            # Readers only count whole records, so a record that is partially flushed is never visible
+            self._segment_file.write(records.tobytes())
+            self._segment_file.flush()
+            index_entries = SegmentIndex.create_entries(
+                records['timestamp'], self._records_in_segment, self._index_interval)
+            if len(index_entries):
+                self._index_file.write(index_entries.tobytes())
+                self._index_file.flush()
+            self._records_in_segment += count
+            self._written_count += count
+            # Aggregate the stored values so rollups rebuilt from the raw records are identical
+            for record in records.tolist():
+                self._rollup_aggregator.add(record[0], record[1], record[2], record[3], record[4])
+            samples = samples[count:]
+
+    def _resume_rollups(self):
+        """Takes the last bucket of every rollup file back into the aggregator.
+
+        Stopping writes the open buckets as if they were finished. The last one is removed from the file and
+        reopened, so samples of the same bucket after a restart are added to it and it is written again once finished.
+
+        :return: None
+        """
+        for level in Rollup.LEVELS:
+            path = Rollup.rollup_path(self._directory, level)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r+b') as f:
+                count = os.path.getsize(path) // Rollup.ROLLUP_DTYPE.itemsize
+                if not count:
+                    f.truncate(0)
+                    continue
+                f.seek((count - 1) * Rollup.ROLLUP_DTYPE.itemsize)
+                last = numpy.frombuffer(f.read(Rollup.ROLLUP_DTYPE.itemsize), dtype=Rollup.ROLLUP_DTYPE)[0]
+                # Also drops a partially written record left by a crash
+                f.truncate((count - 1) * Rollup.ROLLUP_DTYPE.itemsize)
+            self._rollup_aggregator.resume(level, last.tolist())
+
+    def _bucket_finished(self, level, bucket):
+        self._finished_buckets[level].append(bucket)
+
+    def _write_finished_buckets(self):
+        """Appends the buckets finished since last call to the rollup files
+
+        :return: None
+        """
+        for level, buckets in self._finished_buckets.items():
+            if not buckets:
+                continue
+            if level not in self._rollup_files:
+                self._rollup_files[level] = open(Rollup.rollup_path(self._directory, level), 'ab')
+            self._rollup_files[level].write(numpy.array(buckets, dtype=Rollup.ROLLUP_DTYPE).tobytes())
+            self._rollup_files[level].flush()
+            self._finished_buckets[level] = []
+
+    def _start_new_segment(self):
+        self._close_segment()
+        self._segment_number += 1
+        path = SegmentFormat.segment_path(self._directory, self._segment_number)
+        self._segment_file = open(path, 'xb')
+        self._segment_file.write(SegmentFormat.create_header())
+        self._index_file = open(SegmentIndex.index_path(self._directory, self._segment_number), 'xb')
+        self._records_in_segment = 0
+
+    def _sync(self):
+        if self._segment_file is not None:
+            os.fsync(self._segment_file.fileno())
+            os.fsync(self._index_file.fileno())
+        for rollup_file in self._rollup_files.values():
+            os.fsync(rollup_file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _close_segment(self):
+        if self._segment_file is not None:
+            self._sync()
+            self._segment_file.close()
+            self._index_file.close()
+            self._segment_file = None
+            self._index_file = None
@@ -0,0 +1,187 @@
+import os
+
+import numpy
+
+from . import SegmentFormat
+from . import SegmentIndex
+from . import Rollup
+from ps_controller import PsControllerException
+
+
+class RecordingReader:
+    """Reads a recording directory through memory maps of its segments.
+
+    Segments that are still being written can be opened. Only the records completely written when a segment is
+    opened are visible; open the segment again to see newer records.
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        :param directory: The recording directory
+        :type directory: str
+        """
+        self._directory = directory
+        self._first_timestamps = dict()
+
+    def segment_numbers(self):
+        """Gets the sequence numbers of all segments in the recording
+
+        :return: list[int] -- Sorted segment numbers
+        """
+        return SegmentFormat.segment_numbers(self._directory)
+
+    def open_segment(self, segment_number):
+        """Memory maps the records of a segment
+
+        :param segment_number: Sequence number of the segment
+        :type segment_number: int
+        :return: numpy.ndarray -- Read only zero copy view of the records with dtype SegmentFormat.RECORD_DTYPE
+        :raise: PsControllerException if the segment is not a valid segment
+        """
+        path = SegmentFormat.segment_path(self._directory, segment_number)
+        with open(path, 'rb') as f:
+            header = f.read(SegmentFormat.HEADER_SIZE)
+            size = os.fstat(f.fileno()).st_size
+        if len(header) < SegmentFormat.HEADER_SIZE:
+            # Writer has created the segment but not yet flushed the header
+            return numpy.empty(0, dtype=SegmentFormat.RECORD_DTYPE)
+        if not SegmentFormat.verify_header(header):
+            raise PsControllerException("Not a valid recording segment: " + path)
+
+        record_count = (size - SegmentFormat.HEADER_SIZE) // SegmentFormat.RECORD_DTYPE.itemsize
+        if record_count == 0:
+            return numpy.empty(0, dtype=SegmentFormat.RECORD_DTYPE)
+        return numpy.memmap(path, dtype=SegmentFormat.RECORD_DTYPE, mode='r',
+                            offset=SegmentFormat.HEADER_SIZE, shape=(record_count,))
+
+    def iter_segments(self):
+        """Iterates over the memory mapped records of every segment in time order
+
+        :return: generator of numpy.ndarray -- One view per segment
+        """
+        for segment_number in self.segment_numbers():
+            yield self.open_segment(segment_number)
+
+    def read_all(self):
+        """Reads every record of the recording into a single array
+
+        :return: numpy.ndarray -- Records with dtype SegmentFormat.RECORD_DTYPE
+        """
+        segments = list(self.iter_segments())
+        if not segments:
+            return numpy.empty(0, dtype=SegmentFormat.RECORD_DTYPE)
+        return numpy.concatenate(segments)
+
+    def read_range(self, start=None, end=None):
+        """Reads all records with start <= timestamp <= end
+
+        Segments are found by binary search over their first timestamps and the records within a segment through
+        binary search of the sparse segment index, so the cost depends on the size of the range and not the size
+        of the recording.
+
+        :param start: Earliest timestamp to include. None for no lower bound
+        :type start: float
+        :param end: Latest timestamp to include. None for no upper bound
+        :type end: float
+        :return: numpy.ndarray -- Records with dtype SegmentFormat.RECORD_DTYPE. A zero copy view if the range is
+            within a single segment
+        """
+        parts = list(self.iter_range(start, end))
+        if not parts:
+            return numpy.empty(0, dtype=SegmentFormat.RECORD_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return numpy.concatenate(parts)
+
+    def iter_range(self, start=None, end=None, batch_size=None):
+        """Iterates over the records with start <= timestamp <= end without copying them
+
+        :param start: Earliest timestamp to include. None for no lower bound
+        :type start: float
+        :param end: Latest timestamp to include. None for no upper bound
+        :type end: float
+        :param batch_size: Maximum number of records in each yielded view. None for one view per segment
+        :type batch_size: int
+        :return: generator of numpy.ndarray -- Zero copy views of the records in time order
+        """
+        for segment_number in self._segments_in_range(start, end):
+            records = self.open_segment(segment_number)
+            low, high = self._find_range(segment_number, records, start, end)
+            step = batch_size or max(high - low, 1)
+            for batch_start in range(low, high, step):
+                yield records[batch_start:min(batch_start + step, high)]
+
+    def read_rollup(self, level, start=None, end=None):
+        """Reads the buckets of a rollup level that start within start <= bucket_start <= end
+
+        :param level: Bucket size in seconds, one of Rollup.LEVELS
+        :type level: int
+        :param start: Earliest timestamp to include. None for no lower bound
+        :type start: float
+        :param end: Latest timestamp to include. None for no upper bound
+        :type end: float
+        :return: numpy.ndarray -- Zero copy view of the buckets with dtype Rollup.ROLLUP_DTYPE
+        """
+        return Rollup.read_rollup(self._directory, level, start, end)
+
+    def rebuild_rollups(self):
+        """Recomputes all rollups of the recording from the raw records. Must not be called while recording
+
+        :return: None
+        """
+        Rollup.rebuild_rollups(self._directory, self.read_all())
+
+    def _segments_in_range(self, start, end):
+        """Gets the segments that can contain records with start <= timestamp <= end
+
+        :return: list[int] -- Segment numbers in time order
+        """
+        numbers = []
+        first_timestamps = []
+        for segment_number in self.segment_numbers():
+            first_timestamp = self._first_timestamp(segment_number)
+            if first_timestamp is not None:
+                numbers.append(segment_number)
+                first_timestamps.append(first_timestamp)
+        low = 0 if start is None else max(numpy.searchsorted(first_timestamps, start, side='right') - 1, 0)
+        high = len(numbers) if end is None else numpy.searchsorted(first_timestamps, end, side='right')
+        return numbers[low:high]
+
+    def _first_timestamp(self, segment_number):
+        """Gets the timestamp of the first record in a segment. Cached since segments are append only
+
+        :return: float or None -- The timestamp. None if the segment has no records yet
+        """
+        if segment_number not in self._first_timestamps:
+            index = SegmentIndex.read_index(self._directory, segment_number)
+            if index is not None and len(index):
+                self._first_timestamps[segment_number] = float(index['timestamp'][0])
+            else:
+                records = self.open_segment(segment_number)
+                if not len(records):
+                    return None
+                self._first_timestamps[segment_number] = float(records['timestamp'][0])
+        return self._first_timestamps[segment_number]
+
+    def _find_range(self, segment_number, records, start, end):
+        """Finds the records of a segment with start <= timestamp <= end
+
+        :return: tuple(int, int) -- (low, high) positions of the records in the segment
+        """
+        low, high = 0, len(records)
+        index = SegmentIndex.read_index(self._directory, segment_number)
+        if index is not None and len(index):
+            if start is not None:
+                entry = numpy.searchsorted(index['timestamp'], start, side='left') - 1
+                if entry >= 0:
+                    low = SegmentIndex.record_number(index['offset'][entry])
+            if end is not None:
+                entry = numpy.searchsorted(index['timestamp'], end, side='right')
+                if entry < len(index):
+                    high = SegmentIndex.record_number(index['offset'][entry])
+        # Only the records between the two index entries are touched
+        timestamps = numpy.ascontiguousarray(records['timestamp'][low:high])
+        first = 0 if start is None else numpy.searchsorted(timestamps, start, side='left')
+        last = len(timestamps) if end is None else numpy.searchsorted(timestamps, end, side='right')
+        return low + int(first), low + int(last)
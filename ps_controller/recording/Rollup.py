@@ -0,0 +1,224 @@
+"""Multi resolution aggregates of a recording.
+
+For every level in LEVELS a rollup file next to the raw segments holds one record per bucket of that many seconds,
+with min, max, mean and count of output voltage and current, and the last target values of the bucket.
+"""
+
+import bisect
+import math
+import os
+
+import numpy
+
+from ..acquisition import SampleHistory
+
+LEVELS = (1, 60, 3600)
+
+ROLLUP_DTYPE = numpy.dtype([
+    ('bucket_start', '<f8'),
+    ('count', '<u4'),
+    ('output_voltage_min', '<f4'),
+    ('output_voltage_max', '<f4'),
+    ('output_voltage_mean', '<f8'),
+    ('output_current_min', '<f4'),
+    ('output_current_max', '<f4'),
+    ('output_current_mean', '<f8'),
+    ('target_voltage', '<f4'),
+    ('target_current', '<f4')])
+
+
+def rollup_path(directory, level):
+    """Gets the path of the rollup file of a level
+
+    :param directory: The recording directory
+    :type directory: str
+    :param level: Bucket size in seconds
+    :type level: int
+    :return: str -- Path of the rollup file
+    """
+    return os.path.join(directory, 'rollup_{0}s.bin'.format(level))
+
+
+def choose_level(resolution, levels=LEVELS):
+    """Chooses the coarsest level with buckets no larger than the requested resolution
+
+    :param resolution: Requested seconds per point
+    :type resolution: float
+    :param levels: Available bucket sizes in seconds
+    :type levels: tuple[int]
+    :return: int or None -- Bucket size in seconds. None if raw samples are needed
+    """
+    usable = [level for level in levels if level <= resolution]
+    return max(usable) if usable else None
+
+
+class RollupAggregator:
+    """Maintains the open bucket of every level as samples arrive. Each sample costs O(1) per level"""
+
+    def __init__(self, bucket_finished, levels=LEVELS):
+        """Constructor
+
+        :param bucket_finished: Called with the level and the finished bucket as a tuple in ROLLUP_DTYPE order
+        :type bucket_finished: lambda x: func(level: int, bucket: tuple) -> None
+        :param levels: Bucket sizes in seconds
+        :type levels: tuple[int]
+        """
+        self._bucket_finished = bucket_finished
+        self._levels = levels
+        self._buckets = dict((level, None) for level in levels)
+
+    def add(self, timestamp, output_voltage, output_current, target_voltage, target_current):
+        """Adds a sample to the open bucket of every level, finishing buckets the sample is past
+
+        :return: None
+        """
+        for level in self._levels:
+            bucket_start = math.floor(timestamp / level) * level
+            bucket = self._buckets[level]
+            if bucket is None or bucket[0] != bucket_start:
+                if bucket is not None:
+                    self._bucket_finished(level, self._to_record(bucket))
+                self._buckets[level] = [bucket_start, 1, output_voltage, output_voltage, output_voltage,
+                                        output_current, output_current, output_current, target_voltage,
+                                        target_current]
+                continue
+            bucket[1] += 1
+            if output_voltage < bucket[2]:
+                bucket[2] = output_voltage
+            elif output_voltage > bucket[3]:
+                bucket[3] = output_voltage
+            bucket[4] += output_voltage
+            if output_current < bucket[5]:
+                bucket[5] = output_current
+            elif output_current > bucket[6]:
+                bucket[6] = output_current
+            bucket[7] += output_current
+            bucket[8] = target_voltage
+            bucket[9] = target_current
+
+    def flush(self):
+        """Finishes the open bucket of every level
+
+        :return: None
+        """
+        for level in self._levels:
+            if self._buckets[level] is not None:
+                self._bucket_finished(level, self._to_record(self._buckets[level]))
+                self._buckets[level] = None
+
+    def resume(self, level, record):
+        """Reopens a bucket written by flush, so samples of the same bucket that arrive later are added to it
+        instead of starting a second bucket with the same start
+
+        :param level: Bucket size in seconds
+        :type level: int
+        :param record: The bucket as read from the rollup file, in ROLLUP_DTYPE order
+        :type record: tuple
+        :return: None
+        """
+        count = record[1]
+        self._buckets[level] = [record[0], count, record[2], record[3], record[4] * count,
+                                record[5], record[6], record[7] * count, record[8], record[9]]
+
+    @staticmethod
+    def _to_record(bucket):
+        count = bucket[1]
+        return (bucket[0], count, bucket[2], bucket[3], bucket[4] / count,
+                bucket[5], bucket[6], bucket[7] / count, bucket[8], bucket[9])
+
+
+def aggregate(records, level):
+    """Computes the rollup of a level from raw records
+
+    :param records: Raw records in time order with dtype SegmentFormat.RECORD_DTYPE
+    :type records: numpy.ndarray
+    :param level: Bucket size in seconds
+    :type level: int
+    :return: numpy.ndarray -- Buckets with dtype ROLLUP_DTYPE
+    """
+    if not len(records):
+        return numpy.empty(0, dtype=ROLLUP_DTYPE)
+    bucket_starts = numpy.floor(records['timestamp'] / level) * level
+    starts = numpy.flatnonzero(numpy.concatenate(([True], bucket_starts[1:] != bucket_starts[:-1])))
+    ends = numpy.append(starts[1:], len(records)) - 1
+    counts = numpy.diff(numpy.append(starts, len(records)))
+
+    rollup = numpy.empty(len(starts), dtype=ROLLUP_DTYPE)
+    rollup['bucket_start'] = bucket_starts[starts]
+    rollup['count'] = counts
+    for name in ('output_voltage', 'output_current'):
+        values = records[name].astype(numpy.float64)
+        rollup[name + '_min'] = numpy.minimum.reduceat(values, starts)
+        rollup[name + '_max'] = numpy.maximum.reduceat(values, starts)
+        rollup[name + '_mean'] = numpy.add.reduceat(values, starts) / counts
+    rollup['target_voltage'] = records['target_voltage'][ends]
+    rollup['target_current'] = records['target_current'][ends]
+    return rollup
+
+
+def rebuild_rollups(directory, records, levels=LEVELS):
+    """Recomputes all rollup files of a recording from its raw records, replacing existing files
+
+    :param directory: The recording directory
+    :type directory: str
+    :param records: All raw records of the recording in time order
+    :type records: numpy.ndarray
+    :param levels: Bucket sizes in seconds
+    :type levels: tuple[int]
+    :return: None
+    """
+    for level in levels:
+        with open(rollup_path(directory, level), 'wb') as f:
+            f.write(aggregate(records, level).tobytes())
+
+
+def read_rollup(directory, level, start=None, end=None):
+    """Reads the buckets of a level that start within start <= bucket_start <= end
+
+    :param directory: The recording directory
+    :type directory: str
+    :param level: Bucket size in seconds
+    :type level: int
+    :param start: Earliest bucket start to include. None for no lower bound
+    :type start: float
+    :param end: Latest bucket start to include. None for no upper bound
+    :type end: float
+    :return: numpy.ndarray -- Zero copy view of the buckets with dtype ROLLUP_DTYPE
+    """
+    path = rollup_path(directory, level)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    count = size // ROLLUP_DTYPE.itemsize
+    if not count:
+        return numpy.empty(0, dtype=ROLLUP_DTYPE)
+    rollup = numpy.memmap(path, dtype=ROLLUP_DTYPE, mode='r', shape=(count,))
+    bucket_starts = rollup['bucket_start']
+    low = 0 if start is None else bisect.bisect_left(bucket_starts, math.floor(start / level) * level)
+    high = count if end is None else bisect.bisect_right(bucket_starts, end)
+    return rollup[low:high]
+
+
+def to_sample_columns(rollup, level, envelope=False):
+    """Converts buckets to sample columns as returned by SampleHistory.get_range
+
+    :param rollup: Buckets with dtype ROLLUP_DTYPE
+    :type rollup: numpy.ndarray
+    :param level: Bucket size in seconds
+    :type level: int
+    :param envelope: If True every bucket becomes two samples, its minimum and maximum. Otherwise its mean
+    :type envelope: bool
+    :return: dict[str, numpy.ndarray] -- Sample columns
+    """
+    timestamps = rollup['bucket_start'] + level / 2.0
+    if envelope:
+        columns = {SampleHistory.TIMESTAMP: numpy.repeat(timestamps, 2)}
+        for name in (SampleHistory.OUTPUT_VOLTAGE, SampleHistory.OUTPUT_CURRENT):
+            columns[name] = numpy.column_stack((rollup[name + '_min'], rollup[name + '_max'])).ravel()
+        for name in (SampleHistory.TARGET_VOLTAGE, SampleHistory.TARGET_CURRENT):
+            columns[name] = numpy.repeat(rollup[name], 2)
+        return columns
+    return {
+        SampleHistory.TIMESTAMP: timestamps,
+        SampleHistory.OUTPUT_VOLTAGE: rollup['output_voltage_mean'],
+        SampleHistory.OUTPUT_CURRENT: rollup['output_current_mean'],
+        SampleHistory.TARGET_VOLTAGE: rollup['target_voltage'],
+        SampleHistory.TARGET_CURRENT: rollup['target_current']}
@@ -0,0 +1,109 @@
+"""Binary wire format for streaming samples to clients that want every sample at the highest rate.
+
+A stream starts with a header: the magic, the version and the length of a JSON schema, all little endian, followed
+by the schema. The schema lists the record fields as [name, numpy format] pairs and the record size, so a client can
+build the record dtype from the stream itself. The header is followed by frames, each a little endian uint32 byte
+length and that many bytes of fixed width little endian records. A frame holds every sample acquired since the
+previous frame, and may be empty to keep the connection alive.
+"""
+
+import json
+import struct
+
+import numpy
+
+MAGIC = b'PSSTREAM'
+VERSION = 1
+CONTENT_TYPE = 'application/octet-stream'
+
+FLAG_OUTPUT_ON = 1
+
+# Voltages in mV and currents in mA as in SegmentFormat. Packed, as records are only read through the dtype
+RECORD_DTYPE = numpy.dtype({
+    'names': ['timestamp', 'output_voltage', 'output_current', 'target_voltage', 'target_current', 'flags'],
+    'formats': ['<f8', '<f4', '<f4', '<f4', '<f4', '<u4'],
+    'offsets': [0, 8, 12, 16, 20, 24],
+    'itemsize': 28})
+
+_PREFIX = struct.Struct('<8sII')
+_FRAME_LENGTH = struct.Struct('<I')
+
+
+def create_header():
+    """Creates the header a stream starts with
+
+    :return: bytes -- The header
+    """
+    schema = json.dumps({
+        "fields": [[name, RECORD_DTYPE.fields[name][0].str] for name in RECORD_DTYPE.names],
+        "record_size": RECORD_DTYPE.itemsize,
+        "flags": {"output_on": FLAG_OUTPUT_ON}}).encode('utf-8')
+    return _PREFIX.pack(MAGIC, VERSION, len(schema)) + schema
+
+
+def encode_frame(samples):
+    """Encodes samples as one frame
+
+    :param samples: (timestamp, values) of every sample
+    :type samples: list[tuple(float, DeviceValues)]
+    :return: bytes -- The frame
+    """
+    records = numpy.zeros(len(samples), RECORD_DTYPE)
+    values = [device_values for timestamp, device_values in samples]
+    records['timestamp'] = [timestamp for timestamp, device_values in samples]
+    records['output_voltage'] = [v.output_voltage for v in values]
+    records['output_current'] = [v.output_current for v in values]
+    records['target_voltage'] = [v.target_voltage for v in values]
+    records['target_current'] = [v.target_current for v in values]
+    records['flags'] = [FLAG_OUTPUT_ON if v.output_is_on else 0 for v in values]
+    return _FRAME_LENGTH.pack(records.nbytes) + records.tobytes()
+
+
+def read_header(stream):
+    """Reads the header of a stream
+
+    :param stream: The stream, e.g. an http.client.HTTPResponse or a file opened in binary mode
+    :return: numpy.dtype -- The record dtype described by the schema
+    :raise: ValueError if the stream is not a sample stream of this version
+    """
+    magic, version, schema_length = _PREFIX.unpack(_read_exactly(stream, _PREFIX.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version {0} sample stream".format(VERSION))
+    schema = json.loads(_read_exactly(stream, schema_length).decode('utf-8'))
+    names = [name for name, field_format in schema["fields"]]
+    formats = [field_format for name, field_format in schema["fields"]]
+    return numpy.dtype(_packed(names, formats, schema["record_size"]))
+
+
+def read_batches(stream):
+    """Reads the batches of samples of a stream until it ends. Every batch is decoded without copying the records
+
+    :param stream: The stream, e.g. an http.client.HTTPResponse or a file opened in binary mode
+    :return: generator of numpy.ndarray -- One structured array per non-empty frame, with the fields of the schema
+    :raise: ValueError if the stream is not a sample stream of this version
+    """
+    dtype = read_header(stream)
+    while True:
+        length_bytes = stream.read(_FRAME_LENGTH.size)
+        if len(length_bytes) < _FRAME_LENGTH.size:
+            return
+        length, = _FRAME_LENGTH.unpack(length_bytes)
+        if length:
+            yield numpy.frombuffer(_read_exactly(stream, length), dtype)
+
+
+def _packed(names, formats, record_size):
+    """Gets the dtype dict of fields laid out back to back"""
+    offsets = []
+    offset = 0
+    for field_format in formats:
+        offsets.append(offset)
+        offset += numpy.dtype(field_format).itemsize
+    return {'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': record_size}
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Sample stream ended early")
+    return data
@@ -0,0 +1,76 @@
+"""File layout of recording segments.
+
+A recording is a directory of append-only segment files. Every segment starts with a fixed size header followed
+by fixed width little endian records, one per acquired sample.
+"""
+
+import os
+import re
+import struct
+
+import numpy
+
+MAGIC = b'PSRECORD'
+VERSION = 1
+HEADER_FORMAT = '<8sII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+RECORD_DTYPE = numpy.dtype({
+    'names': ['timestamp', 'output_voltage', 'output_current', 'target_voltage', 'target_current',
+              'input_voltage', 'pre_reg_voltage', 'output_is_on'],
+    'formats': ['<f8', '<f4', '<f4', '<f4', '<f4', '<f4', '<f4', 'u1'],
+    'offsets': [0, 8, 12, 16, 20, 24, 28, 32],
+    'itemsize': 40})
+
+SEGMENT_EXTENSION = '.psr'
+_SEGMENT_NAME_PATTERN = re.compile(r'^segment_(\d+)' + re.escape(SEGMENT_EXTENSION) + '$')
+
+
+def create_header():
+    """Creates the header written at the start of every segment
+
+    :return: bytes -- The segment header
+    """
+    return struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_DTYPE.itemsize)
+
+
+def verify_header(header):
+    """Verifies a segment header
+
+    :param header: The first HEADER_SIZE bytes of a segment
+    :type header: bytes
+    :return: bool -- If the header belongs to a segment this version can read
+    """
+    if len(header) != HEADER_SIZE:
+        return False
+    magic, version, record_size = struct.unpack(HEADER_FORMAT, header)
+    return magic == MAGIC and version == VERSION and record_size == RECORD_DTYPE.itemsize
+
+
+def segment_path(directory, segment_number):
+    """Gets the path of a segment
+
+    :param directory: The recording directory
+    :type directory: str
+    :param segment_number: Sequence number of the segment
+    :type segment_number: int
+    :return: str -- Path of the segment file
+    """
+    return os.path.join(directory, 'segment_{0:06d}{1}'.format(segment_number, SEGMENT_EXTENSION))
+
+
+def segment_numbers(directory):
+    """Gets the sequence numbers of all segments in a recording directory
+
+    :param directory: The recording directory
+    :type directory: str
+    :return: list[int] -- Sorted segment numbers
+    """
+    if not os.path.isdir(directory):
+        return []
+    numbers = []
+    for file_name in os.listdir(directory):
+        match = _SEGMENT_NAME_PATTERN.match(file_name)
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
@@ -0,0 +1,105 @@
+"""Sparse time index of recording segments.
+
+Next to every segment an index file maps the timestamp of every INDEX_INTERVAL-th record to the byte offset of that
+record in the segment. Index entries are only written after the records they point to, so an index never points
+past the end of its segment.
+"""
+
+import os
+
+import numpy
+
+from . import SegmentFormat
+
+INDEX_INTERVAL = 1024
+INDEX_EXTENSION = '.idx'
+INDEX_DTYPE = numpy.dtype([('timestamp', '<f8'), ('offset', '<u8')])
+
+
+def index_path(directory, segment_number):
+    """Gets the path of the index of a segment
+
+    :param directory: The recording directory
+    :type directory: str
+    :param segment_number: Sequence number of the segment
+    :type segment_number: int
+    :return: str -- Path of the index file
+    """
+    segment_file = SegmentFormat.segment_path(directory, segment_number)
+    return segment_file[:-len(SegmentFormat.SEGMENT_EXTENSION)] + INDEX_EXTENSION
+
+
+def record_offset(record_number):
+    """Gets the byte offset of a record in its segment
+
+    :param record_number: Position of the record in the segment
+    :type record_number: int or numpy.ndarray
+    :return: int or numpy.ndarray -- Byte offset from the start of the segment file
+    """
+    return SegmentFormat.HEADER_SIZE + record_number * SegmentFormat.RECORD_DTYPE.itemsize
+
+
+def record_number(offset):
+    """Gets the position of a record in its segment from its byte offset
+
+    :param offset: Byte offset from the start of the segment file
+    :type offset: int
+    :return: int -- Position of the record in the segment
+    """
+    return (int(offset) - SegmentFormat.HEADER_SIZE) // SegmentFormat.RECORD_DTYPE.itemsize
+
+
+def create_entries(timestamps, first_record_number, interval=INDEX_INTERVAL):
+    """Creates the index entries for consecutive records of a segment
+
+    :param timestamps: Timestamps of the records
+    :type timestamps: numpy.ndarray
+    :param first_record_number: Position of the first of the records in the segment
+    :type first_record_number: int
+    :param interval: Every interval-th record of the segment is indexed
+    :type interval: int
+    :return: numpy.ndarray -- Index entries with dtype INDEX_DTYPE
+    """
+    first_indexed = -first_record_number % interval
+    positions = numpy.arange(first_indexed, len(timestamps), interval)
+    entries = numpy.empty(len(positions), dtype=INDEX_DTYPE)
+    entries['timestamp'] = timestamps[positions]
+    entries['offset'] = record_offset(positions + first_record_number)
+    return entries
+
+
+def read_index(directory, segment_number):
+    """Reads the index of a segment
+
+    :param directory: The recording directory
+    :type directory: str
+    :param segment_number: Sequence number of the segment
+    :type segment_number: int
+    :return: numpy.ndarray or None -- Index entries with dtype INDEX_DTYPE. None if the segment has no index
+    """
+    path = index_path(directory, segment_number)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = f.read()
+    whole_entries = len(data) // INDEX_DTYPE.itemsize
+    return numpy.frombuffer(data, dtype=INDEX_DTYPE, count=whole_entries)
+
+
+def rebuild_index(directory, segment_number, records, interval=INDEX_INTERVAL):
+    """Writes a new index for a segment, replacing any existing index
+
+    :param directory: The recording directory
+    :type directory: str
+    :param segment_number: Sequence number of the segment
+    :type segment_number: int
+    :param records: All records of the segment
+    :type records: numpy.ndarray
+    :param interval: Every interval-th record of the segment is indexed
+    :type interval: int
+    :return: numpy.ndarray -- The new index entries
+    """
+    entries = create_entries(records['timestamp'], 0, interval)
+    with open(index_path(directory, segment_number), 'wb') as f:
+        f.write(entries.tobytes())
+    return entries
@@ -0,0 +1,101 @@
+import math
+import threading
+import time
+
+from ps_controller import SerialParser
+from ps_controller.Constants import Constants
+from ..utilities.Crc import CrcHelper
+
+
+class SimulatedPs201:
+    """Software model of a PS201 that speaks the serial protocol of the device.
+
+    The output voltage follows the target voltage with first order dynamics and the output current is given by a
+    resistive load. When the load would draw more than the current limit the output is current limited.
+    """
+
+    def __init__(self, input_voltage=24000, load_resistance=100.0, time_constant=0.05):
+        """Constructor
+
+        :param input_voltage: Input voltage in mV
+        :type input_voltage: int
+        :param load_resistance: Resistance of the simulated load in ohm
+        :type load_resistance: float
+        :param time_constant: Time constant of the output voltage in seconds
+        :type time_constant: float
+        """
+        self.input_voltage = input_voltage
+        self.load_resistance = load_resistance
+        self.time_constant = time_constant
+        self.target_voltage = 0
+        self.target_current = 0
+        self.output_is_on = False
+        self.transaction_count = 0
+        self._output_voltage = 0.0
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def handle_frame(self, frame):
+        """Handles a single frame sent to the device
+
+        :param frame: Serial frame from the host
+        :type frame: bytes
+        :return: bytes -- All frames the device responds with
+        """
+        request = SerialParser.from_serial(frame)
+        if not request or CrcHelper.verify_crc_code(request)[0]:
+            return SerialParser.to_serial(Constants.NOT_ACKNOWLEDGE_COMMAND)
+
+        with self._lock:
+            self.transaction_count += 1
+            self._update_output()
+            response = SerialParser.to_serial(Constants.ACKNOWLEDGE_COMMAND)
+            if request.command == Constants.WRITE_ALL_COMMAND:
+                response += SerialParser.to_serial(Constants.WRITE_ALL_RESPOND, self._all_values_data())
+            elif request.command == Constants.SET_VOLTAGE_COMMAND:
+                self.target_voltage = int(request.data)
+            elif request.command == Constants.SET_CURRENT_COMMAND:
+                self.target_current = int(request.data)
+            elif request.command == Constants.SET_OUTPUT_ON_COMMAND:
+                self.output_is_on = request.data == "1"
+            elif request.command != Constants.HANDSHAKE_COMMAND:
+                response = SerialParser.to_serial(Constants.NOT_ACKNOWLEDGE_COMMAND)
+            return response
+
+    def output_voltage(self):
+        """Gets the current output voltage
+
+        :return: float -- Output voltage in mV
+        """
+        with self._lock:
+            self._update_output()
+            return self._output_voltage
+
+    def _update_output(self):
+        now = time.monotonic()
+        settled_voltage = self._settled_voltage()
+        if self.time_constant > 0:
+            decay = math.exp(-(now - self._last_update) / self.time_constant)
+        else:
+            decay = 0.0
+        self._output_voltage = settled_voltage + (self._output_voltage - settled_voltage) * decay
+        self._last_update = now
+
+    def _settled_voltage(self):
+        """Gets the output voltage the output converges to with the current settings
+
+        :return: float -- Voltage in mV
+        """
+        if not self.output_is_on:
+            return 0.0
+        voltage = min(self.target_voltage, self.input_voltage)
+        # mV / ohm gives mA
+        if voltage / self.load_resistance > self.target_current:
+            voltage = self.target_current * self.load_resistance
+        return float(voltage)
+
+    def _all_values_data(self):
+        output_voltage = int(round(self._output_voltage))
+        output_current = int(round(self._output_voltage / self.load_resistance))
+        return "{0};{1};{2};{3};{4}".format(output_voltage, output_current, self.target_voltage,
+                                            self.target_current, 1 if self.output_is_on else 0)
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import serial
+
+from ps_controller.Constants import Constants
+from .SimulatedPs201 import SimulatedPs201
+from ..connection.SerialConnectionInterface import SerialConnectionInterface
+
+
+class SimulatedSerialLink(SerialConnectionInterface):
+    """A serial link to a SimulatedPs201. Emulates the transfer time of the serial line if a baud rate is given"""
+
+    def __init__(self, device, baudrate=9600, timeout=0.1):
+        """Constructor
+
+        :param device: The simulated device on the other end of the link
+        :type device: SimulatedPs201
+        :param baudrate: Baud rate of the emulated line. None or 0 to transfer instantly
+        :type baudrate: int
+        :param timeout: Seconds a read waits for data before returning empty
+        :type timeout: float
+        """
+        self.port = None
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._device = device
+        self._open = False
+        self._input = bytearray()
+        self._output = bytearray()
+        self._next_byte_time = 0.0
+        self._lock = threading.Lock()
+
+    def isOpen(self):
+        return self._open
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def flushInput(self):
+        with self._lock:
+            self._output = bytearray()
+
+    def write(self, data):
+        if not self._open:
+            raise serial.SerialException("Trying to write when connection is closed")
+        self._wait_for_transfer(len(data))
+        responses = []
+        with self._lock:
+            self._input += data
+            for frame in self._complete_frames():
+                responses.append(self._device.handle_frame(frame))
+            for response in responses:
+                self._output += response
+        return len(data)
+
+    def read(self, number_of_bytes):
+        if not self._open:
+            raise serial.SerialException("Trying to read when connection is closed")
+        with self._lock:
+            data = bytes(self._output[:number_of_bytes])
+            del self._output[:number_of_bytes]
+        if not data:
+            time.sleep(self.timeout)
+            return b''
+        self._wait_for_transfer(len(data))
+        return data
+
+    def _complete_frames(self):
+        """Removes all complete frames from the input buffer
+
+        :return: list[bytes] -- The complete frames
+        """
+        frames = []
+        marker = ord(Constants.START)
+        while True:
+            start = self._input.find(marker)
+            if start < 0:
+                self._input = bytearray()
+                break
+            end = self._input.find(marker, start + 1)
+            if end < 0:
+                del self._input[:start]
+                break
+            frames.append(bytes(self._input[start:end + 1]))
+            del self._input[:end + 1]
+        return frames
+
+    def _wait_for_transfer(self, number_of_bytes):
+        """Waits until number_of_bytes more bytes would have been transferred on the emulated line
+
+        :param number_of_bytes: Number of bytes transferred
+        :type number_of_bytes: int
+        :return: None
+        """
+        if not self.baudrate:
+            return
+        # 8 data bits, one start and one stop bit
+        now = time.monotonic()
+        self._next_byte_time = max(self._next_byte_time, now) + number_of_bytes * 10.0 / self.baudrate
+        delay = self._next_byte_time - now
+        if delay > 0:
+            time.sleep(delay)
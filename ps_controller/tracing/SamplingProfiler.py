@@ -0,0 +1,84 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads of the process at a fixed interval.
+
+    Nothing is instrumented, so the code being profiled runs at full speed between samples. The cost is taking
+    the stacks of all threads once per interval while holding the GIL.
+    """
+
+    def __init__(self, interval=0.01):
+        """Constructor
+
+        :param interval: Seconds between samples
+        :type interval: float
+        """
+        self._interval = interval
+        self._stacks = collections.Counter()
+        self.samples = 0
+
+    def run(self, seconds, ignored_thread_ids=()):
+        """Samples for a while on a thread of its own and waits for it to finish
+
+        :param seconds: Seconds to sample for
+        :type seconds: float
+        :param ignored_thread_ids: Threads not to sample, e.g. the thread waiting for the profile
+        :type ignored_thread_ids: tuple(int)
+        :return: collections.Counter -- Number of samples by collapsed stack, see collapse
+        """
+        sampler = threading.Thread(target=self._sample, args=(seconds, set(ignored_thread_ids)),
+                                   name="SamplingProfiler", daemon=True)
+        sampler.start()
+        sampler.join()
+        return self._stacks
+
+    def _sample(self, seconds, ignored_thread_ids):
+        ignored_thread_ids.add(threading.get_ident())
+        deadline = time.perf_counter() + seconds
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            thread_names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in ignored_thread_ids:
+                    self._stacks[collapse(thread_names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+            next_sample += self._interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind, e.g. the GIL was held. Skip samples instead of catching up in a burst
+                next_sample = time.perf_counter()
+
+
+def collapse(thread_name, frame):
+    """Collapses a stack into one line as used by flame graph tools
+
+    :param thread_name: Name of the thread of the stack, used as the root frame
+    :type thread_name: str
+    :param frame: The innermost frame of the stack
+    :type frame: frame
+    :return: str -- "thread;file:function;...;file:function", outermost frame first
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(os.path.basename(code.co_filename) + ":" + code.co_name)
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names)).replace(" ", "_")
+
+
+def format_collapsed(stacks):
+    """Formats sampled stacks for flame graph tools, e.g. flamegraph.pl or speedscope
+
+    :param stacks: Number of samples by collapsed stack
+    :type stacks: collections.Counter
+    :return: str -- One "stack count" line per stack, most sampled first
+    """
+    return "".join("{0} {1}\n".format(stack, count) for stack, count in stacks.most_common())
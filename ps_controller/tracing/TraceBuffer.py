@@ -0,0 +1,47 @@
+import collections
+import threading
+
+from .Tracing import TraceHook, Trace
+
+
+class TraceBuffer(TraceHook):
+    """Keeps the most recent traces in a ring buffer"""
+
+    def __init__(self, capacity=1000):
+        """Constructor
+
+        :param capacity: Number of traces kept. The oldest trace is dropped for a new one
+        :type capacity: int
+        """
+        self._traces = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def on_trace(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def clear(self):
+        """Drops all traces
+
+        :return: None
+        """
+        with self._lock:
+            self._traces.clear()
+
+    def slowest(self, number_of_traces=20, name=None):
+        """Gets the slowest of the kept traces
+
+        :param number_of_traces: Maximum number of traces to get
+        :type number_of_traces: int
+        :param name: Only get traces with this name, e.g. a device command. None for all traces
+        :type name: str
+        :return: list[Trace] -- The traces, slowest first
+        """
+        with self._lock:
+            traces = [trace for trace in self._traces if name is None or trace.name == name]
+        traces.sort(key=Trace.duration, reverse=True)
+        return traces[:number_of_traces]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._traces)
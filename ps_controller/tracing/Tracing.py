@@ -0,0 +1,158 @@
+"""Per phase tracing of device transactions.
+
+Instrumented code checks the module level `hooks` list before doing anything else, so tracing costs one truthiness
+check while no hook is registered. With a hook, every transaction becomes a Trace of spans timestamped with
+time.perf_counter, a monotonic clock, and the finished trace is handed to every hook.
+"""
+
+import threading
+import time
+
+hooks = []
+_hooks_lock = threading.Lock()
+_current = threading.local()
+
+
+class TraceHook:
+    """Receives finished traces"""
+
+    def on_trace(self, trace):
+        """Called with every finished trace on the thread that made the transaction. Must be quick
+
+        :param trace: The finished trace
+        :type trace: Trace
+        :return: None
+        """
+        raise NotImplementedError()
+
+
+class Trace:
+    """Spans of the phases of one transaction"""
+
+    def __init__(self, name, start=None):
+        """Constructor
+
+        :param name: What is traced, e.g. the device command
+        :type name: str
+        :param start: time.perf_counter() when the transaction started. None for now
+        :type start: float
+        """
+        self.name = name
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.error = None
+        self.thread = threading.current_thread().name
+        self.spans = []
+        self._last_mark = self.start
+
+    def add_span(self, name, start, end):
+        """Adds a span
+
+        :param name: Name of the phase
+        :type name: str
+        :param start: time.perf_counter() when the phase started
+        :type start: float
+        :param end: time.perf_counter() when the phase ended
+        :type end: float
+        :return: None
+        """
+        self.spans.append((name, start, end))
+
+    def mark(self, name):
+        """Adds a span from the end of the previous marked phase to now
+
+        :param name: Name of the phase that just ended
+        :type name: str
+        :return: None
+        """
+        now = time.perf_counter()
+        self.spans.append((name, self._last_mark, now))
+        self._last_mark = now
+
+    def duration(self):
+        """Gets the duration of the transaction
+
+        :return: float -- Seconds. Up to now if the trace is not finished
+        """
+        return (time.perf_counter() if self.end is None else self.end) - self.start
+
+    def to_dict(self):
+        """Gets the trace with times in milliseconds from the start of the transaction
+
+        :return: dict -- JSON serializable dict with keys 'name', 'start', 'duration_ms', 'error', 'thread' and
+            'spans', a list of dicts with keys 'name', 'start_ms' and 'duration_ms' in order of start
+        """
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration() * 1000, 3),
+            "error": self.error,
+            "thread": self.thread,
+            "spans": [{"name": name, "start_ms": round((start - self.start) * 1000, 3),
+                       "duration_ms": round((end - start) * 1000, 3)}
+                      for name, start, end in sorted(self.spans, key=lambda span: span[1])]}
+
+
+def add_hook(hook):
+    """Registers a hook. Transactions are traced while any hook is registered
+
+    :param hook: The hook
+    :type hook: TraceHook
+    :return: None
+    """
+    global hooks
+    with _hooks_lock:
+        if hook not in hooks:
+            # Replaced instead of changed so instrumented code can iterate without a lock
+            hooks = hooks + [hook]
+
+
+def remove_hook(hook):
+    """Unregisters a hook
+
+    :param hook: The hook
+    :type hook: TraceHook
+    :return: None
+    """
+    global hooks
+    with _hooks_lock:
+        hooks = [registered for registered in hooks if registered is not hook]
+
+
+def begin(name, start=None):
+    """Starts the trace of a transaction on this thread. Only call if hooks is not empty
+
+    :param name: What is traced, e.g. the device command
+    :type name: str
+    :param start: time.perf_counter() when the transaction started. None for now
+    :type start: float
+    :return: Trace -- The trace. Spans of nested code, e.g. the connection, are added to it
+    """
+    trace = Trace(name, start)
+    _current.trace = trace
+    return trace
+
+
+def current():
+    """Gets the trace of the transaction running on this thread
+
+    :return: Trace or None -- The trace. None if no transaction is traced
+    """
+    return getattr(_current, 'trace', None)
+
+
+def finish(trace, error=None):
+    """Ends the trace of a transaction and hands it to the hooks
+
+    :param trace: The trace started with begin
+    :type trace: Trace
+    :param error: Why the transaction failed. None if it succeeded
+    :type error: str
+    :return: None
+    """
+    trace.end = time.perf_counter()
+    trace.error = error
+    if getattr(_current, 'trace', None) is trace:
+        _current.trace = None
+    for hook in hooks:
+        hook.on_trace(trace)
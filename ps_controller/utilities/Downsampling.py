@@ -0,0 +1,129 @@
+import numpy
+
+MIN_MAX = "minmax"
+LTTB = "lttb"
+
+
+def bucket_edges(number_of_points, number_of_buckets):
+    """Splits number_of_points consecutive points into number_of_buckets buckets of (almost) equal size
+
+    :param number_of_points: Number of points to split
+    :type number_of_points: int
+    :param number_of_buckets: Number of buckets to split into
+    :type number_of_buckets: int
+    :return: numpy.ndarray -- number_of_buckets + 1 bucket edges. Bucket i spans [edges[i], edges[i + 1])
+    """
+    return numpy.linspace(0, number_of_points, number_of_buckets + 1).astype(numpy.int64)
+
+
+def min_max(y, max_points):
+    """Selects the indices of the minimum and maximum point of each bucket (min/max envelope)
+
+    Every bucket contributes its extreme points in time order so drawing the selected points gives the same
+    envelope as drawing all points.
+
+    :param y: Values to downsample
+    :type y: numpy.ndarray
+    :param max_points: Maximum number of indices to return. At least 2, the minimum and maximum of one bucket
+    :type max_points: int
+    :return: numpy.ndarray -- Sorted indices into y
+    :raise: ValueError if max_points is below 2
+    """
+    if max_points < 2:
+        raise ValueError("Min max downsampling needs max_points of at least 2")
+    y = numpy.asarray(y)
+    number_of_points = len(y)
+    if number_of_points <= max_points:
+        return numpy.arange(number_of_points)
+    number_of_buckets = max_points // 2
+    edges = bucket_edges(number_of_points, number_of_buckets)
+    starts = edges[:-1]
+    sizes = numpy.diff(edges)
+    bucket_of_point = numpy.repeat(numpy.arange(number_of_buckets), sizes)
+
+    min_indices = _first_index_per_bucket(y == numpy.repeat(numpy.minimum.reduceat(y, starts), sizes),
+                                          bucket_of_point)
+    max_indices = _first_index_per_bucket(y == numpy.repeat(numpy.maximum.reduceat(y, starts), sizes),
+                                          bucket_of_point)
+    return numpy.unique(numpy.concatenate((min_indices, max_indices)))
+
+
+def lttb(x, y, max_points):
+    """Selects indices with the Largest-Triangle-Three-Buckets algorithm
+
+    The first and last points are always kept. Every bucket in between contributes the point forming the
+    largest triangle with the previously selected point and the average point of the next bucket.
+
+    :param x: Point x values (typically timestamps). Must be increasing
+    :type x: numpy.ndarray
+    :param y: Point y values
+    :type y: numpy.ndarray
+    :param max_points: Maximum number of indices to return. At least 3, the first, last and one in between
+    :type max_points: int
+    :return: numpy.ndarray -- Sorted indices into x and y
+    :raise: ValueError if max_points is below 3
+    """
+    if max_points < 3:
+        raise ValueError("LTTB downsampling needs max_points of at least 3")
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    number_of_points = len(y)
+    if number_of_points <= max_points:
+        return numpy.arange(number_of_points)
+
+    # The first and last point are their own buckets
+    edges = bucket_edges(number_of_points - 2, max_points - 2) + 1
+    sizes = numpy.diff(edges)
+    x_averages = numpy.add.reduceat(x, edges[:-1]) / sizes
+    y_averages = numpy.add.reduceat(y, edges[:-1]) / sizes
+    x_averages = numpy.append(x_averages, x[-1])
+    y_averages = numpy.append(y_averages, y[-1])
+
+    selected = numpy.empty(max_points, dtype=numpy.int64)
+    selected[0] = 0
+    selected[-1] = number_of_points - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = x_averages[bucket + 1], y_averages[bucket + 1]
+        previous_x, previous_y = x[previous], y[previous]
+        areas = numpy.abs((previous_x - next_x) * (y[start:end] - previous_y) -
+                          (previous_x - x[start:end]) * (next_y - previous_y))
+        previous = start + int(numpy.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(x, y, max_points, method=LTTB):
+    """Selects at most max_points indices of (x, y) that keep the visual shape of the data
+
+    :param x: Point x values. Must be increasing
+    :type x: numpy.ndarray
+    :param y: Point y values
+    :type y: numpy.ndarray
+    :param max_points: Maximum number of indices to return
+    :type max_points: int
+    :param method: Either MIN_MAX or LTTB
+    :type method: str
+    :return: numpy.ndarray -- Sorted indices into x and y
+    :raise: ValueError if method is unknown or max_points is too small for it
+    """
+    if method == LTTB:
+        return lttb(x, y, max_points)
+    elif method == MIN_MAX:
+        return min_max(y, max_points)
+    raise ValueError("Unknown downsampling method: " + str(method))
+
+
+def _first_index_per_bucket(mask, bucket_of_point):
+    """Finds the first index where mask is True for every bucket
+
+    :param mask: Point mask. Every bucket must contain at least one True value
+    :type mask: numpy.ndarray
+    :param bucket_of_point: Bucket number of each point
+    :type bucket_of_point: numpy.ndarray
+    :return: numpy.ndarray -- One index per bucket
+    """
+    candidates = numpy.flatnonzero(mask)
+    _, first = numpy.unique(bucket_of_point[candidates], return_index=True)
+    return candidates[first]
@@ -0,0 +1,74 @@
+import collections
+import threading
+
+
+class PriorityLock:
+    """A fair lock with two priorities.
+
+    Waiters are granted the lock in arrival order, high priority waiters before all normal priority waiters. On
+    release the lock is handed directly to the next waiter, so a thread that releases and immediately reacquires
+    the lock queues behind the threads that were already waiting instead of taking it again.
+    """
+
+    def __init__(self):
+        self._state_lock = threading.Lock()
+        self._locked = False
+        self._high_priority_waiters = collections.deque()
+        self._normal_priority_waiters = collections.deque()
+
+    def acquire(self, high_priority=False, timeout=None):
+        """Waits until the lock is granted and takes it
+
+        :param high_priority: If True the lock is granted before any normal priority waiter
+        :type high_priority: bool
+        :param timeout: Maximum seconds to wait. None to wait forever
+        :type timeout: float
+        :return: bool -- True if the lock was taken, False on timeout
+        """
+        with self._state_lock:
+            if not self._locked:
+                self._locked = True
+                return True
+            waiter = threading.Lock()
+            waiter.acquire()
+            waiters = self._high_priority_waiters if high_priority else self._normal_priority_waiters
+            waiters.append(waiter)
+
+        if waiter.acquire(timeout=-1 if timeout is None else max(timeout, 0)):
+            return True
+        with self._state_lock:
+            try:
+                waiters.remove(waiter)
+                return False
+            except ValueError:
+                # The lock was handed to this waiter after the timeout expired
+                return True
+
+    def release(self):
+        """Releases the lock, handing it to the next waiter if there is one
+
+        :return: None
+        """
+        with self._state_lock:
+            if not self._locked:
+                raise RuntimeError("Release of unlocked PriorityLock")
+            if self._high_priority_waiters:
+                self._high_priority_waiters.popleft().release()
+            elif self._normal_priority_waiters:
+                self._normal_priority_waiters.popleft().release()
+            else:
+                self._locked = False
+
+    def locked(self):
+        """Returns if the lock is currently taken
+
+        :return: bool -- If locked
+        """
+        return self._locked
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
@@ -0,0 +1,183 @@
+import cherrypy
+import concurrent.futures
+import math
+import threading
+import time
+from ps_controller.metrics.Metrics import Counter, Gauge
+
+READ = "read"
+WRITE = "write"
+
+DEFAULT_QUEUE_LIMITS = {READ: 8, WRITE: 8}
+DEFAULT_DEADLINES = {READ: 1.0, WRITE: 3.0}
+
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+QUEUED_REQUESTS = Gauge("ps_http_admission_queued", "Device bound requests waiting for or running on a device "
+                        "worker", ("endpoint_class",))
+REJECTED_REQUESTS = Counter("ps_http_admission_rejected_total", "Device bound requests answered with 503",
+                            ("endpoint_class", "reason"))
+
+
+class Overloaded(cherrypy.HTTPError):
+    """503 answer to a device bound request that could not be served in time"""
+
+    def __init__(self, message, retry_after):
+        """Constructor
+
+        :param message: Reason shown on the error page
+        :type message: str
+        :param retry_after: Seconds after which the client should try again
+        :type retry_after: int
+        """
+        cherrypy.HTTPError.__init__(self, 503, message)
+        self.retry_after = retry_after
+
+    def set_response(self):
+        cherrypy.HTTPError.set_response(self)
+        # Set afterwards, as the error page drops Retry-After of the original response
+        cherrypy.serving.response.headers['Retry-After'] = str(self.retry_after)
+
+
+class AdmissionControl(object):
+    """Runs the device bound requests of one device on a small worker pool of its own.
+
+    Every endpoint class has a bounded queue and a deadline. A request that finds its queue full, or is not served
+    by its deadline, is answered at once with 503 and a Retry-After header instead of holding a web server thread,
+    so static files and requests answered from cached samples stay fast while the device is overloaded.
+    """
+
+    def __init__(self, workers=2, queue_limits=None, deadlines=None):
+        """Constructor
+
+        :param workers: Number of threads talking to the device. The device serves one transaction at a time, so
+            more workers only queue on the device lock
+        :type workers: int
+        :param queue_limits: Maximum waiting and running requests by endpoint class. Default DEFAULT_QUEUE_LIMITS
+        :type queue_limits: dict[str, int]
+        :param deadlines: Seconds a request may take by endpoint class. Default DEFAULT_DEADLINES
+        :type deadlines: dict[str, float]
+        """
+        self._workers = workers
+        self._queue_limits = dict(DEFAULT_QUEUE_LIMITS, **(queue_limits or {}))
+        self._deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                               thread_name_prefix="DeviceWorker")
+        self._lock = threading.Lock()
+        self._queued = dict((endpoint_class, 0) for endpoint_class in self._queue_limits)
+        self._service_seconds = None
+
+    def shutdown(self):
+        """Lets the device workers exit. The web server waits for them when stopping
+
+        :return: None
+        """
+        self._executor.shutdown(wait=False)
+
+    def queued(self, endpoint_class):
+        """Gets the number of waiting and running requests of an endpoint class
+
+        :param endpoint_class: READ or WRITE
+        :type endpoint_class: str
+        :return: int -- Number of requests
+        """
+        with self._lock:
+            return self._queued[endpoint_class]
+
+    def start(self, endpoint_class, function, *args):
+        """Starts a device function on a device worker without waiting for it
+
+        :param endpoint_class: READ or WRITE
+        :type endpoint_class: str
+        :param function: The device function
+        :type function: callable
+        :param args: Arguments of the function
+        :return: bool -- False if the queue of the endpoint class is full and the function was not started
+        """
+        with self._lock:
+            if self._queued[endpoint_class] >= self._queue_limits[endpoint_class]:
+                return False
+            self._queued[endpoint_class] += 1
+        QUEUED_REQUESTS.labels(endpoint_class).inc()
+        self._executor.submit(self._run, endpoint_class, math.inf, function, args)
+        return True
+
+    def call(self, endpoint_class, function, *args):
+        """Calls a device function on a device worker and waits for it until the deadline of the request.
+
+        The deadline is that of the endpoint class, or the shorter one in milliseconds of the X-Deadline-Ms request
+        header.
+
+        :param endpoint_class: READ or WRITE
+        :type endpoint_class: str
+        :param function: The device function
+        :type function: callable
+        :param args: Arguments of the function
+        :return: The return value of the function
+        :raise: Overloaded if the queue of the endpoint class is full or the deadline passes. A write the device
+            worker has started when the deadline passes is waited for instead, as it may already have taken effect
+        """
+        deadline = time.monotonic() + self._deadline(endpoint_class)
+        with self._lock:
+            if self._queued[endpoint_class] >= self._queue_limits[endpoint_class]:
+                self._reject(endpoint_class, "queue_full", "Too many {0} requests waiting for the device")
+            self._queued[endpoint_class] += 1
+        QUEUED_REQUESTS.labels(endpoint_class).inc()
+        future = self._executor.submit(self._run, endpoint_class, deadline, function, args)
+        try:
+            return future.result(max(deadline - time.monotonic(), 0))
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):
+            # A request still waiting for a worker is dropped
+            if future.cancel():
+                QUEUED_REQUESTS.labels(endpoint_class).dec()
+                with self._lock:
+                    self._queued[endpoint_class] -= 1
+                    self._reject(endpoint_class, "deadline", "The device did not serve the {0} request in time")
+            # One already talking to the device may have changed it, so a write is answered with its outcome
+            # instead of asking the client to retry it. A finished read is answered too
+            if endpoint_class == WRITE or future.done():
+                try:
+                    return future.result()
+                except concurrent.futures.CancelledError:
+                    # Skipped by the worker, as the deadline had passed when it got to the request
+                    pass
+            with self._lock:
+                self._reject(endpoint_class, "deadline", "The device did not serve the {0} request in time")
+
+    def _deadline(self, endpoint_class):
+        seconds = self._deadlines[endpoint_class]
+        header = cherrypy.request.headers.get(DEADLINE_HEADER)
+        if header is not None:
+            try:
+                seconds = min(seconds, max(float(header), 0) / 1000)
+            except ValueError:
+                raise cherrypy.HTTPError(400, "Invalid " + DEADLINE_HEADER + " header")
+        return seconds
+
+    def _run(self, endpoint_class, deadline, function, args):
+        try:
+            if time.monotonic() >= deadline:
+                # Nobody waits for the result anymore
+                raise concurrent.futures.CancelledError()
+            start = time.perf_counter()
+            result = function(*args)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._service_seconds = elapsed if self._service_seconds is None else (
+                    0.8 * self._service_seconds + 0.2 * elapsed)
+            return result
+        finally:
+            with self._lock:
+                self._queued[endpoint_class] -= 1
+            QUEUED_REQUESTS.labels(endpoint_class).dec()
+
+    def _reject(self, endpoint_class, reason, message):
+        """Answers a request with 503. Has to be called holding the lock
+
+        :raise: Overloaded
+        """
+        REJECTED_REQUESTS.labels(endpoint_class, reason).inc()
+        # Time for the device workers to work off everything queued now, at least a second
+        queued = sum(self._queued.values())
+        retry_after = math.ceil(queued * (self._service_seconds or 0) / self._workers)
+        raise Overloaded(message.format(endpoint_class), max(retry_after, 1))
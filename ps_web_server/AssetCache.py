@@ -0,0 +1,206 @@
+import cherrypy
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Types that are compressed already or do not get smaller
+UNCOMPRESSED_EXTENSIONS = ('.woff', '.woff2', '.png', '.jpg', '.gif', '.ico')
+
+# Relative references in HTML attributes and CSS url(), e.g. href="css/app.css" or url('../fonts/x.eot?#iefix')
+_REFERENCE_PATTERN = re.compile(r'''((?:href|src)="|url\(')([^"':)?#]+)([^"')]*)''')
+
+
+class Asset(object):
+    """A file of the web interface with its encodings"""
+
+    def __init__(self, content, content_type, compress):
+        """Constructor
+
+        :param content: The file content
+        :type content: bytes
+        :param content_type: Content type of the file
+        :type content_type: str
+        :param compress: If True gzip and, if installed, brotli encodings are made
+        :type compress: bool
+        """
+        self.content_type = content_type
+        self.digest = hashlib.sha256(content).hexdigest()[:16]
+        self.encodings = {"identity": content}
+        if compress:
+            self.encodings["gzip"] = gzip.compress(content, 9, mtime=0)
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(content)
+        # Drop encodings that do not pay off
+        for encoding in [e for e in self.encodings if len(self.encodings[e]) >= len(content) and e != "identity"]:
+            del self.encodings[encoding]
+
+    def etag(self, encoding):
+        """Gets the strong ETag of an encoding. Every encoding has an ETag of its own as their bytes differ
+
+        :param encoding: "identity", "gzip" or "br"
+        :type encoding: str
+        :return: str -- The quoted ETag
+        """
+        return '"' + self.digest + ('' if encoding == "identity" else '-' + encoding) + '"'
+
+
+class AssetCache(object):
+    """Keeps the files of the web interface in memory, loaded once at startup.
+
+    References between the files get the content hash of the referenced file as query parameter 'v', so a
+    reference changes whenever the file does and the file can be cached by the browser for good. Files requested
+    without the current hash, such as the index page, are revalidated with their ETag instead.
+    """
+
+    def __init__(self, base_dir, directories=('fonts', 'js', 'css'), index='index.html'):
+        """Constructor
+
+        :param base_dir: Directory of the index page
+        :type base_dir: str
+        :param directories: Sub directories whose files are served, in an order where files only reference files
+            of earlier directories
+        :type directories: tuple(str)
+        :param index: File name of the index page
+        :type index: str
+        """
+        self._assets = dict()
+        for directory in directories:
+            for root, dir_names, file_names in os.walk(os.path.join(base_dir, directory)):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(root, file_name)
+                    self._add(os.path.relpath(file_path, base_dir).replace(os.sep, '/'), file_path)
+        self._add(index, os.path.join(base_dir, index))
+        self.index = index
+
+    def get(self, path):
+        """Gets a file
+
+        :param path: Path of the file relative to the base directory with '/' separators, e.g. "css/app.css"
+        :type path: str
+        :return: Asset or None -- The file. None if it is not served
+        """
+        return self._assets.get(path)
+
+    def serve(self, path, version=None):
+        """Answers the current request with a file, in the best encoding the client accepts
+
+        :param path: Path of the file relative to the base directory, e.g. "css/app.css"
+        :type path: str
+        :param version: Value of the query parameter 'v'. The file is cached for good if it is its content hash
+        :type version: str
+        :return: bytes -- The response body
+        :raise: cherrypy.NotFound if the file is not served
+        """
+        request = cherrypy.serving.request
+        response = cherrypy.serving.response
+        answer = self.response(path, version, request.headers.get('Accept-Encoding', ''),
+                               request.headers.get('If-None-Match', ''))
+        if answer is None:
+            raise cherrypy.NotFound()
+        response.status, headers, body = answer
+        response.headers.update(headers)
+        return body
+
+    def response(self, path, version, accept_encoding, if_none_match):
+        """Gets the response to a request for a file, independent of the web framework
+
+        :param path: Path of the file relative to the base directory, e.g. "css/app.css"
+        :type path: str
+        :param version: Value of the query parameter 'v'. The file is cached for good if it is its content hash
+        :type version: str
+        :param accept_encoding: Accept-Encoding header of the request, '' if none
+        :type accept_encoding: str
+        :param if_none_match: If-None-Match header of the request, '' if none
+        :type if_none_match: str
+        :return: tuple(int, dict, bytes) or None -- (status, headers, body). None if the file is not served
+        """
+        asset = self._assets.get(path)
+        if asset is None:
+            return None
+        encoding = self._encoding(asset, accept_encoding)
+        etag = asset.etag(encoding)
+        headers = {
+            'Content-Type': asset.content_type,
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': IMMUTABLE if version == asset.digest else REVALIDATE}
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, headers, b''
+        if encoding != "identity":
+            headers['Content-Encoding'] = encoding
+        return 200, headers, asset.encodings[encoding]
+
+    def _add(self, path, file_path):
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content = self._version_references(content.decode('utf-8'), path).encode('utf-8')
+            content_type += '; charset=utf-8'
+        compress = not file_path.lower().endswith(UNCOMPRESSED_EXTENSIONS)
+        self._assets[path] = Asset(content, content_type, compress)
+
+    def _version_references(self, text, path):
+        """Adds the content hash to every reference to a served file"""
+        directory = os.path.dirname(path)
+
+        def version(match):
+            prefix, reference, suffix = match.groups()
+            asset = self._assets.get(os.path.normpath(os.path.join(directory, reference)).replace(os.sep, '/'))
+            if asset is None:
+                return match.group(0)
+            # Keeps an empty query such as the "?#iefix" of fonts for old browsers
+            suffix = '&' + suffix[1:] if suffix.startswith('?') else suffix
+            return prefix + reference + '?v=' + asset.digest + suffix
+
+        return _REFERENCE_PATTERN.sub(version, text)
+
+    @staticmethod
+    def _encoding(asset, accept_encoding):
+        accepted = set()
+        for item in accept_encoding.split(','):
+            name, separator, parameters = item.strip().partition(';')
+            if parameters.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in asset.encodings and encoding in accepted:
+                return encoding
+        return "identity"
+
+
+class AssetDirectory(object):
+    """Serves the cached files of one directory of the web interface"""
+
+    _cp_config = {'tools.sessions.on': False, 'tools.encode.on': False}
+
+    def __init__(self, asset_cache, directory):
+        """Constructor
+
+        :param asset_cache: The cached files
+        :type asset_cache: AssetCache
+        :param directory: The directory, e.g. "css"
+        :type directory: str
+        """
+        self._asset_cache = asset_cache
+        self._directory = directory
+
+    @cherrypy.expose
+    def default(self, *vpath, **params):
+        """Gets a file of the directory
+
+        :param params: Optional value with key 'v', the content hash of the file
+        :type params: dict
+        :return: bytes -- The file content, possibly compressed
+        """
+        return self._asset_cache.serve(self._directory + '/' + '/'.join(vpath), params.get('v'))
@@ -0,0 +1,594 @@
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import threading
+import urllib.parse
+from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.device.ProcessDevice import ProcessDevice
+from ps_controller.logging.CustomLogger import CustomLogger
+from ps_controller.metrics.Metrics import REGISTRY
+from ps_controller.recording import SampleStream
+from ps_web_server.AssetCache import AssetCache
+from ps_web_server.PsWebWrapper import Wrapper
+
+REASONS = {200: "OK", 204: "No Content", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           501: "Not Implemented", 503: "Service Unavailable"}
+
+MAX_HEADER_BYTES = 16384
+MAX_BODY_BYTES = 1 << 20
+MAX_POLL_SECONDS = 60.0
+STREAM_KEEP_ALIVE_SECONDS = 15.0
+MAX_STREAM_BACKLOG = 10000
+MAX_STREAM_BUFFER_BYTES = 65536
+ASSET_DIRECTORIES = ('css', 'js', 'fonts')
+
+
+class HttpError(Exception):
+    """Ends a request with an error status"""
+
+    def __init__(self, status, message, headers=None):
+        """Constructor
+
+        :param status: HTTP status
+        :type status: int
+        :param message: Response body
+        :type message: str
+        :param headers: Additional response headers
+        :type headers: dict
+        """
+        Exception.__init__(self, message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Request(object):
+    """A parsed HTTP request"""
+
+    def __init__(self, method, path, params, headers, keep_alive, reader, writer):
+        """Constructor
+
+        :param method: HTTP method, e.g. "GET"
+        :type method: str
+        :param path: Unquoted path, e.g. "/all_values"
+        :type path: str
+        :param params: Parameters of the query and of a form body
+        :type params: dict[str, str]
+        :param headers: Headers by lower case name
+        :type headers: dict[str, str]
+        :param keep_alive: If the connection stays open after the response
+        :type keep_alive: bool
+        :param reader: Reads from the connection
+        :type reader: asyncio.StreamReader
+        :param writer: Writes to the connection
+        :type writer: asyncio.StreamWriter
+        """
+        self.method = method
+        self.path = path
+        self.params = params
+        self.headers = headers
+        self.keep_alive = keep_alive
+        self.reader = reader
+        self.writer = writer
+        # Set by handlers that write the response to the connection themselves
+        self.response_started = False
+
+
+class SampleBroadcaster(object):
+    """Hands the background samples of the device to waiting clients. Every sample is serialized once on the
+    event loop. Long polling clients waiting for it are woken by one future, and the sample is written to the
+    connections of streaming clients directly, so a sample costs one write per stream and no task switch"""
+
+    def __init__(self, loop):
+        """Constructor
+
+        :param loop: The event loop of the server
+        :type loop: asyncio.AbstractEventLoop
+        """
+        self._loop = loop
+        self.latest = None
+        self.closed = False
+        self._next = loop.create_future()
+        self._streams = dict()
+        self._sample_buffers = []
+
+    def add_stream(self, writer, interval):
+        """Writes every sample to a connection from now on as a server-sent event
+
+        :param writer: The connection
+        :type writer: asyncio.StreamWriter
+        :param interval: Least seconds between events
+        :type interval: float
+        :return: None
+        """
+        self._streams[writer] = [interval, 0.0]
+
+    def remove_stream(self, writer):
+        """Stops writing samples to a connection
+
+        :param writer: The connection
+        :type writer: asyncio.StreamWriter
+        :return: None
+        """
+        self._streams.pop(writer, None)
+
+    def add_sample_buffer(self):
+        """Keeps every sample from now on for a binary sample stream
+
+        :return: collections.deque -- The buffer the samples are appended to as (timestamp, values). The oldest
+            are dropped if more than MAX_STREAM_BACKLOG are kept
+        """
+        sample_buffer = collections.deque(maxlen=MAX_STREAM_BACKLOG)
+        self._sample_buffers = self._sample_buffers + [sample_buffer]
+        return sample_buffer
+
+    def remove_sample_buffer(self, sample_buffer):
+        """Stops keeping samples in a buffer from add_sample_buffer
+
+        :return: None
+        """
+        self._sample_buffers = [b for b in self._sample_buffers if b is not sample_buffer]
+
+    def keep_streams_alive(self):
+        """Writes a comment to every stream, so clients that went away without closing the connection are found
+
+        :return: None
+        """
+        for writer in self._streams:
+            if not writer.is_closing():
+                writer.write(b": keep-alive\n\n")
+
+    def on_sample(self, timestamp, device_values):
+        """Acquisition listener. Runs on the acquisition thread
+
+        :return: None
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._publish, timestamp, device_values)
+        except RuntimeError:
+            # The event loop has been closed
+            pass
+
+    def _publish(self, timestamp, device_values):
+        for sample_buffer in self._sample_buffers:
+            sample_buffer.append((timestamp, device_values))
+        values = {"timestamp": timestamp}
+        values.update(Wrapper.values_to_dict(device_values))
+        self.latest = (timestamp, json.dumps(values).encode('utf-8'))
+        event = b"data: " + self.latest[1] + b"\n\n"
+        now = self._loop.time()
+        for writer, stream in self._streams.items():
+            # A client that does not keep up skips samples instead of the server buffering them
+            if (now - stream[1] >= stream[0] and not writer.is_closing()
+                    and writer.transport.get_write_buffer_size() <= MAX_STREAM_BUFFER_BYTES):
+                stream[1] = now
+                writer.write(event)
+        if not self.closed:
+            waiter, self._next = self._next, self._loop.create_future()
+            waiter.set_result(None)
+
+    def close(self):
+        """Wakes all waiting clients for good
+
+        :return: None
+        """
+        self.closed = True
+        self._next.set_result(None)
+
+    async def wait_newer(self, after, timeout):
+        """Waits for a sample newer than a timestamp
+
+        :param after: Unix timestamp of the newest sample the client has
+        :type after: float
+        :param timeout: Maximum seconds to wait
+        :type timeout: float
+        :return: tuple(float, bytes) or None -- (timestamp, UTF-8 JSON dict with key 'timestamp' and the keys of
+            Wrapper.values_to_dict) of the latest sample. None if no newer sample came in time or on close
+        """
+        deadline = self._loop.time() + timeout
+        while self.latest is None or self.latest[0] <= after:
+            if self.closed:
+                return None
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                # Shielded as a cancelled waiter would cancel the future of every other client
+                await asyncio.wait_for(asyncio.shield(self._next), remaining)
+            except asyncio.TimeoutError:
+                return None
+        return self.latest
+
+
+class AsyncWebServer(object):
+    """Serves the routes of the web interface for one device on an asyncio event loop instead of a thread per
+    request.
+
+    Idle connections cost no thread, so one process holds thousands of clients waiting on /poll or /stream.
+    Device I/O runs on a small thread pool with a bounded queue and a deadline, like AdmissionControl does for
+    PsWebServer.
+    """
+
+    def __init__(self, port, ps_log_level, resources_base_dir=None, sample_interval=0.05, recording_dir=None,
+                 device_type="usb", bridge_address=None, isolate_io=False, device_workers=2, device_queue_limit=16,
+                 device_deadline=2.0):
+        """Constructor
+
+        :param port: Port the server listens on. 0 to pick a free port, see bound_port
+        :type port: int
+        :param ps_log_level: Log level of the device
+        :type ps_log_level: int
+        :param resources_base_dir: Directory of index.html, css, js and fonts. Default the package directory
+        :type resources_base_dir: str
+        :param sample_interval: Seconds between background device samples
+        :type sample_interval: float
+        :param recording_dir: If given, every sample is recorded to this directory
+        :type recording_dir: str
+        :param device_type: "usb", "simulated" or "tcp"
+        :type device_type: str
+        :param bridge_address: "host:port" of the bridge of the device if device_type is "tcp"
+        :type bridge_address: str
+        :param isolate_io: If True the serial I/O runs in a worker process, so the event loop does not compete with
+            it for the GIL
+        :type isolate_io: bool
+        :param device_workers: Number of threads talking to the device
+        :type device_workers: int
+        :param device_queue_limit: Maximum requests waiting for the device. More are answered with 503
+        :type device_queue_limit: int
+        :param device_deadline: Seconds a request waits for the device before it is answered with 503
+        :type device_deadline: float
+        :raise: ValueError if device_type is "tcp" and no bridge address is given
+        """
+        self._host = '127.0.0.1'
+        self._port = port
+        self._logger = CustomLogger(ps_log_level)
+        if isolate_io:
+            device = ProcessDevice(device_type, bridge_address, sample_interval, ps_log_level)
+        elif device_type == "tcp":
+            device = DeviceFactory().create_device(device_type, self._logger, bridge_address)
+        else:
+            device = None
+        self._wrapper = Wrapper(ps_log_level, sample_interval, recording_dir, device_type, device)
+        self._assets = AssetCache(resources_base_dir or os.path.abspath(os.path.split(__file__)[0]))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=device_workers,
+                                                               thread_name_prefix="DeviceWorker")
+        self._device_queue_limit = device_queue_limit
+        self._device_deadline = device_deadline
+        self._device_queued = 0
+        self._connecting = None
+        self._connections = dict()
+        self._loop = None
+        self._stopping = None
+        self._samples = None
+        self.bound_port = None
+        self.started = threading.Event()
+        self._routes = {
+            "/": self.index,
+            "/all_values": self.all_values,
+            "/voltage": self.voltage,
+            "/current": self.current,
+            "/output_on": self.output_on,
+            "/poll": self.poll,
+            "/stream": self.stream,
+            "/sample_stream": self.sample_stream,
+            "/metrics": self.metrics,
+            "/stop": self.stop}
+
+    def start(self):
+        """Runs the web server until /stop is requested
+
+        :return: None
+        """
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """Runs the web server on the running event loop until /stop is requested
+
+        :return: None
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._samples = SampleBroadcaster(self._loop)
+        self._wrapper.add_sample_listener(self._samples.on_sample)
+        await self._loop.run_in_executor(self._executor, self._wrapper.connect)
+        self._wrapper.start_acquisition()
+        server = await asyncio.start_server(self._handle_connection, self._host, self._port,
+                                            limit=MAX_HEADER_BYTES, backlog=1024)
+        self.bound_port = server.sockets[0].getsockname()[1]
+        self.started.set()
+        keep_alive = asyncio.ensure_future(self._keep_streams_alive())
+        try:
+            async with server:
+                await self._stopping.wait()
+                keep_alive.cancel()
+                self._samples.close()
+                # Idle keep-alive connections end when closed, so no handler has to be cancelled
+                for writer in list(self._connections):
+                    writer.close()
+                await asyncio.gather(*self._connections.values())
+        finally:
+            self._wrapper.stop_acquisition()
+            self._executor.shutdown(wait=False)
+
+    async def _keep_streams_alive(self):
+        while True:
+            await asyncio.sleep(STREAM_KEEP_ALIVE_SECONDS)
+            self._samples.keep_streams_alive()
+
+    async def index(self, request):
+        """Gives the default index page of the web server
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        # Connecting can scan every serial port, so the page does not wait for it
+        if not self._wrapper.connected() and (self._connecting is None or self._connecting.done()):
+            self._connecting = self._executor.submit(self._wrapper.connect)
+        return self._asset(request, self._assets.index)
+
+    async def all_values(self, request):
+        """Gets all values of the device, see DeviceApi.all_values
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        values_json = await self._device_call(self._wrapper.get_all_values_json)
+        return 200, {}, values_json.encode('utf-8')
+
+    async def voltage(self, request):
+        """Gets the output voltage in V or sets the voltage to parameter 'target_voltage_V'
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        if 'target_voltage_V' in request.params:
+            await self._device_call(self._wrapper.set_voltage, self._number(request, 'target_voltage_V', float),
+                                    write=True)
+            return 200, {}, b''
+        return 200, {}, (await self._device_call(self._wrapper.get_voltage)).encode('utf-8')
+
+    async def current(self, request):
+        """Gets the output current in mA or sets the current limit to parameter 'current_limit_mA'
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        if 'current_limit_mA' in request.params:
+            await self._device_call(self._wrapper.set_current, self._number(request, 'current_limit_mA', int),
+                                    write=True)
+            return 200, {}, b''
+        return 200, {}, (await self._device_call(self._wrapper.get_current)).encode('utf-8')
+
+    async def output_on(self, request):
+        """Gets if the output is on, "1" or "0", or turns it on or off with parameter 'on'
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        if 'on' in request.params:
+            if request.params['on'] == "1":
+                await self._device_call(self._wrapper.set_device_on, write=True)
+            else:
+                await self._device_call(self._wrapper.set_device_off, write=True)
+            return 200, {}, b''
+        return 200, {}, b"1" if await self._device_call(self._wrapper.get_output_on) else b"0"
+
+    async def poll(self, request):
+        """Long poll for the next background sample.
+
+        Parameters are 'after', the timestamp of the latest sample the client has (default 0, so the latest sample
+        is returned at once), and 'timeout', the seconds to wait for a newer one (default 30).
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body). The body is a JSON dict with key 'timestamp'
+            and the values as in all_values. 204 without body if no newer sample came in time
+        """
+        after = self._number(request, 'after', float, 0.0)
+        timeout = min(self._number(request, 'timeout', float, 30.0), MAX_POLL_SECONDS)
+        sample = await self._samples.wait_newer(after, timeout)
+        if sample is None:
+            return 204, {}, b''
+        return 200, {'Content-Type': 'application/json'}, sample[1]
+
+    async def stream(self, request):
+        """Streams every background sample as a server-sent event until the client disconnects.
+
+        The optional parameter 'interval' is the least seconds between events, for clients that do not need every
+        sample. Each event is a JSON dict as returned by poll.
+
+        :return: None -- The response is written to the connection, which is closed afterwards
+        """
+        interval = self._number(request, 'interval', float, 0.0)
+        request.response_started = True
+        request.writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                             b"Connection: close\r\n\r\n")
+        self._samples.add_stream(request.writer, interval)
+        try:
+            # The client sends nothing more. Reading ends when it disconnects or the server closes the connection
+            while await request.reader.read(4096):
+                pass
+        finally:
+            self._samples.remove_stream(request.writer)
+        return None
+
+    async def sample_stream(self, request):
+        """Streams every background sample from now on in the binary format of SampleStream, see
+        DeviceApi.sample_stream for the parameters
+
+        :return: None -- The response is written to the connection, which is closed afterwards
+        """
+        batch_interval = self._number(request, 'batch_interval', float, 0.1)
+        seconds = self._number(request, 'seconds', float, 0.0) if 'seconds' in request.params else None
+        if batch_interval <= 0:
+            raise HttpError(400, "batch_interval has to be positive")
+        writer = request.writer
+        request.response_started = True
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: " + SampleStream.CONTENT_TYPE.encode('latin-1') +
+                     b"\r\nConnection: close\r\n\r\n" + SampleStream.create_header())
+        samples = self._samples.add_sample_buffer()
+        try:
+            end = None if seconds is None else self._loop.time() + seconds
+            while not writer.is_closing() and not self._stopping.is_set() and (
+                    end is None or self._loop.time() < end):
+                await asyncio.sleep(batch_interval if end is None else
+                                    max(min(batch_interval, end - self._loop.time()), 0))
+                writer.write(SampleStream.encode_frame([samples.popleft() for _ in range(len(samples))]))
+                await writer.drain()
+        finally:
+            self._samples.remove_sample_buffer(samples)
+        return None
+
+    async def metrics(self, request):
+        """Gets the device and transaction metrics of the server
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        return 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}, REGISTRY.render().encode('utf-8')
+
+    async def stop(self, request):
+        """Stops the web server once this request is answered
+
+        :return: tuple(int, dict, bytes) -- (status, headers, body)
+        """
+        self._loop.call_soon(self._stopping.set)
+        return 200, {}, b''
+
+    async def _handle_connection(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await self._read_request(reader, writer)
+                except HttpError as e:
+                    await self._write_response(writer, e.status, e.headers, e.message.encode('utf-8'), False)
+                    break
+                if request is None:
+                    break
+                keep_alive = request.keep_alive
+                try:
+                    response = await self._route(request.path)(request)
+                except HttpError as e:
+                    response = e.status, e.headers, e.message.encode('utf-8')
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # Like CherryPy, answer a failing handler with 500 instead of dropping the connection
+                    self._logger.log_error("Request to " + request.path + " failed: " + repr(e))
+                    if request.response_started:
+                        break
+                    keep_alive = False
+                    response = 500, {}, b"Internal server error"
+                if response is None:
+                    break
+                status, headers, body = response
+                await self._write_response(writer, status, headers, body, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    def _route(self, path):
+        handler = self._routes.get(path)
+        if handler is not None:
+            return handler
+        # The request target may be e.g. "*" or lack the leading slash
+        if path.startswith('/') and path.split('/')[1] in ASSET_DIRECTORIES:
+            return self._asset_route
+
+        async def not_found(request):
+            raise HttpError(404, "Not found")
+        return not_found
+
+    async def _asset_route(self, request):
+        return self._asset(request, request.path.lstrip('/'))
+
+    def _asset(self, request, path):
+        response = self._assets.response(path, request.params.get('v'), request.headers.get('accept-encoding', ''),
+                                         request.headers.get('if-none-match', ''))
+        if response is None:
+            raise HttpError(404, "Not found")
+        return response
+
+    async def _device_call(self, function, *args, write=False):
+        """Calls a device function on a device worker and waits for it until the deadline
+
+        :param write: If the function changes the device. A write the worker has started when the deadline passes is
+            waited for instead of answered with 503, as it may already have taken effect
+        :type write: bool
+        :return: The return value of the function
+        :raise: HttpError 503 if too many requests wait for the device or the deadline passes
+        """
+        if self._device_queued >= self._device_queue_limit:
+            raise HttpError(503, "Too many requests waiting for the device", {'Retry-After': '1'})
+        # Only changed on the event loop thread
+        self._device_queued += 1
+        try:
+            future = self._executor.submit(function, *args)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), self._device_deadline)
+            except asyncio.TimeoutError:
+                # A call still waiting for a worker is dropped. One already talking to the device runs on
+                if future.cancel() or not (write or future.done()):
+                    raise HttpError(503, "The device did not answer in time", {'Retry-After': '1'})
+                return await asyncio.wrap_future(future)
+        finally:
+            self._device_queued -= 1
+
+    @staticmethod
+    def _number(request, name, number_type, default=None):
+        if name not in request.params and default is not None:
+            return default
+        try:
+            return number_type(request.params[name])
+        except ValueError:
+            raise HttpError(400, "Invalid " + name)
+
+    @staticmethod
+    async def _read_request(reader, writer):
+        """Reads the next request of a connection
+
+        :return: Request or None -- The request. None if the client closed the connection
+        :raise: HttpError if the request is malformed
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "Request header too large")
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HttpError(400, "Invalid request line")
+        headers = dict()
+        for line in lines[1:]:
+            if line:
+                name, separator, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        if 'transfer-encoding' in headers:
+            raise HttpError(501, "Chunked requests are not supported")
+        try:
+            content_length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if content_length > MAX_BODY_BYTES:
+            raise HttpError(413, "Request body too large")
+        target = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(target.query, keep_blank_values=True))
+        if content_length:
+            body = await reader.readexactly(content_length)
+            if headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+                params.update(urllib.parse.parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == "HTTP/1.1" else connection == 'keep-alive'
+        return Request(method, urllib.parse.unquote(target.path), params, headers, keep_alive, reader, writer)
+
+    @staticmethod
+    async def _write_response(writer, status, headers, body, keep_alive):
+        head = ["HTTP/1.1 {0} {1}".format(status, REASONS.get(status, ""))]
+        headers = dict({'Content-Type': 'text/html;charset=utf-8'}, **headers)
+        headers['Content-Length'] = str(len(body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        head.extend(name + ": " + value for name, value in headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
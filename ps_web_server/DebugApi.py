@@ -0,0 +1,88 @@
+import cherrypy
+import json
+import threading
+from ps_controller.tracing import Tracing
+from ps_controller.tracing import SamplingProfiler
+from ps_controller.tracing.TraceBuffer import TraceBuffer
+
+MAX_PROFILE_SECONDS = 120
+
+
+class DebugApi(object):
+    """Web routes for looking into the server while it runs"""
+
+    def __init__(self, trace_transactions=False, trace_capacity=1000, profiling=False):
+        """Constructor
+
+        :param trace_transactions: If True device transactions are traced from the start
+        :type trace_transactions: bool
+        :param trace_capacity: Number of recent transactions whose traces are kept
+        :type trace_capacity: int
+        :param profiling: If True the server can be profiled through /debug/profile
+        :type profiling: bool
+        """
+        self._profiling = profiling
+        self._profile_lock = threading.Lock()
+        self._trace_buffer = TraceBuffer(trace_capacity)
+        if trace_transactions:
+            Tracing.add_hook(self._trace_buffer)
+
+    @cherrypy.expose
+    def traces(self, **params):
+        """Gets the slowest recent device transactions with the duration of each of their phases.
+
+        :param params: Optional values with keys::
+            - limit: Maximum number of transactions. Default 20
+            - command: Only transactions of this command, e.g. 'WRT', or 'connect' for connecting
+            - enable: '1' to start tracing, '0' to stop. Tracing costs nothing while stopped
+            - clear: Drop the kept traces
+        :type params: dict
+        :return: str -- JSON dict with keys 'enabled', 'kept' and 'traces', a list of dicts with keys 'name',
+            'start', 'duration_ms', 'error', 'thread' and 'spans'. Spans have keys 'name', 'start_ms' and
+            'duration_ms', with start_ms counted from the start of the transaction
+
+        """
+        try:
+            limit = int(params.get('limit', 20))
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid limit")
+        if params.get('enable') == "1":
+            Tracing.add_hook(self._trace_buffer)
+        elif params.get('enable') == "0":
+            Tracing.remove_hook(self._trace_buffer)
+        if 'clear' in params:
+            self._trace_buffer.clear()
+        return json.dumps({
+            "enabled": 1 if self._trace_buffer in Tracing.hooks else 0,
+            "kept": len(self._trace_buffer),
+            "traces": [trace.to_dict() for trace in self._trace_buffer.slowest(limit, params.get('command'))]})
+
+    @cherrypy.expose
+    def profile(self, **params):
+        """Samples the stacks of all threads of the server for a while. Only the request asking for the profile
+        waits, and only one profile is taken at a time. Only available if the server was started with --profile
+
+        :param params: Optional values with keys::
+            - seconds: Seconds to sample for. Default 10, at most MAX_PROFILE_SECONDS
+            - interval_ms: Milliseconds between samples. Default 10
+        :type params: dict
+        :return: str -- Collapsed stacks for flame graph tools, one "thread;file:function;... count" line per stack
+
+        """
+        if not self._profiling:
+            raise cherrypy.HTTPError(403, "Profiling is off. Start the server with --profile")
+        try:
+            seconds = float(params.get('seconds', 10))
+            interval = float(params.get('interval_ms', 10)) / 1000
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid seconds or interval_ms")
+        if not 0 < seconds <= MAX_PROFILE_SECONDS or interval <= 0:
+            raise cherrypy.HTTPError(400, "seconds must be between 0 and {0}".format(MAX_PROFILE_SECONDS))
+        if not self._profile_lock.acquire(False):
+            raise cherrypy.HTTPError(409, "A profile is already being taken")
+        try:
+            stacks = SamplingProfiler.SamplingProfiler(interval).run(seconds, (threading.get_ident(),))
+        finally:
+            self._profile_lock.release()
+        cherrypy.response.headers['Content-Type'] = 'text/plain'
+        return SamplingProfiler.format_collapsed(stacks)
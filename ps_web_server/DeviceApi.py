@@ -0,0 +1,372 @@
+import collections
+import cherrypy
+import json
+import time
+from ps_controller.utilities import Downsampling
+from ps_controller.recording import Export
+from ps_controller.recording import SampleStream
+from ps_web_server import Admission
+from ps_web_server.Admission import AdmissionControl
+from ps_web_server.PsWebWrapper import Wrapper
+
+# Samples kept for a sample stream client that does not keep up. Older ones are dropped
+MAX_STREAM_BACKLOG = 10000
+
+
+class DeviceApi(object):
+    """Web routes of a single device"""
+
+    def __init__(self, wrapper, admission=None, max_sample_age=None):
+        """Constructor
+
+        :param wrapper: Wrapper of the device the routes act on
+        :type wrapper: Wrapper
+        :param admission: Runs the routes that talk to the device. Share it between all routes of the device.
+            Default one of its own
+        :type admission: AdmissionControl
+        :param max_sample_age: If given, all_values is answered from a background sample younger than this many
+            seconds instead of reading the device
+        :type max_sample_age: float
+        """
+        self._wrapper = wrapper
+        self._admission = admission or AdmissionControl()
+        self._max_sample_age = max_sample_age
+
+    @cherrypy.expose
+    def all_values(self):
+        """Gets all values of the device.
+
+        :return: bytes -- UTF-8 JSON dict with the following keys::
+            - output_voltage_V
+            - output_current_mA
+            - target_voltage_V
+            - current_limit_mA
+            - output_on
+            - connected
+            - authentication_error
+
+        """
+        # The web interface parses the JSON itself
+        cherrypy.response.headers['Content-Type'] = 'text/html;charset=utf-8'
+        if self._max_sample_age is not None:
+            values_json = self._wrapper.get_latest_values_json(self._max_sample_age)
+            if values_json is not None:
+                return values_json
+        return self._admission.call(Admission.READ, self._wrapper.get_all_values_json).encode('utf-8')
+    # The JSON is encoded already
+    all_values._cp_config = {'tools.encode.on': False}
+
+    @cherrypy.expose
+    def history(self, **params):
+        """Gets the recorded output voltage and current of the device.
+
+        :param params: Optional values with keys::
+            - seconds: Only return samples from the last seconds
+            - start: Only return samples from this unix timestamp. Read from the recording if needed
+            - end: Only return samples up to this unix timestamp
+            - max_points: Downsample each series to at most max_points points
+            - method: Downsampling method, 'lttb' (default) or 'minmax'
+        :type params: dict
+        :return: str -- JSON dict with the following keys::
+            - samples
+            - output_voltage_V
+            - output_current_mA
+            - target_voltage_V
+            - current_limit_mA
+
+        """
+        try:
+            seconds = float(params['seconds']) if 'seconds' in params else None
+            max_points = int(params['max_points']) if 'max_points' in params else None
+            start = float(params['start']) if 'start' in params else None
+            end = float(params['end']) if 'end' in params else None
+            return self._wrapper.get_history_json(
+                seconds, max_points, params.get('method', Downsampling.LTTB), start, end)
+        except ValueError as e:
+            raise cherrypy.HTTPError(400, str(e))
+
+    @cherrypy.expose
+    def export(self, **params):
+        """Streams recorded samples as CSV or newline delimited JSON. Requires recording to be enabled
+
+        :param params: Optional values with keys::
+            - format: 'csv' (default) or 'ndjson'
+            - start: Only export samples from this unix timestamp
+            - end: Only export samples up to this unix timestamp
+        :type params: dict
+        :return: generator of bytes -- One chunk per batch of samples
+
+        """
+        export_format = params.get('format', Export.CSV)
+        try:
+            start = float(params['start']) if 'start' in params else None
+            end = float(params['end']) if 'end' in params else None
+            chunks = self._wrapper.export_recording(export_format, start, end)
+        except ValueError as e:
+            raise cherrypy.HTTPError(400, str(e))
+        if chunks is None:
+            raise cherrypy.HTTPError(404, "Recording is not enabled")
+        cherrypy.response.headers['Content-Type'] = Export.CONTENT_TYPES[export_format]
+        cherrypy.response.headers['Content-Disposition'] = 'attachment; filename="recording.' + export_format + '"'
+        return chunks
+    export._cp_config = {'response.stream': True}
+
+    @cherrypy.expose
+    def sample_stream(self, **params):
+        """Streams every sample acquired in the background from now on, in the binary format of SampleStream. Read
+        it with SampleStream.read_batches. The stream holds a server thread, use it for acquisition clients and
+        not for dashboards
+
+        :param params: Optional values with keys::
+            - batch_interval: Seconds between frames. Default 0.1
+            - seconds: Seconds to stream. Default until the client disconnects
+        :type params: dict
+        :return: generator of bytes -- The header, then one frame per batch interval
+
+        """
+        try:
+            batch_interval = float(params.get('batch_interval', 0.1))
+            seconds = float(params['seconds']) if 'seconds' in params else None
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid batch_interval or seconds")
+        if batch_interval <= 0:
+            raise cherrypy.HTTPError(400, "batch_interval has to be positive")
+        cherrypy.response.headers['Content-Type'] = SampleStream.CONTENT_TYPE
+        return self._sample_stream(batch_interval, seconds)
+    # A session would stay locked for as long as the stream runs
+    sample_stream._cp_config = {'response.stream': True, 'tools.encode.on': False, 'tools.sessions.on': False}
+
+    def _sample_stream(self, batch_interval, seconds):
+        samples = collections.deque(maxlen=MAX_STREAM_BACKLOG)
+        listener = lambda timestamp, device_values: samples.append((timestamp, device_values))
+        self._wrapper.add_sample_listener(listener)
+        try:
+            yield SampleStream.create_header()
+            end = None if seconds is None else time.monotonic() + seconds
+            # Ends with the server too, which waits for its threads when stopping
+            while cherrypy.engine.state not in (cherrypy.engine.states.STOPPING, cherrypy.engine.states.EXITING) and (
+                    end is None or time.monotonic() < end):
+                time.sleep(batch_interval if end is None else max(min(batch_interval, end - time.monotonic()), 0))
+                yield SampleStream.encode_frame([samples.popleft() for _ in range(len(samples))])
+        finally:
+            self._wrapper.remove_sample_listener(listener)
+
+    @cherrypy.expose
+    def sweep(self, **params):
+        """Starts a sweep through voltage and current set points. Each point is recorded when the output settles
+
+        :param params: Value with key 'points' is required, the others are optional::
+            - points: JSON list of [voltage_mV, current_mA] set points
+            - tolerance_mV: Maximum output voltage spread of settled readings. Default 20
+            - tolerance_mA: Maximum output current spread of settled readings. Default 5
+            - settle_count: Number of consecutive readings that have to be within tolerance. Default 3
+            - settle_timeout: Maximum seconds to wait for a point to settle. Default 5
+        :type params: dict
+        :return: str -- JSON dict with key 'job_id'. Poll the job with /jobs
+
+        """
+        try:
+            set_points = json.loads(params['points'])
+            sweep_options = dict()
+            if 'tolerance_mV' in params:
+                sweep_options['voltage_tolerance'] = float(params['tolerance_mV'])
+            if 'tolerance_mA' in params:
+                sweep_options['current_tolerance'] = float(params['tolerance_mA'])
+            if 'settle_count' in params:
+                sweep_options['settle_count'] = int(params['settle_count'])
+            if 'settle_timeout' in params:
+                sweep_options['settle_timeout'] = float(params['settle_timeout'])
+            job_id = self._wrapper.start_sweep(set_points, **sweep_options)
+        except (KeyError, TypeError, ValueError) as e:
+            raise cherrypy.HTTPError(400, "Invalid sweep parameters: " + str(e))
+        if job_id is None:
+            raise cherrypy.HTTPError(409, "Device not connected or another job is running")
+        return json.dumps({"job_id": job_id})
+
+    @cherrypy.expose
+    def playback(self, **params):
+        """Starts playing a voltage and current profile. Points are written on the server at the profile times
+
+        The profile is read from key 'profile' or, if not given, from a JSON request body.
+
+        :param params: Value with key 'profile' is required unless sent as the request body::
+            - profile: JSON dict with equally long lists 't' (seconds from start), 'voltage_mV' and 'current_mA'
+            - repeat: Number of times to play the profile. Default 1
+        :type params: dict
+        :return: str -- JSON dict with key 'job_id'. Poll the job with /jobs for timing error statistics
+
+        """
+        try:
+            if 'profile' in params:
+                profile = json.loads(params['profile'])
+            else:
+                profile = json.loads(cherrypy.request.body.read().decode('utf-8'))
+            repeat = int(params.get('repeat', 1))
+            job_id = self._wrapper.start_playback(
+                profile['t'], profile['voltage_mV'], profile['current_mA'], repeat)
+        except (KeyError, TypeError, ValueError) as e:
+            raise cherrypy.HTTPError(400, "Invalid profile: " + str(e))
+        if job_id is None:
+            raise cherrypy.HTTPError(409, "Device not connected or another job is running")
+        return json.dumps({"job_id": job_id})
+
+    @cherrypy.expose
+    def control(self, **params):
+        """Starts a software regulation loop that runs on the server as fast as the serial link allows
+
+        :param params: Values with keys 'mode', 'setpoint', 'max_voltage_mV' and 'max_current_mA' are required::
+            - mode: 'constant_power' or 'constant_resistance'
+            - setpoint: Power in mW for constant power, series resistance in ohm for constant resistance
+            - max_voltage_mV: Highest target and output voltage. The loop stops and turns the output off above it
+            - max_current_mA: Highest target and output current. Also the current limit written by the loop
+            - max_power_mW: Highest output power. Default no limit
+            - duration: Seconds to run. Default until cancelled with /jobs
+            - kp, ki: PI gains of constant power in mV per mW and mV per mW second. Default 4 and 40
+            - open_voltage_mV: Voltage without load for constant resistance. Default max_voltage_mV
+            - smoothing: Fraction of the voltage difference applied per iteration for constant resistance
+        :type params: dict
+        :return: str -- JSON dict with key 'job_id'. Poll the job with /jobs for loop rate and error statistics
+
+        """
+        try:
+            controller_options = dict()
+            for key, option in (('kp', 'kp'), ('ki', 'ki'), ('open_voltage_mV', 'open_voltage'),
+                                ('smoothing', 'smoothing')):
+                if key in params:
+                    controller_options[option] = float(params[key])
+            job_id = self._wrapper.start_control(
+                params['mode'], float(params['setpoint']), float(params['max_voltage_mV']),
+                float(params['max_current_mA']),
+                float(params['max_power_mW']) if 'max_power_mW' in params else None,
+                float(params['duration']) if 'duration' in params else None,
+                **controller_options)
+        except (KeyError, TypeError, ValueError) as e:
+            raise cherrypy.HTTPError(400, "Invalid control parameters: " + str(e))
+        if job_id is None:
+            raise cherrypy.HTTPError(409, "Device not connected or another job is running")
+        return json.dumps({"job_id": job_id})
+
+    @cherrypy.expose
+    def jobs(self, **params):
+        """Gets the status of jobs or cancels a job. Pass in value "1" on key 'cancel' together with 'id' to cancel
+
+        :param params: Optional values with keys::
+            - id: Only return the job with this id
+            - cancel: Cancel the job with key 'id' if "1"
+        :type params: dict
+        :return: str or None -- JSON dict with the job status, or of all job statuses by id if no id is given
+
+        """
+        job_id = None
+        if 'id' in params:
+            try:
+                job_id = int(params['id'])
+            except ValueError:
+                raise cherrypy.HTTPError(400, "Invalid job id")
+        if params.get('cancel') == "1" and job_id is not None:
+            if not self._wrapper.cancel_job(job_id):
+                raise cherrypy.HTTPError(404, "No such job")
+            return
+        jobs_json = self._wrapper.get_jobs_json(job_id)
+        if jobs_json is None:
+            raise cherrypy.HTTPError(404, "No such job")
+        return jobs_json
+
+    @cherrypy.expose
+    def alarms(self, **params):
+        """Gets, adds or deletes alarm rules. Rules are evaluated on every sample the server acquires
+
+        :param params: Optional values with keys::
+            - rule: JSON dict of a rule to add with keys 'quantity' ('output_voltage', 'output_current' or
+              'output_power'), 'type' ('threshold' or 'rate'), 'operator' ('>' or '<'), 'limit', 'samples',
+              'action' ('output_off', 'set_voltage' or 'set_current') and 'value'
+            - delete: Id of a rule to delete
+        :type params: dict
+        :return: str or None -- JSON dict with key 'rule_id' when adding, JSON dict of all rules by id otherwise
+
+        """
+        if 'rule' in params:
+            try:
+                rule_id = self._wrapper.add_alarm(json.loads(params['rule']))
+            except (TypeError, ValueError) as e:
+                raise cherrypy.HTTPError(400, "Invalid rule: " + str(e))
+            return json.dumps({"rule_id": rule_id})
+        if 'delete' in params:
+            try:
+                deleted = self._wrapper.remove_alarm(int(params['delete']))
+            except ValueError:
+                raise cherrypy.HTTPError(400, "Invalid rule id")
+            if not deleted:
+                raise cherrypy.HTTPError(404, "No such rule")
+            return
+        return self._wrapper.get_alarms_json()
+
+    @cherrypy.expose
+    def stats(self, **params):
+        """Gets, resets or deletes statistics windows. Windows accumulate charge, energy and voltage, current and
+        power statistics over every sample the server acquires since the window was reset. Window 'total' runs since
+        the server started
+
+        :param params: Optional values with keys::
+            - reset: Name of a window to start over. The window is created if it does not exist
+            - delete: Name of a window to delete
+        :type params: dict
+        :return: str or None -- JSON dict of the statistics of all windows by name
+
+        """
+        if 'reset' in params:
+            self._wrapper.reset_statistics(params['reset'])
+        elif 'delete' in params:
+            if not self._wrapper.remove_statistics(params['delete']):
+                raise cherrypy.HTTPError(404, "No such statistics window")
+            return
+        return self._wrapper.get_statistics_json()
+
+    @cherrypy.expose
+    def voltage(self, **params):
+        """Gets or sets the voltage of the device. Pass in target voltage with key 'target_voltage_V' to set the voltage value
+
+        :param params: Dictionary of values. Value with key 'target_voltage_V' will be used if provided
+        :type params: dict
+        :return: str or None -- If called with no parameter then output voltage is returned in units of V
+
+        """
+        if 'target_voltage_V' in params:
+            self._admission.call(Admission.WRITE, self._wrapper.set_voltage, float(params['target_voltage_V']))
+        else:
+            return self._admission.call(Admission.READ, self._wrapper.get_voltage)
+
+    @cherrypy.expose
+    def current(self, **params):
+        """ Gets or sets the current of the device. Pass in target current with key 'current_limit_mA' to set the voltage value
+
+        :param params: Value with key 'current_limit_mA' will be used if provided
+        :type params: dict
+        :return: str or None -- If called with no parameter then output current is returned in units of mA
+
+        """
+        if 'current_limit_mA' in params:
+            self._admission.call(Admission.WRITE, self._wrapper.set_current, int(params['current_limit_mA']))
+        else:
+            return self._admission.call(Admission.READ, self._wrapper.get_current)
+
+    @cherrypy.expose
+    def output_on(self, **params):
+        """ Gets or set the output on value of the device. Pass in value "0" or "1" on key 'on' to set the output value
+
+        :param params: Value with key 'on' will be used if provided
+        :type params: dict
+        :return: str or None -- Returns values "0" or "1" if called with no parameter
+        """
+        if 'on' in params:
+            if params['on'] == "1":
+                self._admission.call(Admission.WRITE, self._wrapper.set_device_on)
+            else:
+                self._admission.call(Admission.WRITE, self._wrapper.set_device_off)
+        else:
+            return "1" if self._admission.call(Admission.READ, self._wrapper.get_output_on) else "0"
+
+
+
+
+
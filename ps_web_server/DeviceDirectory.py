@@ -0,0 +1,149 @@
+import collections
+import concurrent.futures
+import cherrypy
+import json
+import threading
+import time
+from ps_web_server.Admission import AdmissionControl
+from ps_web_server.DeviceApi import DeviceApi
+from ps_web_server.PsWebWrapper import Wrapper
+
+
+class DeviceDirectory(object):
+    """Routes /devices/<device id>/... to the routes of that device and serves snapshots of all devices"""
+
+    def __init__(self, wrappers, admissions=None, max_sample_age=None):
+        """Constructor
+
+        :param wrappers: Wrapper of every device by device id
+        :type wrappers: dict[str, Wrapper]
+        :param admissions: Admission control of every device by device id. Default one of its own for every device
+        :type admissions: dict[str, AdmissionControl]
+        :param max_sample_age: If given, /devices/<device id>/all_values is answered from a background sample
+            younger than this many seconds instead of reading the device
+        :type max_sample_age: float
+        """
+        self._wrappers = wrappers
+        self._admissions = admissions or collections.OrderedDict(
+            (device_id, AdmissionControl()) for device_id in wrappers)
+        self._device_apis = collections.OrderedDict(
+            (device_id, DeviceApi(wrapper, self._admissions[device_id], max_sample_age))
+            for device_id, wrapper in wrappers.items())
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(len(wrappers), 1))
+        self._pending_reads = dict()
+        self._pending_reads_lock = threading.Lock()
+
+    def shutdown(self):
+        """Lets the read and device workers exit. The web server waits for them when stopping
+
+        :return: None
+        """
+        self._executor.shutdown(wait=False)
+        for admission in self._admissions.values():
+            admission.shutdown()
+
+    def _cp_dispatch(self, vpath):
+        if vpath and vpath[0] in self._device_apis:
+            return self._device_apis[vpath.pop(0)]
+        return None
+
+    @cherrypy.expose
+    def index(self):
+        """Lists the devices
+
+        :return: str -- JSON list of dicts with keys 'id' and 'connected'
+        """
+        return json.dumps([{"id": device_id, "connected": 1 if wrapper.connected() else 0}
+                           for device_id, wrapper in self._wrappers.items()])
+
+    @cherrypy.expose
+    def all_values(self, **params):
+        """Gets the values of every device in one snapshot.
+
+        Devices with a background sample younger than max_age are answered from that sample. The others are read
+        concurrently, and a device that has not answered by the deadline is answered with its latest sample and an
+        error, so one slow or unplugged device does not hold up the response.
+
+        :param params: Optional values with keys::
+            - max_age: Seconds a background sample may be old to be used without reading the device. Default 1
+            - timeout: Seconds to wait for devices that are read. Default 0.5
+        :type params: dict
+        :return: str -- JSON dict with key 'devices', a dict by device id of the values as in /all_values with the
+            additional keys 'timestamp', 'age_s', 'source' ('cache' or 'device') and 'error', and key 'elapsed_ms'
+
+        """
+        try:
+            max_age = float(params.get('max_age', 1.0))
+            timeout = float(params.get('timeout', 0.5))
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid max_age or timeout")
+        return json.dumps(self.get_snapshot(max_age, timeout))
+
+    def get_snapshot(self, max_age, timeout):
+        """Gets the values of every device, reading the devices without a recent background sample concurrently
+
+        :param max_age: Seconds a background sample may be old to be used without reading the device
+        :type max_age: float
+        :param timeout: Seconds to wait for devices that are read
+        :type timeout: float
+        :return: dict -- Snapshot as described in all_values
+        """
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        now = time.time()
+        devices = collections.OrderedDict()
+        reads = dict()
+        for device_id, wrapper in self._wrappers.items():
+            timestamp, device_values = wrapper.latest_sample()
+            if device_values is not None and now - timestamp <= max_age:
+                devices[device_id] = self._entry(timestamp, device_values, "cache")
+            else:
+                devices[device_id] = None
+                reads[device_id] = self._read(device_id, wrapper)
+
+        for device_id, future in reads.items():
+            try:
+                timestamp, device_values = future.result(max(deadline - time.monotonic(), 0))
+                devices[device_id] = self._entry(timestamp, device_values, "device")
+            except concurrent.futures.TimeoutError:
+                devices[device_id] = self._cached_entry(device_id, "Timed out after {0} s".format(timeout))
+            except Exception as e:
+                devices[device_id] = self._cached_entry(device_id, str(e) or repr(e))
+        for device_id, entry in devices.items():
+            entry["connected"] = 1 if self._wrappers[device_id].connected() else 0
+        return {"devices": devices, "elapsed_ms": round((time.monotonic() - start_time) * 1000, 3)}
+
+    def _read(self, device_id, wrapper):
+        """Starts reading a device on the executor. A read still running from an earlier snapshot is reused, so
+        a device that does not answer never occupies more than one worker
+
+        :return: concurrent.futures.Future -- Future of the (timestamp, values) read
+        """
+        with self._pending_reads_lock:
+            future = self._pending_reads.get(device_id)
+            if future is None or future.done():
+                future = self._executor.submit(wrapper.read_sample)
+                self._pending_reads[device_id] = future
+            return future
+
+    def _cached_entry(self, device_id, error):
+        """Gets the entry of a device that could not be read from its latest background sample
+
+        :return: dict -- The entry with the error set
+        """
+        timestamp, device_values = self._wrappers[device_id].latest_sample()
+        if device_values is None:
+            entry = {"timestamp": None, "age_s": None, "source": None}
+        else:
+            entry = self._entry(timestamp, device_values, "cache")
+        entry["error"] = error
+        return entry
+
+    @staticmethod
+    def _entry(timestamp, device_values, source):
+        entry = Wrapper.values_to_dict(device_values)
+        entry["timestamp"] = timestamp
+        entry["age_s"] = round(time.time() - timestamp, 3)
+        entry["source"] = source
+        entry["error"] = None
+        return entry
@@ -0,0 +1,217 @@
+import collections
+import cherrypy
+import json
+import time
+from ps_web_server import HttpMetrics
+from ps_web_server.Upstream import Upstream, UpstreamError
+
+
+class GatewayServer(object):
+    """Serves the devices of several PsController servers as one. Device ids are "<upstream>/<device id>", where
+    upstream is the host:port of the server"""
+
+    def __init__(self, port, upstream_urls, server_logging, poll_interval=0.2, timeout=1.0):
+        """Constructor
+
+        :param port: Port the gateway listens on
+        :type port: int
+        :param upstream_urls: Base url of every server, e.g. "http://lab3:8080"
+        :type upstream_urls: list[str]
+        :param server_logging: If True the web server logs to the screen
+        :type server_logging: bool
+        :param poll_interval: Seconds between snapshots of every server
+        :type poll_interval: float
+        :param timeout: Seconds a request to a server may take
+        :type timeout: float
+        """
+        self._host = '127.0.0.1'
+        self._port = port
+        self.server_logging = server_logging
+        self._upstreams = collections.OrderedDict()
+        for url in upstream_urls:
+            upstream = Upstream(url, poll_interval, timeout)
+            self._upstreams[upstream.name] = upstream
+        self.devices = GatewayDevices(self._upstreams)
+
+    def start(self):
+        """Starts the web server
+
+        :return: None
+        """
+        conf = {
+            'global': {
+                'server.socket_host': self._host,
+                'server.socket_port': self._port
+            },
+            '/': {
+                'tools.http_metrics.on': True
+            }
+        }
+        self.start_upstreams()
+        cherrypy.engine.subscribe('stop', self.stop_upstreams)
+        if not self.server_logging:
+            cherrypy.log.screen = None
+        cherrypy.quickstart(self, '/', conf)
+
+    def start_upstreams(self):
+        """Starts keeping snapshots of every server
+
+        :return: None
+        """
+        for upstream in self._upstreams.values():
+            upstream.start()
+
+    def stop_upstreams(self):
+        """Stops keeping snapshots of the servers
+
+        :return: None
+        """
+        for upstream in self._upstreams.values():
+            upstream.stop()
+
+    @cherrypy.expose
+    def stop(self):
+        """Stops the web server
+
+        :return: None
+        """
+        cherrypy.engine.exit()
+
+    @cherrypy.expose
+    def metrics(self):
+        """Gets the HTTP metrics of the gateway
+
+        :return: str -- The metrics in the Prometheus text exposition format
+        """
+        return HttpMetrics.render()
+
+    @cherrypy.expose
+    def index(self):
+        """Lists the servers
+
+        :return: str -- JSON dict of server status by upstream name, see upstreams
+        """
+        return self.upstreams()
+
+    @cherrypy.expose
+    def upstreams(self):
+        """Gets the health and request latency of every server
+
+        :return: str -- JSON dict by upstream name of dicts with keys 'connected', 'snapshot_age_s', 'latency_ms',
+            'failures' and 'error'
+        """
+        return json.dumps(collections.OrderedDict(
+            (name, upstream.status()) for name, upstream in self._upstreams.items()))
+
+
+class GatewayDevices(object):
+    """Serves the combined snapshot of all servers and forwards /devices/<upstream>/<device id>/... to the server
+    of the device"""
+
+    def __init__(self, upstreams):
+        """Constructor
+
+        :param upstreams: Every server by upstream name
+        :type upstreams: dict[str, Upstream]
+        """
+        self._upstreams = upstreams
+
+    def _cp_dispatch(self, vpath):
+        if len(vpath) >= 2 and vpath[0] in self._upstreams:
+            upstream = self._upstreams[vpath.pop(0)]
+            return DeviceForwarder(upstream, vpath.pop(0))
+        return None
+
+    @cherrypy.expose
+    def index(self):
+        """Lists the devices of every server
+
+        :return: str -- JSON list of dicts with keys 'id', 'upstream' and 'connected'
+        """
+        devices = []
+        for name, upstream in self._upstreams.items():
+            snapshot_time, upstream_devices = upstream.devices()
+            devices.extend({"id": name + "/" + device_id, "upstream": name, "connected": entry.get("connected", 0)}
+                           for device_id, entry in upstream_devices.items())
+        return json.dumps(devices)
+
+    @cherrypy.expose
+    def all_values(self, **params):
+        """Gets the values of every device of every server from the latest snapshots, without waiting for any
+        server.
+
+        :param params: Optional values with keys::
+            - max_age: Seconds the values of a device may be old. Older values are returned with an error. Default 1
+        :type params: dict
+        :return: str -- JSON dict with key 'devices', a dict by "<upstream>/<device id>" of the entries as in
+            /devices/all_values of the server with 'age_s' counted to now, and key 'upstreams' as in /upstreams
+
+        """
+        try:
+            max_age = float(params.get('max_age', 1.0))
+        except ValueError:
+            raise cherrypy.HTTPError(400, "Invalid max_age")
+        return json.dumps(self.get_snapshot(max_age))
+
+    def get_snapshot(self, max_age):
+        """Gets the values of every device of every server from the latest snapshots
+
+        :param max_age: Seconds the values of a device may be old. Older values are returned with an error
+        :type max_age: float
+        :return: dict -- Snapshot as described in all_values
+        """
+        now = time.time()
+        devices = collections.OrderedDict()
+        upstreams = collections.OrderedDict()
+        for name, upstream in self._upstreams.items():
+            upstreams[name] = upstream.status()
+            snapshot_time, upstream_devices = upstream.devices()
+            for device_id, entry in upstream_devices.items():
+                entry = dict(entry)
+                if entry.get("timestamp") is not None:
+                    entry["age_s"] = round(now - entry["timestamp"], 3)
+                    if entry["age_s"] > max_age and not entry.get("error"):
+                        entry["error"] = "Values are {0} s old".format(entry["age_s"])
+                if upstreams[name]["error"]:
+                    entry["connected"] = 0
+                    entry["error"] = upstreams[name]["error"]
+                devices[name + "/" + device_id] = entry
+        return {"devices": devices, "upstreams": upstreams}
+
+
+class DeviceForwarder(object):
+    """Forwards the routes of a device to the server of the device. Streaming routes are not forwarded, a forwarded
+    response is read whole and an endless stream would hold a connection to the server until the deadline"""
+
+    STREAMING_ROUTES = ('sample_stream', 'export')
+
+    def __init__(self, upstream, device_id):
+        """Constructor
+
+        :param upstream: The server of the device
+        :type upstream: Upstream
+        :param device_id: Id of the device on the server
+        :type device_id: str
+        """
+        self._upstream = upstream
+        self._device_id = device_id
+
+    @cherrypy.expose
+    def default(self, *vpath, **params):
+        """Forwards the request to the same route of the device on its server
+
+        :return: bytes -- The response of the server
+        :raise: cherrypy.HTTPError 501 for streaming routes
+        """
+        if vpath and vpath[0] in self.STREAMING_ROUTES:
+            raise cherrypy.HTTPError(501, "{0} is not forwarded, connect to {1} directly".format(
+                vpath[0], self._upstream.name))
+        path = "/devices/" + "/".join((self._device_id,) + vpath)
+        try:
+            status, content_type, body = self._upstream.forward(cherrypy.request.method, path, params)
+        except UpstreamError as e:
+            raise cherrypy.HTTPError(502, str(e))
+        cherrypy.response.status = status
+        if content_type:
+            cherrypy.response.headers['Content-Type'] = content_type
+        return body
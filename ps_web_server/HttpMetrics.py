@@ -0,0 +1,61 @@
+import cherrypy
+import time
+from ps_controller.metrics.Metrics import REGISTRY, Gauge, Histogram
+
+REQUEST_SECONDS = Histogram("ps_http_request_seconds", "Duration of HTTP requests by handler", ("endpoint",))
+REQUESTS_IN_FLIGHT = Gauge("ps_http_requests_in_flight", "HTTP requests being handled")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class HttpMetricsTool(cherrypy.Tool):
+    """Measures every request. The endpoint label is the name of the handler, e.g. "DeviceApi.all_values", so
+    the routes of all devices share one label"""
+
+    def __init__(self):
+        cherrypy.Tool.__init__(self, 'on_start_resource', self._start_request)
+
+    def _setup(self):
+        cherrypy.Tool._setup(self)
+        cherrypy.request.hooks.attach('on_end_request', self._end_request)
+
+    @staticmethod
+    def _start_request():
+        cherrypy.request.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @staticmethod
+    def _end_request():
+        request = cherrypy.request
+        start = getattr(request, 'metrics_start', None)
+        if start is None:
+            return
+        REQUESTS_IN_FLIGHT.dec()
+        REQUEST_SECONDS.labels(endpoint_name(request.handler)).observe(time.perf_counter() - start)
+
+
+def endpoint_name(handler):
+    """Gets the name of the handler of a request
+
+    :param handler: The handler of the request
+    :type handler: cherrypy.dispatch.PageHandler
+    :return: str -- Qualified name of the exposed method, "static" if a tool such as staticdir answered the request
+        and "other" otherwise, e.g. for unknown paths
+    """
+    if handler is None:
+        return "static"
+    # The encode tool wraps the page handler
+    handler = getattr(handler, 'oldhandler', handler)
+    return getattr(getattr(handler, 'callable', None), '__qualname__', "other")
+
+
+def render():
+    """Renders all metrics of the process and sets the content type of the response
+
+    :return: str -- The metrics in the Prometheus text exposition format
+    """
+    cherrypy.response.headers['Content-Type'] = CONTENT_TYPE
+    return REGISTRY.render()
+
+
+cherrypy.tools.http_metrics = HttpMetricsTool()
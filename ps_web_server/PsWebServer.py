@@ -1,15 +1,87 @@
+import collections
 import cherrypy
 import os
+from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.device.ProcessDevice import ProcessDevice
+from ps_controller.logging.CustomLogger import CustomLogger
+from ps_web_server import Admission
+from ps_web_server.Admission import AdmissionControl
+from ps_web_server.AssetCache import AssetCache, AssetDirectory
+from ps_web_server.DeviceApi import DeviceApi
+from ps_web_server import HttpMetrics
+from ps_web_server.DebugApi import DebugApi
+from ps_web_server.DeviceDirectory import DeviceDirectory
 from ps_web_server.PsWebWrapper import Wrapper
 
-
-class PsWebServer(object):
-    def __init__(self, port, ps_log_level, server_logging, resources_base_dir=None):
+DEFAULT_DEVICE_ID = "default"
+
+LEAN_THREAD_POOL = 32
+LEAN_SOCKET_QUEUE_SIZE = 128
+
+
+class PsWebServer(DeviceApi):
+    """Serves the web interface. The device routes at the root act on the first device, and every device has its
+    routes under /devices/<device id>/"""
+
+    def __init__(self, port, ps_log_level, server_logging, resources_base_dir=None, sample_interval=0.05,
+                 recording_dir=None, device_type="usb", all_devices=False, simulated_devices=1, isolate_io=False,
+                 bridge_addresses=None, trace_transactions=False, profiling=False, lean_api=False):
+        """Constructor
+
+        :param all_devices: If True every device of device_type found at startup is served. Otherwise the first
+            device found when connecting, with device id DEFAULT_DEVICE_ID
+        :type all_devices: bool
+        :param simulated_devices: Number of simulated devices if all_devices and device_type is "simulated"
+        :type simulated_devices: int
+        :param isolate_io: If True the serial I/O of every device runs in a worker process of its own
+        :type isolate_io: bool
+        :param bridge_addresses: "host:port" of the serial to TCP bridge of every device if device_type is "tcp"
+        :type bridge_addresses: list[str]
+        :param trace_transactions: If True device transactions are traced from the start, see /debug/traces
+        :type trace_transactions: bool
+        :param profiling: If True the server can be profiled through /debug/profile
+        :type profiling: bool
+        :param lean_api: If True the server runs without sessions and with a larger thread pool and socket queue,
+            and all_values is answered from the latest background sample instead of reading the device
+        :type lean_api: bool
+        """
         self._host = '127.0.0.1'
         self._port = port
         self.server_logging = server_logging
-        self._wrapper = Wrapper(ps_log_level)
+        self._lean_api = lean_api
+        self._wrappers = collections.OrderedDict()
+        device_factory = DeviceFactory()
+        if all_devices:
+            ports = device_factory.discover(device_type, CustomLogger(ps_log_level), simulated_devices,
+                                            bridge_addresses)
+        else:
+            ports = collections.OrderedDict(((DEFAULT_DEVICE_ID, None),))
+        for device_id, port in ports.items():
+            if isolate_io:
+                device = ProcessDevice(device_type, port, sample_interval, ps_log_level)
+            elif all_devices:
+                device = device_factory.create_device(device_type, CustomLogger(ps_log_level), port)
+            else:
+                device = None
+            device_recording_dir = recording_dir
+            if recording_dir and all_devices:
+                device_recording_dir = os.path.join(recording_dir, device_id)
+            self._wrappers[device_id] = Wrapper(ps_log_level, sample_interval, device_recording_dir, device_type,
+                                                device)
+        if not self._wrappers:
+            self._wrappers[DEFAULT_DEVICE_ID] = Wrapper(ps_log_level, sample_interval, recording_dir, device_type)
+        admissions = collections.OrderedDict((device_id, AdmissionControl()) for device_id in self._wrappers)
+        # A sample is missed now and then when the device is busy
+        max_sample_age = max(3 * sample_interval, 0.2) if lean_api else None
+        DeviceApi.__init__(self, next(iter(self._wrappers.values())), next(iter(admissions.values())),
+                           max_sample_age)
+        self.devices = DeviceDirectory(self._wrappers, admissions, max_sample_age)
+        self.debug = DebugApi(trace_transactions, profiling=profiling)
         self.resources_base_dir = resources_base_dir or os.path.abspath(os.path.split(__file__)[0])
+        self._assets = AssetCache(self.resources_base_dir)
+        self.css = AssetDirectory(self._assets, 'css')
+        self.js = AssetDirectory(self._assets, 'js')
+        self.fonts = AssetDirectory(self._assets, 'fonts')
 
     def start(self, resources_base_dir=None):
         """Starts the web server
@@ -23,23 +95,24 @@ class PsWebServer(object):
             },
             '/': {
                 'tools.sessions.on': True,
-                'tools.staticdir.root': self.resources_base_dir
-            },
-            '/css': {
-                'tools.staticdir.on': True,
-                'tools.staticdir.dir': './css'
-            },
-            '/js': {
-                'tools.staticdir.on': True,
-                'tools.staticdir.dir': './js'
-            },
-            '/fonts': {
-                'tools.staticdir.on': True,
-                'tools.staticdir.dir': './fonts'
+                'tools.http_metrics.on': True
             }
         }
-
-        self._wrapper.connect()
+        if self._lean_api:
+            # No handler uses the session, and polling clients would create and lock one per request
+            conf['/']['tools.sessions.on'] = False
+            conf['global'].update({
+                'server.thread_pool': LEAN_THREAD_POOL,
+                'server.socket_queue_size': LEAN_SOCKET_QUEUE_SIZE,
+                'engine.autoreload.on': False,
+                'request.show_tracebacks': False
+            })
+
+        for wrapper in self._wrappers.values():
+            wrapper.connect()
+            wrapper.start_acquisition()
+            cherrypy.engine.subscribe('stop', wrapper.stop_acquisition)
+        cherrypy.engine.subscribe('stop', self.devices.shutdown)
 
         if not self.server_logging:
             cherrypy.log.screen = None
@@ -54,79 +127,21 @@ class PsWebServer(object):
         cherrypy.engine.exit()
 
     @cherrypy.expose
-    def index(self):
-        """Gives the default index page of the web server
-
-        :return: str -- Index page of web server
-        """
-        self._wrapper.connect()
-        index_file_path = os.path.join(self.resources_base_dir, 'index.html')
-        with open(index_file_path)as f:
-            index = f.read()
-        return index
-
-    @cherrypy.expose
-    def all_values(self):
-        """Gets all values of the device.
-
-        :return: str -- JSON dict with the following keys::
-            - output_voltage_V
-            - output_current_mA
-            - target_voltage_V
-            - current_limit_mA
-            - output_on
-            - connected
-            - authentication_error
-
-        """
-        return self._wrapper.get_all_values_json()
-
-
-    @cherrypy.expose
-    def voltage(self, **params):
-        """Gets or sets the voltage of the device. Pass in target voltage with key 'target_voltage_V' to set the voltage value
-
-        :param params: Dictionary of values. Value with key 'target_voltage_V' will be used if provided
-        :type params: dict
-        :return: str or None -- If called with no parameter then output voltage is returned in units of V
+    def metrics(self):
+        """Gets the device, transaction and HTTP metrics of the server
 
+        :return: str -- The metrics in the Prometheus text exposition format
         """
-        if 'target_voltage_V' in params:
-            self._wrapper.set_voltage(float(params['target_voltage_V']))
-        else:
-            return self._wrapper.get_voltage()
-
-    @cherrypy.expose
-    def current(self, **params):
-        """ Gets or sets the current of the device. Pass in target current with key 'current_limit_mA' to set the voltage value
-
-        :param params: Value with key 'current_limit_mA' will be used if provided
-        :type params: dict
-        :return: str or None -- If called with no parameter then output current is returned in units of mA
-
-        """
-        if 'current_limit_mA' in params:
-            self._wrapper.set_current(int(params['current_limit_mA']))
-        else:
-            return self._wrapper.get_current()
+        return HttpMetrics.render()
 
     @cherrypy.expose
-    def output_on(self, **params):
-        """ Gets or set the output on value of the device. Pass in value "0" or "1" on key 'on' to set the output value
+    def index(self):
+        """Gives the default index page of the web server
 
-        :param params: Value with key 'on' will be used if provided
-        :type params: dict
-        :return: str or None -- Returns values "0" or "1" if called with no parameter
+        :return: bytes -- Index page of web server, possibly compressed
         """
-        if 'on' in params:
-            if params['on'] == "1":
-                self._wrapper.set_device_on()
-            else:
-                self._wrapper.set_device_off()
-        else:
-            return "1" if self._wrapper.get_output_on() else "0"
-
-
-
-
-
+        # Connecting can scan every serial port, so the page does not wait for it
+        if not self._wrapper.connected():
+            self._admission.start(Admission.WRITE, self._wrapper.connect)
+        return self._assets.serve(self._assets.index)
+    index._cp_config = {'tools.encode.on': False}
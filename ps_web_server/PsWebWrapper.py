@@ -1,18 +1,73 @@
 import json
+import time
 from ps_controller import PsControllerException
 from ps_controller.DeviceValues import DeviceValues
 from ps_controller.logging.CustomLogger import CustomLogger
+from ps_controller.acquisition.AcquisitionLoop import AcquisitionLoop
+from ps_controller.acquisition.RingAcquisitionLoop import RingAcquisitionLoop
+from ps_controller.acquisition import SampleHistory
+from ps_controller.acquisition.Statistics import StatisticsWindows
+from ps_controller.recording.Recorder import Recorder
+from ps_controller.recording.RecordingReader import RecordingReader
+from ps_controller.recording import Rollup
+from ps_controller.recording import Export
+from ps_controller.jobs.JobManager import JobManager
+from ps_controller.jobs.Sweep import SweepJob
+from ps_controller.jobs.Playback import PlaybackJob
+from ps_controller.control.ControlLoop import ControlLoopJob
+from ps_controller.control.SafetyEnvelope import SafetyEnvelope
+from ps_controller.control import Controllers
+from ps_controller.alarms.AlarmEngine import AlarmEngine
+from ps_controller.alarms.AlarmRule import AlarmRule
+from ps_controller.utilities import Downsampling
 
 from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.device.ProcessDevice import ProcessDevice
 
 
 class Wrapper:
     """ Abstracts communication to the device for the PsWebServer"""
 
-    def __init__(self, log_level):
+    def __init__(self, log_level, sample_interval=0.05, recording_dir=None, device_type="usb", device=None):
         self._logHandlersAdded = False
         logger = CustomLogger(log_level)
-        self._hardware_interface = DeviceFactory().get_device("usb", logger)
+        self._hardware_interface = device or DeviceFactory().get_device(device_type, logger)
+        self._jobs = JobManager()
+        self._history = SampleHistory.SampleHistory()
+        if isinstance(self._hardware_interface, ProcessDevice):
+            self._acquisition = RingAcquisitionLoop(self._hardware_interface, logger)
+        else:
+            self._acquisition = AcquisitionLoop(self._hardware_interface, logger, interval=sample_interval)
+        self._alarms = AlarmEngine(self._hardware_interface, logger)
+        self._acquisition.add_listener(self._alarms.evaluate)
+        self._acquisition.add_listener(self._history.add)
+        self._statistics = StatisticsWindows()
+        self._acquisition.add_listener(self._statistics.add)
+        self._latest_values_json = (None, None)
+        self._recorder = None
+        self._recording_reader = None
+        if recording_dir:
+            self._recorder = Recorder(recording_dir, logger)
+            self._recording_reader = RecordingReader(recording_dir)
+            self._acquisition.add_listener(self._recorder.add)
+
+    def start_acquisition(self):
+        """Starts polling the device in the background. Samples are kept in the history and recorded if enabled
+
+        :return: None
+        """
+        if self._recorder:
+            self._recorder.start()
+        self._acquisition.start()
+
+    def stop_acquisition(self):
+        """Stops polling the device in the background
+
+        :return: None
+        """
+        self._acquisition.stop()
+        if self._recorder:
+            self._recorder.stop()
 
     def set_voltage(self, voltage):
         """Set the voltage value of the connected PS201
@@ -61,16 +116,86 @@ class Wrapper:
             all_values = DeviceValues()
             current_values_dict["connected"] = 0
 
-        current_values_dict["output_voltage_V"] = round(all_values.output_voltage / 1000, 1)
-        current_values_dict["output_current_mA"] = all_values.output_current
-        current_values_dict["target_voltage_V"] = round(all_values.target_voltage / 1000, 1)
-        current_values_dict["current_limit_mA"] = all_values.target_current
-        current_values_dict["output_on"] = 1 if all_values.output_is_on else 0
+        current_values_dict.update(self.values_to_dict(all_values))
         current_values_dict["authentication_error"] = 0 if self._hardware_interface.connected() else (
             1 if self._authentication_errors() else 0)
 
         return json.dumps(current_values_dict)
 
+    def get_latest_values_json(self, max_age):
+        """Get the device values of the latest background sample on JSON format, without reading the device. The
+        JSON is made once per sample and shared by all requests
+
+        :param max_age: Seconds the sample may be old
+        :type max_age: float
+        :return: bytes or None -- UTF-8 JSON dict with the keys of get_all_values_json. None if there is no sample
+            younger than max_age
+        """
+        timestamp, device_values = self._acquisition.latest()
+        if device_values is None or time.time() - timestamp > max_age:
+            return None
+        json_timestamp, values_json = self._latest_values_json
+        if json_timestamp != timestamp:
+            current_values_dict = {"connected": 1}
+            current_values_dict.update(self.values_to_dict(device_values))
+            current_values_dict["authentication_error"] = 0
+            values_json = json.dumps(current_values_dict).encode('utf-8')
+            self._latest_values_json = (timestamp, values_json)
+        return values_json
+
+    @staticmethod
+    def values_to_dict(device_values):
+        """Converts device values to the units used by the web interface
+
+        :param device_values: The device values
+        :type device_values: DeviceValues
+        :return: dict -- Dict with keys output_voltage_V, output_current_mA, target_voltage_V, current_limit_mA and
+            output_on
+        """
+        return {
+            "output_voltage_V": round(device_values.output_voltage / 1000, 1),
+            "output_current_mA": device_values.output_current,
+            "target_voltage_V": round(device_values.target_voltage / 1000, 1),
+            "current_limit_mA": device_values.target_current,
+            "output_on": 1 if device_values.output_is_on else 0}
+
+    def add_sample_listener(self, listener):
+        """Adds a function that is called with every sample acquired in the background, on the acquisition thread
+
+        :param listener: The function
+        :type listener: lambda x: func(timestamp: float, device_values: DeviceValues) -> None
+        :return: None
+        """
+        self._acquisition.add_listener(listener)
+
+    def remove_sample_listener(self, listener):
+        """Removes a function added with add_sample_listener
+
+        :param listener: The function
+        :return: None
+        """
+        self._acquisition.remove_listener(listener)
+
+    def latest_sample(self):
+        """Gets the sample most recently acquired in the background
+
+        :return: tuple(float, DeviceValues) -- (timestamp, values). Both are None if nothing has been acquired
+        """
+        return self._acquisition.latest()
+
+    def read_sample(self):
+        """Reads the device now, connecting first if needed
+
+        :return: tuple(float, DeviceValues) -- (timestamp, values)
+        :raise: PsControllerException if the device could not be read
+        """
+        if not self.connect():
+            raise PsControllerException("Device not connected")
+        device_values = self._hardware_interface.get_all_values()
+        if device_values is None:
+            raise PsControllerException("No response from device")
+        return time.time(), device_values
+
     def get_current(self):
         """Get the output current of the connected device
 
@@ -132,6 +257,249 @@ class Wrapper:
         except PsControllerException:
             pass
 
+    def get_history_json(self, seconds=None, max_points=None, method=Downsampling.LTTB, start=None, end=None):
+        """Get recorded output voltage and current on JSON format, optionally downsampled
+
+        Samples come from the in memory history unless recording is enabled and the requested range starts before
+        the oldest sample in memory. Downsampled ranges from the recording are read from the coarsest rollup that
+        still has at least max_points buckets in the range.
+
+        :param seconds: Only include samples from the last seconds. Overrides start
+        :type seconds: float
+        :param max_points: Maximum number of points per series. None to skip downsampling
+        :type max_points: int
+        :param method: Downsampling method, Downsampling.LTTB or Downsampling.MIN_MAX
+        :type method: str
+        :param start: Earliest timestamp to include. None for the whole in memory history
+        :type start: float
+        :param end: Latest timestamp to include. None for no upper bound
+        :type end: float
+        :return: str -- JSON str dict with the following keys::
+            - samples: Number of samples, or rollup buckets, the series were computed from
+            - output_voltage_V: dict with lists 't' (timestamps) and 'y' (values)
+            - output_current_mA: dict with lists 't' (timestamps) and 'y' (values)
+            - target_voltage_V: dict with lists 't' (timestamps) and 'y' (values)
+            - current_limit_mA: dict with lists 't' (timestamps) and 'y' (values)
+        :raise: ValueError if method is unknown
+        """
+        if seconds is not None:
+            start = time.time() - seconds
+        samples = self._get_samples(start, end, max_points, method)
+        timestamps = samples[SampleHistory.TIMESTAMP]
+
+        history_dict = dict()
+        history_dict["samples"] = len(timestamps)
+        for key, column, scale in (("output_voltage_V", SampleHistory.OUTPUT_VOLTAGE, 1000),
+                                   ("output_current_mA", SampleHistory.OUTPUT_CURRENT, 1),
+                                   ("target_voltage_V", SampleHistory.TARGET_VOLTAGE, 1000),
+                                   ("current_limit_mA", SampleHistory.TARGET_CURRENT, 1)):
+            values = samples[column]
+            if max_points is not None:
+                indices = Downsampling.downsample(timestamps, values, max_points, method)
+                series_timestamps, values = timestamps[indices], values[indices]
+            else:
+                series_timestamps = timestamps
+            history_dict[key] = {"t": series_timestamps.round(3).tolist(), "y": (values / scale).round(3).tolist()}
+
+        return json.dumps(history_dict)
+
+    def export_recording(self, export_format, start=None, end=None, batch_size=10000):
+        """Encodes recorded samples in a time range, one batch of samples at a time
+
+        :param export_format: Export.CSV or Export.NDJSON
+        :type export_format: str
+        :param start: Earliest timestamp to include. None for no lower bound
+        :type start: float
+        :param end: Latest timestamp to include. None for no upper bound
+        :type end: float
+        :param batch_size: Number of samples encoded per chunk
+        :type batch_size: int
+        :return: generator of bytes or None -- Encoded chunks. None if recording is not enabled
+        :raise: ValueError if export_format is unknown
+        """
+        if not self._recording_reader:
+            return None
+        return Export.encode(export_format, self._recording_reader.iter_range(start, end, batch_size))
+
+    def start_sweep(self, set_points, **sweep_options):
+        """Starts a sweep job on the connected device
+
+        :param set_points: (voltage in mV, current in mA) set points in sweep order
+        :type set_points: list[tuple(int, int)]
+        :param sweep_options: Keyword arguments passed on to SweepJob
+        :type sweep_options: dict
+        :return: int or None -- Id of the job. None if another job is running or no device is connected
+        """
+        return self._submit_job(SweepJob(self._hardware_interface, set_points, **sweep_options))
+
+    def start_playback(self, t, voltage, current, repeat=1):
+        """Starts playing a voltage and current profile on the connected device
+
+        :param t: Seconds from the start of playback of each point
+        :type t: list[float]
+        :param voltage: Target voltage of each point in mV
+        :type voltage: list[int]
+        :param current: Target current of each point in mA
+        :type current: list[int]
+        :param repeat: Number of times to play the profile
+        :type repeat: int
+        :return: int or None -- Id of the job. None if another job is running or no device is connected
+        :raise: ValueError if the profile is invalid
+        """
+        return self._submit_job(PlaybackJob(self._hardware_interface, t, voltage, current, repeat))
+
+    def start_control(self, mode, setpoint, max_voltage, max_current, max_power=None, duration=None,
+                      **controller_options):
+        """Starts a software regulation loop on the connected device. Background acquisition is paused meanwhile
+
+        :param mode: Controllers.CONSTANT_POWER or Controllers.CONSTANT_RESISTANCE
+        :type mode: str
+        :param setpoint: Power in mW for constant power, series resistance in ohm for constant resistance
+        :type setpoint: float
+        :param max_voltage: Highest target and output voltage in mV
+        :type max_voltage: float
+        :param max_current: Highest target and output current in mA. Also the current limit written by the loop
+        :type max_current: float
+        :param max_power: Highest output power in mW. None for no power limit
+        :type max_power: float
+        :param duration: Seconds to run. None to run until cancelled
+        :type duration: float
+        :param controller_options: kp and ki for constant power, open_voltage and smoothing for constant resistance
+        :type controller_options: dict
+        :return: int or None -- Id of the job. None if another job is running or no device is connected
+        :raise: ValueError if a parameter is invalid
+        """
+        envelope = SafetyEnvelope(max_voltage, max_current, max_power)
+        if mode == Controllers.CONSTANT_POWER:
+            controller = Controllers.ConstantPowerController(setpoint, max_voltage, max_current, **controller_options)
+        elif mode == Controllers.CONSTANT_RESISTANCE:
+            controller_options.setdefault('open_voltage', max_voltage)
+            controller = Controllers.ConstantResistanceController(setpoint, current_limit=max_current,
+                                                                  **controller_options)
+        else:
+            raise ValueError("Unknown control mode: " + str(mode))
+        return self._submit_job(ControlLoopJob(self._hardware_interface, controller, envelope, duration,
+                                               acquisition=self._acquisition))
+
+    def get_jobs_json(self, job_id=None):
+        """Get the status of jobs on JSON format
+
+        :param job_id: Id of the job. None for all jobs
+        :type job_id: int
+        :return: str or None -- JSON str dict with job status, or dict of job statuses by id if job_id is None.
+            None if there is no job with that id
+        """
+        if job_id is None:
+            return json.dumps(self._jobs.statuses())
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        return json.dumps(job.status())
+
+    def cancel_job(self, job_id):
+        """Cancels a job
+
+        :param job_id: Id of the job
+        :type job_id: int
+        :return: bool -- If there was a job with that id
+        """
+        job = self._jobs.get(job_id)
+        if not job:
+            return False
+        job.cancel()
+        return True
+
+    def add_alarm(self, rule_dict):
+        """Adds an alarm rule that is evaluated on every acquired sample
+
+        :param rule_dict: Rule parameters, see AlarmRule.from_dict
+        :type rule_dict: dict
+        :return: int -- Id of the rule
+        :raise: ValueError if the rule is invalid
+        """
+        return self._alarms.add_rule(AlarmRule.from_dict(rule_dict))
+
+    def remove_alarm(self, rule_id):
+        """Removes an alarm rule
+
+        :param rule_id: Id of the rule
+        :type rule_id: int
+        :return: bool -- If there was a rule with that id
+        """
+        return self._alarms.remove_rule(rule_id)
+
+    def get_alarms_json(self):
+        """Get all alarm rules and their trigger statistics on JSON format
+
+        :return: str -- JSON str dict of rule descriptions by rule id
+        """
+        return json.dumps(self._alarms.rules())
+
+    def get_statistics_json(self):
+        """Get the statistics of all statistics windows on JSON format
+
+        :return: str -- JSON str dict of statistics by window name
+        """
+        return json.dumps(self._statistics.to_dict())
+
+    def reset_statistics(self, name):
+        """Starts a statistics window over, creating it if it does not exist
+
+        :param name: Name of the window
+        :type name: str
+        :return: None
+        """
+        self._statistics.reset(name)
+
+    def remove_statistics(self, name):
+        """Removes a statistics window
+
+        :param name: Name of the window
+        :type name: str
+        :return: bool -- If there was a window with that name
+        """
+        return self._statistics.remove(name)
+
+    def _submit_job(self, job):
+        """Starts a job on the connected device
+
+        :param job: The job to start
+        :type job: Job
+        :return: int or None -- Id of the job. None if another job is running or no device is connected
+        """
+        if not self.connect():
+            return None
+        try:
+            return self._jobs.submit(job)
+        except PsControllerException:
+            return None
+
+    def _get_samples(self, start, end, max_points, method):
+        """Gets samples in a time range from the in memory history, the recording or the recording rollups
+
+        :return: dict[str, numpy.ndarray] or numpy.ndarray -- Sample columns indexed by SampleHistory column names
+        """
+        if self._recording_reader and start is not None:
+            oldest_in_memory = self._history.oldest_timestamp()
+            if oldest_in_memory is None or start < oldest_in_memory:
+                if max_points:
+                    envelope = method == Downsampling.MIN_MAX
+                    buckets = max_points // 2 if envelope else max_points
+                    range_end = time.time() if end is None else end
+                    level = Rollup.choose_level((range_end - start) / max(buckets, 1))
+                    if level:
+                        rollup = self._recording_reader.read_rollup(level, start, end)
+                        return Rollup.to_sample_columns(rollup, level, envelope)
+                return self._recording_reader.read_range(start, end)
+        return self._history.get_range(start, end)
+
+    def connected(self):
+        """Returns if the device is connected. Does not try to connect
+
+        :return: bool -- If connected
+        """
+        return self._hardware_interface.connected()
+
     def connect(self):
         """Tries to connect to a DPS201
 
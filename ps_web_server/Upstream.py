@@ -0,0 +1,227 @@
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+
+from ps_controller.acquisition.Statistics import RunningStatistics
+
+# Bytes read from a response at a time, between checks of the deadline
+READ_SIZE = 65536
+
+
+class UpstreamError(Exception):
+    """An upstream server could not be reached or did not answer in time"""
+    pass
+
+
+class Upstream:
+    """A PsController server behind a gateway.
+
+    A background thread keeps the latest snapshot of all devices of the server over a keep-alive connection, so
+    reads through the gateway never wait for the server. Forwarded requests use a small pool of keep-alive
+    connections of their own so they do not queue behind the polling or behind each other.
+    """
+
+    def __init__(self, url, poll_interval=0.2, timeout=1.0, forward_connections=4, forward_deadline=5.0):
+        """Constructor
+
+        :param url: Base url of the server, e.g. "http://lab3:8080"
+        :type url: str
+        :param poll_interval: Seconds between snapshots of the server
+        :type poll_interval: float
+        :param timeout: Seconds the server may be silent during a request
+        :type timeout: float
+        :param forward_connections: Number of forwarded requests sent to the server at the same time
+        :type forward_connections: int
+        :param forward_deadline: Seconds a forwarded request may take in total, including waiting for a connection
+        :type forward_deadline: float
+        """
+        parsed_url = urllib.parse.urlsplit(url if "//" in url else "http://" + url)
+        self.name = parsed_url.netloc
+        self._host = parsed_url.hostname
+        self._port = parsed_url.port or 80
+        self._poll_interval = poll_interval
+        self._timeout = timeout
+        self._poll_connection = None
+        self._forward_connections = forward_connections
+        self._forward_deadline = forward_deadline
+        self._forward_slots = threading.BoundedSemaphore(forward_connections)
+        self._idle_connections = []
+        self._pool_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._devices = dict()
+        self._snapshot_time = None
+        self._latency = RunningStatistics()
+        self._last_latency = None
+        self._failures = 0
+        self._last_error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts keeping the snapshot of the server
+
+        :return: None
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="Upstream " + self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops keeping the snapshot and closes the connections
+
+        :return: None
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._poll_connection = self._close(self._poll_connection)
+        with self._pool_lock:
+            idle_connections, self._idle_connections = self._idle_connections, []
+        for connection in idle_connections:
+            self._close(connection)
+
+    def devices(self):
+        """Gets the latest snapshot of the devices of the server
+
+        :return: tuple(float, dict) -- (unix time the snapshot was taken, entries by device id as in
+            /devices/all_values). (None, {}) if no snapshot has been taken
+        """
+        with self._state_lock:
+            return self._snapshot_time, dict(self._devices)
+
+    def status(self):
+        """Gets the health of the connection to the server
+
+        :return: dict -- JSON serializable dict with keys 'connected', 'snapshot_age_s', 'latency_ms' (last, mean,
+            min and max of the snapshot requests), 'failures' (in a row) and 'error'
+        """
+        with self._state_lock:
+            latency = self._latency.to_dict()
+            return {
+                "connected": 1 if self._failures == 0 and self._snapshot_time is not None else 0,
+                "snapshot_age_s": None if self._snapshot_time is None else round(time.time() - self._snapshot_time,
+                                                                                 3),
+                "latency_ms": {
+                    "last": self._last_latency,
+                    "mean": latency["mean"],
+                    "min": latency["min"],
+                    "max": latency["max"],
+                    "count": self._latency.count},
+                "failures": self._failures,
+                "error": self._last_error}
+
+    def forward(self, method, path, params):
+        """Sends a request to the server and gets its response. Fails if the response is not read within the forward
+        deadline, so a slow or endless response only holds one of the connections of the pool
+
+        :param method: HTTP method, e.g. "GET" or "POST"
+        :type method: str
+        :param path: Path on the server, e.g. "/devices/sim0/voltage"
+        :type path: str
+        :param params: Parameters of the request. Sent in the query of GET requests and as form otherwise
+        :type params: dict
+        :return: tuple(int, str, bytes) -- (status, content type, body)
+        :raise: UpstreamError
+        """
+        deadline = time.monotonic() + self._forward_deadline
+        if not self._forward_slots.acquire(timeout=self._forward_deadline):
+            raise UpstreamError("{0}: All {1} connections are busy".format(self.name, self._forward_connections))
+        try:
+            with self._pool_lock:
+                connection = self._idle_connections.pop() if self._idle_connections else None
+            connection, response = self._request(connection, method, path, params, deadline)
+            with self._pool_lock:
+                self._idle_connections.append(connection)
+            return response
+        finally:
+            self._forward_slots.release()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            start_time = time.monotonic()
+            params = {"max_age": self._poll_interval * 2, "timeout": self._timeout / 2}
+            try:
+                self._poll_connection, (status, content_type, body) = self._request(
+                    self._poll_connection, "GET", "/devices/all_values", params)
+                if status != 200:
+                    raise UpstreamError("HTTP status {0}".format(status))
+                devices = json.loads(body.decode())["devices"]
+            except (UpstreamError, ValueError, KeyError) as e:
+                with self._state_lock:
+                    self._failures += 1
+                    self._last_error = str(e)
+            else:
+                latency = round((time.monotonic() - start_time) * 1000, 3)
+                with self._state_lock:
+                    self._devices = devices
+                    self._snapshot_time = time.time()
+                    self._latency.add(latency)
+                    self._last_latency = latency
+                    self._failures = 0
+                    self._last_error = None
+            self._stop_event.wait(max(self._poll_interval - (time.monotonic() - start_time), 0))
+
+    def _request(self, connection, method, path, params, deadline=None):
+        """Sends a request over a keep-alive connection, reconnecting once if the server closed it
+
+        :param deadline: time.monotonic() by which the whole response has to be read. None for no deadline
+        :type deadline: float
+        :return: tuple(http.client.HTTPConnection, tuple(int, str, bytes)) -- The connection to reuse and the
+            (status, content type, body) response
+        :raise: UpstreamError
+        """
+        encoded_params = urllib.parse.urlencode(params)
+        body = None
+        headers = {}
+        if method == "GET":
+            if encoded_params:
+                path += "?" + encoded_params
+        else:
+            body = encoded_params
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in range(2):
+            if connection is None:
+                connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            try:
+                self._limit_timeout(connection, deadline)
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                chunks = []
+                while True:
+                    self._limit_timeout(connection, deadline)
+                    chunk = response.read1(READ_SIZE)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                return connection, (response.status, response.getheader("Content-Type", ""), b"".join(chunks))
+            except (http.client.HTTPException, OSError) as e:
+                connection = self._close(connection)
+                # A kept-alive connection may have been closed by the server in the meantime
+                if attempt == 1 or isinstance(e, TimeoutError):
+                    raise UpstreamError("{0}: {1}".format(self.name, str(e) or repr(e)))
+
+    def _limit_timeout(self, connection, deadline):
+        """Shortens the socket timeout of the connection to what is left until the deadline
+
+        :raise: TimeoutError if the deadline has passed
+        """
+        timeout = self._timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Request took more than {0} s".format(self._forward_deadline))
+            timeout = min(timeout, remaining)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+
+    @staticmethod
+    def _close(connection):
+        if connection is not None:
+            connection.close()
+        return None
@@ -36,15 +36,26 @@ var updateDisplayValues = function(json_reply){
     }
 }
 
+// Milliseconds to wait before the next poll. A busy server (503) tells how long with Retry-After in seconds
+var pollDelay = function(xhr) {
+    var retryAfter = xhr ? parseInt(xhr.getResponseHeader("Retry-After"), 10) : NaN;
+    return isNaN(retryAfter) ? 500 : Math.max(retryAfter * 1000, 500);
+}
+
 var updateValues = function() {
     $.ajax( document.location.origin + "/all_values" )
         .done(function(json_reply) {
             newCurrentValues(jQuery.parseJSON(json_reply));
             setTimeout(updateValues, 500);
         })
-        .fail(function() {
-            blockUI('PS201 web server not found. <br /> Start it by running "PsController" from terminal');
-            setTimeout(updateValues, 500);
+        .fail(function(xhr) {
+            if (xhr.status == 503){
+                // The server is up but the device did not answer in time, e.g. while it is unplugged
+                newCurrentValues({"connected": false});
+            } else {
+                blockUI('PS201 web server not found. <br /> Start it by running "PsController" from terminal');
+            }
+            setTimeout(updateValues, pollDelay(xhr));
         })
 }
 
@@ -84,7 +95,14 @@ var start = function(){
             }
             updateValues();
       })
-
+      .fail(function(xhr) {
+            if (xhr.status == 503){
+                blockUI("Unable to connect to device");
+            } else {
+                blockUI('PS201 web server not found. <br /> Start it by running "PsController" from terminal');
+            }
+            setTimeout(updateValues, pollDelay(xhr));
+      })
 }
 
 $(document).ready(function() {
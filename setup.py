@@ -11,9 +11,10 @@ setup(
     , install_requires=[
         "crcmod == 1.7",
         "pyserial == 2.7",
-        "cherrypy == 3.2.4"
+        "cherrypy == 3.2.4",
+        "numpy"
     ]
     , package_data={'ps_web_server': ['css/*.css', 'fonts/museo/*', 'js/*.js', 'index.html']}
-    , scripts=["psControllerMain.py"]
-    , entry_points={"console_scripts": ["PsController = psControllerMain:run"]}
+    , scripts=["psControllerMain.py", "psBridgeMain.py"]
+    , entry_points={"console_scripts": ["PsController = psControllerMain:run", "PsBridge = psBridgeMain:run"]}
 )
\ No newline at end of file
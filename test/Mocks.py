@@ -1,5 +1,8 @@
 __author__ = 'mannsi'
 
+from ps_controller.DeviceValues import DeviceValues
+from ps_controller.connection.ConnectionFactory import ConnectionFactory
+from ps_controller.device.UsbDevice import UsbDevice
 from ps_controller.logging.CustomLoggerInterface import CustomLoggerInterface
 
 
@@ -51,4 +54,24 @@ class MockLogger(CustomLoggerInterface):
         pass
 
     def log_debug(self, message: str):
-        pass
\ No newline at end of file
+        pass
+
+
+def create_simulated_device(simulated_device):
+    """Creates a connected device talking to a simulated PS201 without serial line delays"""
+    logger = MockLogger()
+    connection = ConnectionFactory(logger).create_simulated_connection(simulated_device, baudrate=None)
+    device = UsbDevice(connection, logger)
+    device.connect()
+    return device
+
+
+def create_device_values(output_voltage=0, output_current=0, target_voltage=0, target_current=0, output_is_on=False):
+    """Creates device values as read from a device, in mV and mA"""
+    device_values = DeviceValues()
+    device_values.output_voltage = output_voltage
+    device_values.output_current = output_current
+    device_values.target_voltage = target_voltage
+    device_values.target_current = target_current
+    device_values.output_is_on = output_is_on
+    return device_values
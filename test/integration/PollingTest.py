@@ -13,9 +13,9 @@ Preconditions:
 - DPS201 is powered on and with input voltage > 4V
 """
 
-import time
 import unittest
 from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.jobs.Sweep import wait_until_settled
 
 from ps_controller.DeviceValues import DeviceValues
 from test.Mocks import MockLogger
@@ -28,7 +28,7 @@ MAX_CURRENT_PERCENTAGE_DEVIATION = 0.02
 MAX_CURRENT_ABSOLUTE_DEVIATION = 21
 
 TARGET_CURRENT = 10
-SLEEP_BETWEEN_STEPS = 1
+SETTLE_TIMEOUT = 1
 
 
 class PollingTest(unittest.TestCase):
@@ -86,8 +86,8 @@ class PollingTest(unittest.TestCase):
 
         self._hardware_interface.set_target_current(target_current)
         self._hardware_interface.set_target_voltage(target_voltage)
-        time.sleep(SLEEP_BETWEEN_STEPS)
-        all_values = self._hardware_interface.get_all_values()
+        settled, readings, _ = wait_until_settled(self._hardware_interface, timeout=SETTLE_TIMEOUT)
+        all_values = readings[-1]
 
         if target_current != all_values.target_current:
             raise Exception("Wrong target current measured. Target current is ", target_current,
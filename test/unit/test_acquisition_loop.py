@@ -0,0 +1,35 @@
+__author__ = 'mannsi'
+
+import threading
+import unittest
+
+from ps_controller.acquisition.AcquisitionLoop import AcquisitionLoop
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from test.Mocks import MockLogger, create_simulated_device
+
+
+class TestAcquisitionLoop(unittest.TestCase):
+    def test_unexpected_read_error_should_not_stop_polling(self):
+        device = create_simulated_device(SimulatedPs201())
+        get_all_values = device.get_all_values
+        failures = [ValueError("invalid literal for int() with base 16")]
+
+        def garbled_once():
+            if failures:
+                raise failures.pop()
+            return get_all_values()
+
+        device.get_all_values = garbled_once
+        sampled = threading.Event()
+        acquisition = AcquisitionLoop(device, MockLogger(), interval=0.01)
+        acquisition.add_listener(lambda timestamp, device_values: sampled.set())
+        acquisition.start()
+        try:
+            self.assertTrue(sampled.wait(5), 'Samples should be acquired after a failed read')
+            self.assertTrue(acquisition.running())
+        finally:
+            acquisition.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
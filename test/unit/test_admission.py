@@ -0,0 +1,69 @@
+__author__ = 'mannsi'
+
+import threading
+import time
+import unittest
+
+from ps_web_server import Admission
+from ps_web_server.Admission import AdmissionControl, Overloaded
+
+
+class TestAdmission(unittest.TestCase):
+    def setUp(self):
+        self.admission = AdmissionControl(workers=1, queue_limits={Admission.READ: 2, Admission.WRITE: 2},
+                                          deadlines={Admission.READ: 0.2, Admission.WRITE: 0.2})
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.admission.shutdown()
+
+    def _block(self):
+        self.release.wait(5)
+        return "blocked"
+
+    def test_call_should_return_result_of_function(self):
+        self.assertEqual(5, self.admission.call(Admission.READ, lambda a, b: a + b, 2, 3))
+        self.assertEqual(0, self.admission.queued(Admission.READ), 'Finished requests should leave the queue')
+
+    def test_call_should_fail_with_503_after_deadline(self):
+        start = time.monotonic()
+        with self.assertRaises(Overloaded) as context:
+            self.admission.call(Admission.READ, self._block)
+        self.assertEqual(503, context.exception.status)
+        self.assertLess(time.monotonic() - start, 1.0, 'The request should not wait for the device')
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+    def test_write_started_before_deadline_should_not_be_rejected(self):
+        threading.Timer(0.4, self.release.set).start()
+        start = time.monotonic()
+        self.assertEqual("blocked", self.admission.call(Admission.WRITE, self._block),
+                         'A write that may have taken effect should not be answered with 503')
+        self.assertGreater(time.monotonic() - start, 0.3, 'The write should be waited for')
+
+    def test_full_queue_should_fail_at_once_and_not_affect_other_class(self):
+        self.assertTrue(self.admission.start(Admission.READ, self._block))
+        self.assertTrue(self.admission.start(Admission.READ, self._block))
+        self.assertFalse(self.admission.start(Admission.READ, self._block), 'The queue should be bounded')
+        start = time.monotonic()
+        with self.assertRaises(Overloaded) as context:
+            self.admission.call(Admission.READ, self._block)
+        self.assertEqual(503, context.exception.status)
+        self.assertLess(time.monotonic() - start, 0.1, 'A full queue should be rejected without waiting')
+        self.assertTrue(self.admission.start(Admission.WRITE, self._block), 'Writes should have a queue of their own')
+
+    def test_requests_past_deadline_should_leave_the_queue(self):
+        self.assertTrue(self.admission.start(Admission.READ, self._block))
+        with self.assertRaises(Overloaded):
+            self.admission.call(Admission.READ, lambda: "late")
+        self.assertEqual(1, self.admission.queued(Admission.READ), 'A request that timed out waiting should be '
+                                                                   'dropped from the queue')
+        self.release.set()
+        deadline = time.monotonic() + 2
+        while self.admission.queued(Admission.READ) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(0, self.admission.queued(Admission.READ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+__author__ = 'mannsi'
+
+import threading
+import time
+import unittest
+
+from ps_controller.alarms.AlarmEngine import AlarmEngine
+from ps_controller.alarms.AlarmRule import AlarmRule
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_controller.utilities.PriorityLock import PriorityLock
+from test.Mocks import MockLogger, create_device_values, create_simulated_device
+
+
+class TestPriorityLock(unittest.TestCase):
+    def test_waiters_should_get_lock_in_priority_then_arrival_order(self):
+        lock = PriorityLock()
+        lock.acquire()
+        order = []
+
+        def waiter(name, high_priority):
+            lock.acquire(high_priority=high_priority)
+            order.append(name)
+            lock.release()
+
+        threads = []
+        for name, high_priority in (("normal 1", False), ("normal 2", False), ("high", True)):
+            thread = threading.Thread(target=waiter, args=(name, high_priority))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.05)
+        lock.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(["high", "normal 1", "normal 2"], order, 'Lock should be handed over in priority order')
+
+    def test_acquire_should_time_out_when_lock_is_held(self):
+        lock = PriorityLock()
+        lock.acquire()
+        self.assertFalse(lock.acquire(timeout=0.01), 'Acquire should time out')
+        lock.release()
+        self.assertFalse(lock.locked(), 'Timed out waiter should not hold the lock')
+
+
+class TestAlarmRule(unittest.TestCase):
+    def test_threshold_rule_should_trigger_once_after_consecutive_samples(self):
+        rule = AlarmRule.from_dict({"quantity": "output_current", "limit": 100, "samples": 2})
+        triggers = [rule.evaluate(i, create_device_values(5000, current))
+                    for i, current in enumerate([150, 50, 150, 150, 150])]
+        self.assertEqual([False, False, False, True, False], triggers, 'Rule should trigger once per violation')
+
+    def test_rate_rule_should_compare_change_per_second(self):
+        rule = AlarmRule.from_dict({"quantity": "output_voltage", "type": "rate", "limit": 1000})
+        self.assertFalse(rule.evaluate(0.0, create_device_values(0, 0)), 'First sample has no rate')
+        self.assertFalse(rule.evaluate(1.0, create_device_values(500, 0)), 'Rate below limit should not trigger')
+        self.assertTrue(rule.evaluate(1.1, create_device_values(1000, 0)), 'Rate above limit should trigger')
+
+    def test_invalid_rule_should_raise(self):
+        self.assertRaises(ValueError, AlarmRule.from_dict, {"quantity": "temperature", "limit": 1})
+        self.assertRaises(ValueError, AlarmRule.from_dict, {"quantity": "output_current"})
+
+
+class TestAlarmEngine(unittest.TestCase):
+    def test_triggered_rule_should_turn_output_off(self):
+        simulated_device = SimulatedPs201(load_resistance=100.0, time_constant=0.0)
+        device = create_simulated_device(simulated_device)
+        device.set_output_on(True)
+        engine = AlarmEngine(device, MockLogger())
+        rule_id = engine.add_rule(AlarmRule.from_dict({"quantity": "output_current", "limit": 30}))
+
+        engine.evaluate(time.time(), create_device_values(5000, 50))
+        self.assertFalse(simulated_device.output_is_on, 'Output should be turned off')
+        self.assertEqual(1, engine.rules()[rule_id]["trigger_count"], 'Trigger should be counted')
+        self.assertTrue(engine.remove_rule(rule_id), 'Rule should be removed')
@@ -0,0 +1,56 @@
+__author__ = 'mannsi'
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from ps_web_server.AssetCache import AssetCache
+
+
+class TestAssetCache(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self._write("fonts/font.woff", b"\x00woff" * 10)
+        self._write("css/app.css", b"@font-face { src: url('../fonts/font.woff?#iefix') }\n" * 20)
+        self._write("js/app.js", b"var x = 1;\n" * 50)
+        self._write("index.html", b'<link href="css/app.css" rel="stylesheet"><script src="js/app.js"></script>'
+                                  b'<script src="http://example.com/lib.js"></script><a href="#">x</a>')
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def _write(self, path, content):
+        file_path = os.path.join(self.base_dir, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+
+    def test_references_should_get_content_hash(self):
+        cache = AssetCache(self.base_dir)
+        index = cache.get("index.html").encodings["identity"].decode()
+        self.assertIn('href="css/app.css?v=' + cache.get("css/app.css").digest + '"', index)
+        self.assertIn('src="js/app.js?v=' + cache.get("js/app.js").digest + '"', index)
+        self.assertIn('src="http://example.com/lib.js"', index, 'External references should be left alone')
+        self.assertIn('href="#"', index)
+        css = cache.get("css/app.css").encodings["identity"].decode()
+        self.assertIn("url('../fonts/font.woff?v=" + cache.get("fonts/font.woff").digest + "&#iefix')", css)
+
+    def test_changed_file_should_change_references(self):
+        digest = AssetCache(self.base_dir).get("index.html").digest
+        self._write("fonts/font.woff", b"changed")
+        self.assertNotEqual(digest, AssetCache(self.base_dir).get("index.html").digest,
+                            'A changed font should change the css and so the index page')
+
+    def test_text_should_be_compressed_with_etag_per_encoding(self):
+        cache = AssetCache(self.base_dir)
+        script = cache.get("js/app.js")
+        self.assertEqual(script.encodings["identity"], gzip.decompress(script.encodings["gzip"]))
+        self.assertNotEqual(script.etag("identity"), script.etag("gzip"))
+        self.assertEqual(["identity"], list(cache.get("fonts/font.woff").encodings),
+                         'Compressed formats should not be compressed again')
+
+
+if __name__ == '__main__':
+    unittest.main()
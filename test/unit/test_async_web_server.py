@@ -0,0 +1,117 @@
+__author__ = 'mannsi'
+
+import http.client
+import json
+import logging
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+from ps_controller.recording import SampleStream
+from ps_web_server.AsyncWebServer import AsyncWebServer
+
+
+class TestAsyncWebServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = AsyncWebServer(0, logging.ERROR, device_type="simulated")
+        cls.thread = threading.Thread(target=cls.server.start, daemon=True)
+        cls.thread.start()
+        assert cls.server.started.wait(20), 'Server should start'
+
+    @classmethod
+    def tearDownClass(cls):
+        connection = http.client.HTTPConnection("127.0.0.1", cls.server.bound_port, timeout=5)
+        connection.request("GET", "/stop")
+        connection.getresponse().read()
+        cls.thread.join(10)
+
+    def _request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.bound_port, timeout=5)
+        headers = dict(headers or {})
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+
+    def test_routes_should_act_on_device(self):
+        status, headers, body = self._request("GET", "/all_values")
+        self.assertEqual(200, status)
+        self.assertEqual(1, json.loads(body.decode())["connected"])
+        self.assertEqual(200, self._request("POST", "/voltage", "target_voltage_V=4.2")[0])
+        self.assertEqual(200, self._request("POST", "/output_on", "on=1")[0])
+        self.assertEqual(b"1", self._request("GET", "/output_on")[2])
+        self.assertEqual(4.2, json.loads(self._request("GET", "/all_values")[2].decode())["target_voltage_V"])
+
+    def test_errors_should_get_status(self):
+        self.assertEqual(404, self._request("GET", "/nothing")[0])
+        self.assertEqual(400, self._request("GET", "/voltage?target_voltage_V=x")[0])
+
+    def test_unusual_request_targets_should_get_status(self):
+        for request_line in (b"GET foo HTTP/1.1", b"OPTIONS * HTTP/1.1"):
+            with socket.create_connection(("127.0.0.1", self.server.bound_port), timeout=5) as connection:
+                connection.sendall(request_line + b"\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                self.assertTrue(connection.recv(4096).startswith(b"HTTP/1.1 404"), request_line)
+
+    def test_failing_handler_should_get_500(self):
+        with mock.patch.object(self.server._wrapper, 'get_voltage', side_effect=RuntimeError("device failed")):
+            self.assertEqual(500, self._request("GET", "/voltage")[0])
+        self.assertEqual(200, self._request("GET", "/voltage")[0], 'The server should keep serving')
+
+    def test_write_running_at_deadline_should_be_waited_for(self):
+        set_voltage = self.server._wrapper.set_voltage
+
+        def slow_set_voltage(voltage):
+            time.sleep(0.3)
+            set_voltage(voltage)
+
+        with mock.patch.object(self.server, '_device_deadline', 0.1), \
+                mock.patch.object(self.server._wrapper, 'set_voltage', side_effect=slow_set_voltage):
+            self.assertEqual(200, self._request("POST", "/voltage", "target_voltage_V=3.3")[0],
+                             'A write that may have taken effect should not be answered with 503')
+        self.assertEqual(3.3, json.loads(self._request("GET", "/all_values")[2].decode())["target_voltage_V"])
+
+    def test_index_should_be_revalidated(self):
+        status, headers, body = self._request("GET", "/")
+        self.assertEqual(200, status)
+        self.assertEqual(304, self._request("GET", "/", headers={"If-None-Match": headers["ETag"]})[0])
+
+    def test_poll_should_wait_for_newer_sample(self):
+        status, headers, body = self._request("GET", "/poll")
+        timestamp = json.loads(body.decode())["timestamp"]
+        status, headers, body = self._request("GET", "/poll?timeout=5&after=" + repr(timestamp))
+        self.assertEqual(200, status)
+        self.assertGreater(json.loads(body.decode())["timestamp"], timestamp)
+        self.assertEqual(204, self._request("GET", "/poll?timeout=0.1&after=1e12")[0])
+
+    def test_stream_should_send_samples(self):
+        with socket.create_connection(("127.0.0.1", self.server.bound_port), timeout=5) as connection:
+            connection.sendall(b"GET /stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            received = b""
+            while received.count(b"data: ") < 3:
+                received += connection.recv(4096)
+        self.assertTrue(received.startswith(b"HTTP/1.1 200 OK"))
+        events = [json.loads(line[6:].decode()) for line in received.split(b"\n") if line.startswith(b"data: ")]
+        self.assertLess(events[0]["timestamp"], events[1]["timestamp"], 'Every event should be a new sample')
+
+    def test_sample_stream_should_send_batches(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.bound_port, timeout=5)
+        connection.request("GET", "/sample_stream?seconds=0.5&batch_interval=0.1")
+        response = connection.getresponse()
+        self.assertEqual(200, response.status)
+        timestamps = [timestamp for batch in SampleStream.read_batches(response) for timestamp in batch['timestamp']]
+        self.assertGreater(len(timestamps), 2, 'Samples acquired while streaming should be sent')
+
+
+class TestAsyncWebServerDevice(unittest.TestCase):
+    def test_tcp_device_should_use_bridge_address(self):
+        server = AsyncWebServer(0, logging.ERROR, device_type="tcp", bridge_address="127.0.0.1:1")
+        self.assertFalse(server._wrapper.connected(), 'Nothing listens at the bridge address')
+        self.assertRaises(ValueError, AsyncWebServer, 0, logging.ERROR, device_type="tcp")
+
+
+if __name__ == '__main__':
+    unittest.main()
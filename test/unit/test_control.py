@@ -0,0 +1,99 @@
+__author__ = 'mannsi'
+
+import unittest
+
+from ps_controller import PsControllerException
+from ps_controller.acquisition.AcquisitionLoop import AcquisitionLoop
+from ps_controller.control.ControlLoop import ControlLoopJob
+from ps_controller.control.Controllers import ConstantPowerController, ConstantResistanceController, PiController
+from ps_controller.control.SafetyEnvelope import SafetyEnvelope
+from ps_controller.jobs import Job
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from test.Mocks import MockLogger, create_simulated_device
+
+
+class TestPiController(unittest.TestCase):
+    def test_saturated_output_should_not_wind_up(self):
+        pi = PiController(kp=0.0, ki=1.0, output_min=0.0, output_max=10.0)
+        for _ in range(100):
+            self.assertEqual(10.0, pi.update(100.0, 1.0), 'Output should be clamped')
+        self.assertTrue(pi.update(-1.0, 1.0) < 10.0, 'Output should leave saturation as soon as the error turns')
+
+
+class TestControlLoop(unittest.TestCase):
+    def setUp(self):
+        self.simulated_device = SimulatedPs201(load_resistance=100.0, time_constant=0.0)
+        self.device = create_simulated_device(self.simulated_device)
+        self.device.set_output_on(True)
+        self.device.set_target_current(200)
+
+    def test_constant_power_should_converge_to_setpoint(self):
+        controller = ConstantPowerController(250, max_voltage=20000, current_limit=200, kp=2.0, ki=200.0)
+        job = ControlLoopJob(self.device, controller, SafetyEnvelope(20000, 200), duration=0.5)
+        job.start()
+        self.assertTrue(job.join(5), 'Control loop should finish')
+        self.assertEqual(Job.FINISHED, job.state(), 'Control loop should succeed')
+        # 250 mW into 100 ohm is 5 V
+        self.assertAlmostEqual(5000, self.simulated_device.target_voltage, delta=50, msg='Power should converge')
+        self.assertTrue(job.result()['loop_rate_hz'] > 0, 'Loop rate should be reported')
+
+    def test_constant_resistance_should_emulate_series_resistance(self):
+        controller = ConstantResistanceController(100, open_voltage=10000, current_limit=200)
+        job = ControlLoopJob(self.device, controller, SafetyEnvelope(20000, 200), duration=0.3)
+        job.start()
+        self.assertTrue(job.join(5), 'Control loop should finish')
+        # 100 ohm in series with a 100 ohm load halves the open voltage
+        self.assertAlmostEqual(5000, self.simulated_device.target_voltage, delta=10, msg='Voltage should divide')
+
+    def test_reading_outside_envelope_should_turn_output_off(self):
+        self.device.set_target_voltage(8000)
+        controller = ConstantPowerController(250, max_voltage=5000, current_limit=200)
+        job = ControlLoopJob(self.device, controller, SafetyEnvelope(5000, 200))
+        job.start()
+        self.assertTrue(job.join(5), 'Control loop should stop')
+        self.assertEqual(Job.FAILED, job.state(), 'Control loop should fail')
+        self.assertIsNotNone(job.result()['tripped'], 'Violation should be reported')
+        self.assertFalse(self.simulated_device.output_is_on, 'Output should be turned off')
+
+    def test_readings_should_be_published_to_acquisition_listeners(self):
+        acquisition = AcquisitionLoop(self.device, MockLogger())
+        samples = []
+        acquisition.add_listener(lambda timestamp, device_values: samples.append(timestamp))
+        controller = ConstantPowerController(250, max_voltage=20000, current_limit=200)
+        job = ControlLoopJob(self.device, controller, SafetyEnvelope(20000, 200), duration=0.1,
+                             acquisition=acquisition)
+        job.start()
+        self.assertTrue(job.join(5), 'Control loop should finish')
+        self.assertEqual(job.result()['iterations'] + 1, len(samples), 'Every reading should be published')
+        self.assertFalse(acquisition.paused(), 'Acquisition should be resumed')
+
+    def test_loop_should_stop_when_output_is_off(self):
+        self.device.set_output_on(False)
+        controller = ConstantPowerController(250, max_voltage=20000, current_limit=200)
+        job = ControlLoopJob(self.device, controller, SafetyEnvelope(20000, 200))
+        job.start()
+        self.assertTrue(job.join(5), 'Control loop should stop')
+        self.assertEqual(Job.FAILED, job.state(), 'Control loop should fail')
+        self.assertEqual(0, self.simulated_device.target_voltage, 'Nothing should be written')
+
+    def test_failed_loop_should_turn_output_off(self):
+        get_all_values = self.device.get_all_values
+        readings = [0]
+
+        def lost_after_some_readings():
+            readings[0] += 1
+            if readings[0] > 5:
+                raise PsControllerException("Device not responding")
+            return get_all_values()
+
+        self.device.get_all_values = lost_after_some_readings
+        controller = ConstantPowerController(250, max_voltage=20000, current_limit=200)
+        job = ControlLoopJob(self.device, controller, SafetyEnvelope(20000, 200))
+        job.start()
+        self.assertTrue(job.join(5), 'Control loop should stop')
+        self.assertEqual(Job.FAILED, job.state(), 'Control loop should fail')
+        self.assertFalse(self.simulated_device.output_is_on, 'Output should not be left on')
+
+    def test_envelope_above_device_limits_should_be_rejected(self):
+        self.assertRaises(ValueError, SafetyEnvelope, 20001, 200)
+        self.assertRaises(ValueError, SafetyEnvelope, 20000, 1001)
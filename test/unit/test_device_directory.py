@@ -0,0 +1,48 @@
+__author__ = 'mannsi'
+
+import collections
+import json
+import logging
+import unittest
+
+from ps_controller.connection.ConnectionFactory import ConnectionFactory
+from ps_controller.device.UsbDevice import UsbDevice
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_web_server.DeviceDirectory import DeviceDirectory
+from ps_web_server.PsWebWrapper import Wrapper
+from test.Mocks import MockLogger, create_simulated_device
+
+
+class TestDeviceDirectory(unittest.TestCase):
+    def setUp(self):
+        fast_device = create_simulated_device(SimulatedPs201())
+        # At 300 baud a single read takes about a second
+        slow_connection = ConnectionFactory(MockLogger()).create_simulated_connection(SimulatedPs201(), baudrate=300)
+        slow_device = UsbDevice(slow_connection, MockLogger())
+        slow_device.connect()
+        self.wrappers = collections.OrderedDict((
+            ("fast", Wrapper(logging.ERROR, device=fast_device)),
+            ("slow", Wrapper(logging.ERROR, device=slow_device))))
+        self.directory = DeviceDirectory(self.wrappers)
+
+    def test_slow_device_should_not_hold_up_snapshot(self):
+        snapshot = self.directory.get_snapshot(max_age=1.0, timeout=0.2)
+        self.assertTrue(snapshot['elapsed_ms'] < 600, 'Snapshot should be answered by the deadline')
+        self.assertIsNone(snapshot['devices']['fast']['error'], 'Fast device should be read')
+        self.assertEqual("device", snapshot['devices']['fast']['source'], 'Fast device should be read')
+        self.assertIsNotNone(snapshot['devices']['slow']['error'], 'Slow device should report the timeout')
+
+    def test_recent_background_sample_should_be_used(self):
+        self.wrappers["slow"]._acquisition._acquire()
+        snapshot = self.directory.get_snapshot(max_age=10.0, timeout=0.2)
+        self.assertEqual("cache", snapshot['devices']['slow']['source'], 'Background sample should be used')
+        self.assertIsNone(snapshot['devices']['slow']['error'], 'Cached device should not report an error')
+
+    def test_latest_values_json_should_be_made_once_per_sample(self):
+        wrapper = self.wrappers["fast"]
+        self.assertIsNone(wrapper.get_latest_values_json(max_age=10.0), 'No sample should give no values')
+        wrapper._acquisition._acquire()
+        values_json = wrapper.get_latest_values_json(max_age=10.0)
+        self.assertEqual(1, json.loads(values_json.decode())["connected"])
+        self.assertIs(values_json, wrapper.get_latest_values_json(max_age=10.0), 'JSON should be reused')
+        self.assertIsNone(wrapper.get_latest_values_json(max_age=-1.0), 'Old sample should not be used')
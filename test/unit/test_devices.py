@@ -0,0 +1,45 @@
+__author__ = 'mannsi'
+
+import unittest
+from unittest import mock
+
+from ps_controller.connection.ConnectionFactory import ConnectionFactory
+from ps_controller.device.DeviceFactory import DeviceFactory
+from test.Mocks import MockLogger
+
+
+class TestDeviceFactory(unittest.TestCase):
+    def test_simulated_devices_should_have_stable_ids_and_own_connections(self):
+        devices = DeviceFactory().get_devices("simulated", MockLogger(), simulated_count=3)
+        self.assertEqual(["sim0", "sim1", "sim2"], list(devices), 'Devices should have stable ids')
+
+        for device in devices.values():
+            self.assertTrue(device.connect(), 'Every device should connect')
+        devices["sim1"].set_target_voltage(3000)
+        self.assertEqual(3000, devices["sim1"].get_all_values().target_voltage, 'Device should be set')
+        self.assertEqual(0, devices["sim0"].get_all_values().target_voltage, 'Other devices should not be set')
+
+    def test_unknown_device_type_should_give_no_devices(self):
+        self.assertEqual(0, len(DeviceFactory().get_devices("unknown", MockLogger())), 'No devices expected')
+
+
+class _FoundConnection:
+    def connect(self):
+        return True
+
+    def disconnect(self):
+        pass
+
+
+class TestConnectionFactory(unittest.TestCase):
+    def test_ports_listed_as_tuples_should_be_discovered_by_serial_number(self):
+        # pyserial 2.7 lists ports as (port, description, hwid) tuples
+        ports = [("/dev/ttyUSB1", "PS201", "USB VID:PID=0403:6001 SNR=A900B1C2"),
+                 ("/dev/ttyUSB0", "PS201", "USB VID:PID=0403:6001 SER=A900B1C1 LOCATION=1-1"),
+                 ("/dev/ttyS0", "ttyS0", "n/a")]
+        factory = ConnectionFactory(MockLogger())
+        with mock.patch('serial.tools.list_ports.comports', return_value=ports), \
+                mock.patch.object(factory, 'create_usb_connection', return_value=_FoundConnection()):
+            discovered = factory.discover_usb_ports()
+        self.assertEqual([("ttyS0", "/dev/ttyS0"), ("A900B1C1", "/dev/ttyUSB0"), ("A900B1C2", "/dev/ttyUSB1")],
+                         list(discovered.items()), 'Ports should be identified by their USB serial number')
@@ -0,0 +1,52 @@
+__author__ = 'mannsi'
+
+import unittest
+
+import numpy
+
+from ps_controller.utilities import Downsampling
+
+
+class TestDownsampling(unittest.TestCase):
+    def setUp(self):
+        random = numpy.random.RandomState(0)
+        self.x = numpy.arange(10000, dtype=numpy.float64)
+        self.y = random.normal(0, 1, 10000)
+
+    def test_short_input_should_not_be_downsampled(self):
+        for method in (Downsampling.LTTB, Downsampling.MIN_MAX):
+            indices = Downsampling.downsample(self.x[:10], self.y[:10], 100, method)
+            self.assertEqual(list(range(10)), list(indices), 'Short input should be returned as is')
+
+    def test_lttb_should_keep_end_points_and_point_count(self):
+        indices = Downsampling.lttb(self.x, self.y, 100)
+        self.assertEqual(100, len(indices), 'LTTB should return exactly max_points points')
+        self.assertEqual(0, indices[0], 'LTTB should keep the first point')
+        self.assertEqual(len(self.x) - 1, indices[-1], 'LTTB should keep the last point')
+        self.assertTrue(numpy.all(numpy.diff(indices) > 0), 'LTTB indices should be increasing')
+
+    def test_lttb_should_keep_spike(self):
+        y = numpy.zeros(10000)
+        y[5003] = 100
+        indices = Downsampling.lttb(self.x, y, 50)
+        self.assertIn(5003, indices, 'LTTB should keep a single spike')
+
+    def test_min_max_should_keep_envelope(self):
+        indices = Downsampling.min_max(self.y, 200)
+        self.assertTrue(len(indices) <= 200, 'Min max should return at most max_points points')
+        self.assertIn(numpy.argmin(self.y), indices, 'Min max should keep the global minimum')
+        self.assertIn(numpy.argmax(self.y), indices, 'Min max should keep the global maximum')
+        for start, end in zip(range(0, 10000, 100), range(100, 10001, 100)):
+            bucket = [i for i in indices if start <= i < end]
+            self.assertEqual(self.y[start:end].max(), self.y[bucket].max(), 'Bucket maximum should be kept')
+            self.assertEqual(self.y[start:end].min(), self.y[bucket].min(), 'Bucket minimum should be kept')
+
+    def test_too_few_max_points_should_raise(self):
+        for max_points in (2, 1, 0, -1):
+            self.assertRaises(ValueError, Downsampling.lttb, self.x, self.y, max_points)
+        for max_points in (1, 0, -1):
+            self.assertRaises(ValueError, Downsampling.min_max, self.y, max_points)
+        self.assertEqual(2, len(Downsampling.min_max(self.y, 2)), 'Min max should keep one bucket envelope')
+
+    def test_unknown_method_should_raise(self):
+        self.assertRaises(ValueError, Downsampling.downsample, self.x, self.y, 100, "unknown")
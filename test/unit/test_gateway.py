@@ -0,0 +1,123 @@
+__author__ = 'mannsi'
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+import cherrypy
+
+from ps_web_server.GatewayServer import DeviceForwarder, GatewayServer
+from ps_web_server.Upstream import Upstream, UpstreamError
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TestGateway(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ports = [_free_port(), _free_port()]
+        cls.servers = [subprocess.Popen([sys.executable, "psControllerMain.py", "-s", "2", "-p", str(port)],
+                                        cwd=REPOSITORY_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                       for port in cls.ports]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.terminate()
+            server.wait()
+
+    def setUp(self):
+        self.dead_port = _free_port()
+        urls = ["http://127.0.0.1:{0}".format(port) for port in self.ports + [self.dead_port]]
+        self.gateway = GatewayServer(0, urls, False, poll_interval=0.05, timeout=0.5)
+        self.gateway.start_upstreams()
+        self.upstreams = ["127.0.0.1:{0}".format(port) for port in self.ports]
+        self.assertTrue(_wait_for(lambda: len(self.gateway.devices.get_snapshot(1.0)["devices"]) == 4),
+                        'Gateway should get the devices of every server')
+
+    def tearDown(self):
+        self.gateway.stop_upstreams()
+
+    def test_snapshot_should_combine_servers_and_report_failed_server(self):
+        snapshot = self.gateway.devices.get_snapshot(max_age=1.0)
+        expected_ids = [upstream + "/" + device_id for upstream in self.upstreams for device_id in ("sim0", "sim1")]
+        self.assertEqual(expected_ids, list(snapshot["devices"]), 'Devices of every server should be served')
+        for entry in snapshot["devices"].values():
+            self.assertIsNone(entry["error"], 'Devices of running servers should have no error')
+        for upstream in self.upstreams:
+            self.assertIsNotNone(snapshot["upstreams"][upstream]["latency_ms"]["mean"], 'Latency should be reported')
+        dead_status = snapshot["upstreams"]["127.0.0.1:{0}".format(self.dead_port)]
+        self.assertEqual(0, dead_status["connected"], 'Failed server should be reported')
+        self.assertIsNotNone(dead_status["error"], 'Failed server should be reported')
+
+    def test_write_should_reach_server_of_device(self):
+        upstream = self.gateway._upstreams[self.upstreams[1]]
+        status, content_type, body = upstream.forward("POST", "/devices/sim1/voltage", {"target_voltage_V": "3.5"})
+        self.assertEqual(200, status, 'Write should be forwarded')
+        status, content_type, body = upstream.forward("GET", "/devices/sim1/all_values", {})
+        self.assertEqual(3.5, json.loads(body.decode())["target_voltage_V"], 'Device should be set')
+
+        device_id = self.upstreams[1] + "/sim1"
+        self.assertTrue(_wait_for(
+            lambda: self.gateway.devices.get_snapshot(1.0)["devices"][device_id]["target_voltage_V"] == 3.5, 5.0),
+            'Gateway snapshot should catch up with the write')
+        other_device = self.gateway.devices.get_snapshot(1.0)["devices"][self.upstreams[0] + "/sim1"]
+        self.assertEqual(0, other_device["target_voltage_V"], 'Devices of other servers should not be set')
+
+    def test_forward_should_end_endless_response_at_deadline_without_blocking_others(self):
+        upstream = Upstream("http://127.0.0.1:{0}".format(self.ports[0]), timeout=0.5, forward_connections=2,
+                            forward_deadline=1.0)
+        errors = []
+
+        def forward_stream():
+            try:
+                upstream.forward("GET", "/devices/sim0/sample_stream", {"batch_interval": 0.05})
+            except UpstreamError as e:
+                errors.append(e)
+        stream_thread = threading.Thread(target=forward_stream)
+        start_time = time.monotonic()
+        stream_thread.start()
+        try:
+            time.sleep(0.2)
+            status, content_type, body = upstream.forward("GET", "/devices/sim0/voltage", {})
+            self.assertEqual(200, status, 'Other requests should not wait for the endless response')
+            self.assertLess(time.monotonic() - start_time, 1.0, 'Other requests should not wait for the deadline')
+            stream_thread.join(5.0)
+            self.assertFalse(stream_thread.is_alive(), 'Endless response should end at the deadline')
+            self.assertEqual(1, len(errors), 'Endless response should fail')
+            self.assertLess(time.monotonic() - start_time, 2.0, 'Endless response should end at the deadline')
+        finally:
+            stream_thread.join()
+            upstream.stop()
+
+    def test_streaming_routes_should_not_be_forwarded(self):
+        upstream = self.gateway._upstreams[self.upstreams[1]]
+        forwarder = DeviceForwarder(upstream, "sim1")
+        for route in DeviceForwarder.STREAMING_ROUTES:
+            start_time = time.monotonic()
+            with self.assertRaises(cherrypy.HTTPError) as context:
+                forwarder.default(route)
+            self.assertEqual(501, context.exception.status, 'Streaming route should be rejected')
+            self.assertLess(time.monotonic() - start_time, 0.5, 'Streaming route should be rejected right away')
+        status, content_type, body = upstream.forward("GET", "/devices/sim1/voltage", {})
+        self.assertEqual(200, status, 'Other routes should still be forwarded')
@@ -0,0 +1,41 @@
+__author__ = 'mannsi'
+
+import unittest
+
+from ps_controller.device import UsbDevice
+from ps_controller.metrics.Metrics import Counter, Histogram, Registry
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from test.Mocks import create_simulated_device
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_should_render_cumulative_buckets(self):
+        registry = Registry()
+        histogram = Histogram("latency_seconds", "Latency", ("command",), buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.labels("WRT").observe(value)
+        lines = registry.render().splitlines()
+        self.assertEqual("# TYPE latency_seconds histogram", lines[1], 'Type should be rendered')
+        self.assertEqual(['latency_seconds_bucket{command="WRT",le="0.1"} 1',
+                          'latency_seconds_bucket{command="WRT",le="1.0"} 3',
+                          'latency_seconds_bucket{command="WRT",le="+Inf"} 4',
+                          'latency_seconds_count{command="WRT"} 4',
+                          'latency_seconds_sum{command="WRT"} 4.05'], lines[2:], 'Buckets should be cumulative')
+
+    def test_names_should_be_unique(self):
+        registry = Registry()
+        Counter("requests_total", "Requests", registry=registry)
+        with self.assertRaises(ValueError):
+            Counter("requests_total", "Requests", registry=registry)
+
+    def test_device_transactions_should_be_measured(self):
+        device = create_simulated_device(SimulatedPs201())
+        transactions = UsbDevice.TRANSACTION_SECONDS.labels("WRT").count
+        acknowledgements = UsbDevice.ACKNOWLEDGEMENTS.labels("ack").value
+        sent_bytes = UsbDevice.BYTES_SENT.value
+        device.get_all_values()
+        self.assertEqual(transactions + 1, UsbDevice.TRANSACTION_SECONDS.labels("WRT").count,
+                         'Transaction should be measured')
+        self.assertEqual(acknowledgements + 1, UsbDevice.ACKNOWLEDGEMENTS.labels("ack").value,
+                         'Acknowledgement should be counted')
+        self.assertTrue(UsbDevice.BYTES_SENT.value > sent_bytes, 'Sent bytes should be counted')
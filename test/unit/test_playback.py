@@ -0,0 +1,47 @@
+__author__ = 'mannsi'
+
+import unittest
+
+from ps_controller.jobs import Job
+from ps_controller.jobs.Playback import PlaybackJob, create_profile
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from test.Mocks import create_simulated_device
+
+
+class TestPlayback(unittest.TestCase):
+    def setUp(self):
+        self.simulated_device = SimulatedPs201()
+        self.device = create_simulated_device(self.simulated_device)
+
+    def test_profile_should_end_on_last_point(self):
+        job = PlaybackJob(self.device, [0, 0.02, 0.04, 0.06], [1000, 2000, 3000, 4000], [100, 100, 200, 200])
+        job.start()
+        self.assertTrue(job.join(5), 'Playback should finish')
+        self.assertEqual(Job.FINISHED, job.state(), 'Playback should succeed')
+        self.assertEqual(4000, self.simulated_device.target_voltage, 'Last voltage should be set')
+        self.assertEqual(200, self.simulated_device.target_current, 'Last current should be set')
+        self.assertEqual(6, job.result()['writes'], 'Unchanged targets should not be written')
+
+    def test_points_that_can_not_be_met_should_be_merged(self):
+        job = PlaybackJob(self.device, [0] * 50 + [0.05], list(range(1000, 1051)), [100] * 51)
+        job.start()
+        self.assertTrue(job.join(5), 'Playback should finish')
+        result = job.result()
+        self.assertEqual(49, result['skipped_points'], 'Points due at the same time should be merged')
+        self.assertEqual(2, result['played_points'], 'Merged and last point should be played')
+        self.assertEqual(1050, self.simulated_device.target_voltage, 'Last voltage should be set')
+
+    def test_repeated_profile_should_keep_timing_statistics_bounded(self):
+        job = PlaybackJob(self.device, [0, 0.001], [1000, 2000], [100, 100], repeat=200, recent_errors=10)
+        job.start()
+        self.assertTrue(job.join(10), 'Playback should finish')
+        result = job.status()['result']
+        self.assertEqual(400, result['played_points'] + result['skipped_points'], 'Every point should be counted')
+        self.assertEqual(10, result['timing_error_p95_points'], 'The percentile should cover the latest points only')
+        self.assertLessEqual(result['timing_error_abs_mean_ms'], result['timing_error_max_ms'])
+        self.assertLessEqual(result['timing_error_p95_ms'], result['timing_error_max_ms'])
+
+    def test_invalid_profile_should_raise(self):
+        self.assertRaises(ValueError, create_profile, [1, 0], [1000, 1000], [10, 10])
+        self.assertRaises(ValueError, create_profile, [0, 1], [1000], [10, 10])
+        self.assertRaises(ValueError, create_profile, [], [], [])
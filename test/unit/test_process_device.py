@@ -0,0 +1,69 @@
+__author__ = 'mannsi'
+
+import time
+import unittest
+
+from ps_controller.acquisition.RingAcquisitionLoop import RingAcquisitionLoop
+from ps_controller.acquisition.SharedSampleRing import SharedSampleRing
+from ps_controller.device.ProcessDevice import ProcessDevice
+from test.Mocks import MockLogger, create_device_values
+
+
+class TestSharedSampleRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedSampleRing(capacity=8)
+        self.reader = SharedSampleRing(name=self.ring.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.ring.close()
+
+    def test_reader_should_see_samples_of_writer(self):
+        self.assertEqual((None, None), self.reader.latest(), 'Empty ring has no latest sample')
+        for i in range(5):
+            self.ring.add(float(i), create_device_values(i * 100, output_is_on=True))
+        timestamp, device_values = self.reader.latest()
+        self.assertEqual(4.0, timestamp, 'Latest timestamp should be read')
+        self.assertEqual(400, device_values.output_voltage, 'Latest values should be read')
+        self.assertTrue(device_values.output_is_on, 'Latest values should be read')
+
+    def test_read_since_should_return_new_samples_that_are_still_in_ring(self):
+        for i in range(3):
+            self.ring.add(float(i), create_device_values(i, output_is_on=True))
+        slots, count = self.reader.read_since(0)
+        self.assertEqual([0.0, 1.0, 2.0], slots['timestamp'].tolist(), 'All samples should be read')
+        for i in range(3, 20):
+            self.ring.add(float(i), create_device_values(i, output_is_on=True))
+        slots, count = self.reader.read_since(count)
+        self.assertEqual(20, count, 'Count should include all samples')
+        self.assertEqual(list(range(13, 20)), slots['timestamp'].astype(int).tolist(),
+                         'Overwritten samples should be skipped')
+
+
+class TestProcessDevice(unittest.TestCase):
+    def setUp(self):
+        self.device = ProcessDevice("simulated", sample_interval=0.05)
+
+    def tearDown(self):
+        self.device.stop()
+
+    def test_commands_should_run_in_worker(self):
+        self.assertTrue(self.device.connect(), 'Worker device should connect')
+        self.device.set_target_voltage(3000)
+        self.device.set_output_on(True, high_priority=True)
+        device_values = self.device.get_all_values()
+        self.assertEqual(3000, device_values.target_voltage, 'Target should be set in worker')
+        self.assertTrue(device_values.output_is_on, 'Output should be turned on in worker')
+
+    def test_worker_samples_should_reach_listeners(self):
+        acquisition = RingAcquisitionLoop(self.device, MockLogger())
+        samples = []
+        acquisition.add_listener(lambda timestamp, device_values: samples.append(timestamp))
+        acquisition.start()
+        self.device.connect()
+        deadline = time.monotonic() + 10
+        while len(samples) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        acquisition.stop()
+        self.assertTrue(len(samples) >= 3, 'Samples of the worker should be published')
+        self.assertEqual(sorted(samples), samples, 'Samples should keep the worker timestamps in order')
@@ -0,0 +1,51 @@
+__author__ = 'mannsi'
+
+import threading
+import unittest
+
+import cherrypy
+
+from ps_controller.tracing.SamplingProfiler import SamplingProfiler, format_collapsed
+from ps_web_server.DebugApi import DebugApi
+
+
+def _busy_loop(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_stacks_of_other_threads_should_be_sampled(self):
+        stop_event = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop_event,), name="busy worker")
+        worker.start()
+        try:
+            stacks = SamplingProfiler(interval=0.005).run(0.2, (threading.get_ident(),))
+        finally:
+            stop_event.set()
+            worker.join()
+        busy_stacks = [stack for stack in stacks if stack.startswith("busy_worker;")]
+        self.assertTrue(busy_stacks, 'Worker thread should be sampled')
+        self.assertTrue(all(stack.split(";")[-1] == "test_profiler.py:_busy_loop" for stack in busy_stacks),
+                        'Stacks should end with the innermost function')
+        self.assertFalse([stack for stack in stacks if "SamplingProfiler" in stack.split(";")[0]],
+                         'Profiler should not sample itself')
+        line = format_collapsed(stacks).splitlines()[0]
+        self.assertTrue(line.rsplit(" ", 1)[1].isdigit(), 'Lines should end with the sample count')
+
+    def test_profile_should_need_profiling_and_run_once_at_a_time(self):
+        with self.assertRaises(cherrypy.HTTPError):
+            DebugApi().profile(seconds="0.1")
+
+        debug_api = DebugApi(profiling=True)
+        first_profile = threading.Thread(target=debug_api.profile, kwargs={"seconds": "0.5"})
+        first_profile.start()
+        try:
+            while not debug_api._profile_lock.locked():
+                pass
+            with self.assertRaises(cherrypy.HTTPError) as context:
+                debug_api.profile(seconds="0.1")
+            self.assertEqual(409, context.exception.status, 'Second profile should be refused')
+        finally:
+            first_profile.join()
+        self.assertIsInstance(debug_api.profile(seconds="0.05"), str, 'Profile should be taken after the first')
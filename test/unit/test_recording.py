@@ -0,0 +1,151 @@
+__author__ = 'mannsi'
+
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy
+
+from ps_controller.recording import Export
+from ps_controller.recording import Rollup
+from ps_controller.recording.Recorder import Recorder
+from ps_controller.recording.RecordingReader import RecordingReader
+from test.Mocks import MockLogger, create_device_values
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_recorded_samples_should_be_read_back(self):
+        recorder = Recorder(self.directory, MockLogger(), segment_records=100)
+        recorder.start()
+        for i in range(250):
+            recorder.add(1000.0 + i, create_device_values(i, i / 10, output_is_on=True))
+        recorder.stop()
+
+        reader = RecordingReader(self.directory)
+        self.assertEqual([1, 2, 3], reader.segment_numbers(), 'Samples should be split into three segments')
+        records = reader.read_all()
+        self.assertEqual(250, len(records), 'All samples should be recorded')
+        self.assertEqual(1249.0, records['timestamp'][-1], 'Timestamps should be recorded in order')
+        self.assertEqual(24.9, round(float(records['output_current'][-1]), 3), 'Values should be recorded')
+        self.assertTrue(records['output_is_on'].all(), 'Output on flag should be recorded')
+
+    def test_stop_should_not_hang_when_writer_has_died(self):
+        recorder = Recorder(self.directory, MockLogger(), queue_size=2, stop_timeout=1.0)
+        recorder.start()
+        garbled = create_device_values(1000, 100, output_is_on=True)
+        garbled.output_voltage = "garbled"
+        # Not an OSError, so the writer thread dies
+        recorder.add(1.0, garbled)
+        time.sleep(0.2)
+        for i in range(5):
+            recorder.add(2.0 + i, create_device_values(1000, 100, output_is_on=True))
+        start = time.monotonic()
+        recorder.stop()
+        self.assertLess(time.monotonic() - start, 1.0, 'Stop should not wait on the full queue of a dead writer')
+
+    def test_segment_being_written_should_be_readable(self):
+        recorder = Recorder(self.directory, MockLogger())
+        recorder.start()
+        for i in range(10):
+            recorder.add(1000.0 + i, create_device_values(i, i / 10, output_is_on=True))
+        reader = RecordingReader(self.directory)
+        deadline = time.time() + 5
+        while time.time() < deadline and recorder.written_count() < 10:
+            time.sleep(0.01)
+        self.assertEqual(10, len(reader.open_segment(1)), 'Written samples should be readable before stopping')
+        recorder.stop()
+
+    def test_restarted_recorder_should_not_modify_old_segments(self):
+        for run in range(2):
+            recorder = Recorder(self.directory, MockLogger())
+            recorder.start()
+            recorder.add(float(run), create_device_values(run, run / 10, output_is_on=True))
+            recorder.stop()
+        reader = RecordingReader(self.directory)
+        self.assertEqual([1, 2], reader.segment_numbers(), 'Every run should start a new segment')
+        self.assertEqual([0.0, 1.0], list(reader.read_all()['timestamp']), 'Both runs should be readable')
+
+    def test_range_query_should_match_linear_scan(self):
+        recorder = Recorder(self.directory, MockLogger(), segment_records=100, index_interval=8)
+        recorder.start()
+        for i in range(350):
+            recorder.add(1000.0 + i * 0.5, create_device_values(i, i / 10, output_is_on=True))
+        recorder.stop()
+
+        reader = RecordingReader(self.directory)
+        timestamps = list(reader.read_all()['timestamp'])
+        for start, end in ((None, None), (900.0, 1010.0), (1020.0, 1020.0), (1049.75, 1050.25),
+                           (1030.3, 1120.0), (1170.0, None), (2000.0, 3000.0)):
+            expected = [t for t in timestamps if (start is None or t >= start) and (end is None or t <= end)]
+            self.assertEqual(expected, list(reader.read_range(start, end)['timestamp']),
+                             'Range query should return the same as a linear scan')
+
+    def test_incremental_rollups_should_match_rebuilt_rollups(self):
+        recorder = Recorder(self.directory, MockLogger())
+        recorder.start()
+        for i in range(500):
+            output_voltage = (i * 37) % 101
+            recorder.add(7190.0 + i * 0.3, create_device_values(output_voltage, output_voltage / 10, output_is_on=True))
+        recorder.stop()
+
+        reader = RecordingReader(self.directory)
+        incremental = dict((level, reader.read_rollup(level).copy()) for level in Rollup.LEVELS)
+        reader.rebuild_rollups()
+        for level in Rollup.LEVELS:
+            rebuilt = reader.read_rollup(level)
+            self.assertEqual(incremental[level].tolist(), rebuilt.tolist(),
+                             'Incremental and rebuilt rollups should be equal')
+        self.assertEqual(500, reader.read_rollup(3600)['count'].sum(), 'Every sample should be in a bucket')
+        self.assertEqual(150, len(reader.read_rollup(1)), 'Samples should fill 150 one second buckets')
+        self.assertEqual(2, len(reader.read_rollup(60, 7230.0, 7290.0)), 'Range should include partial bucket')
+
+    def test_restarted_recorder_should_continue_open_buckets(self):
+        for part in range(3):
+            recorder = Recorder(self.directory, MockLogger())
+            recorder.start()
+            for i in range(part * 100, part * 100 + 100):
+                output_voltage = (i * 37) % 101
+                recorder.add(7190.0 + i * 0.3,
+                             create_device_values(output_voltage, output_voltage / 10, output_is_on=True))
+            recorder.stop()
+
+        reader = RecordingReader(self.directory)
+        incremental = dict((level, reader.read_rollup(level).copy()) for level in Rollup.LEVELS)
+        reader.rebuild_rollups()
+        for level in Rollup.LEVELS:
+            rebuilt = reader.read_rollup(level)
+            self.assertEqual(rebuilt['bucket_start'].tolist(), incremental[level]['bucket_start'].tolist(),
+                             'A restart should not add a second row for the open bucket')
+            self.assertEqual(rebuilt['count'].tolist(), incremental[level]['count'].tolist())
+            for name in ('output_voltage_mean', 'output_current_mean'):
+                numpy.testing.assert_allclose(rebuilt[name], incremental[level][name])
+            for name in ('output_voltage_min', 'output_voltage_max', 'target_voltage'):
+                self.assertEqual(rebuilt[name].tolist(), incremental[level][name].tolist())
+
+    def test_coarsest_sufficient_rollup_level_should_be_chosen(self):
+        self.assertEqual(None, Rollup.choose_level(0.5), 'Sub second resolution needs raw samples')
+        self.assertEqual(1, Rollup.choose_level(59), 'One second buckets are the coarsest below a minute')
+        self.assertEqual(3600, Rollup.choose_level(86400), 'Hour buckets are the coarsest level')
+
+    def test_export_should_stream_one_chunk_per_batch(self):
+        recorder = Recorder(self.directory, MockLogger())
+        recorder.start()
+        for i in range(25):
+            recorder.add(1000.0 + i, create_device_values(i, i / 10, output_is_on=True))
+        recorder.stop()
+
+        reader = RecordingReader(self.directory)
+        chunks = list(Export.encode(Export.CSV, reader.iter_range(1005.0, 1014.0, batch_size=4)))
+        self.assertEqual(4, len(chunks), 'Header and three batches should be encoded separately')
+        lines = b''.join(chunks).decode('ascii').splitlines()
+        self.assertEqual('timestamp', lines[0].split(',')[0], 'First line should be the header')
+        self.assertEqual(11, len(lines), 'Header and ten samples should be exported')
+        self.assertEqual(['1005.000000', '5', '0.5'], lines[1].split(',')[:3], 'Values should be exported')
+        self.assertRaises(ValueError, Export.encode, 'xml', [])
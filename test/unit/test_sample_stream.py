@@ -0,0 +1,51 @@
+__author__ = 'mannsi'
+
+import io
+import logging
+import unittest
+
+from ps_controller.recording import SampleStream
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_web_server.DeviceApi import DeviceApi
+from ps_web_server.PsWebWrapper import Wrapper
+from test.Mocks import create_device_values, create_simulated_device
+
+
+class TestSampleStream(unittest.TestCase):
+    def test_batches_should_decode_to_frames(self):
+        stream = io.BytesIO(SampleStream.create_header() +
+                            SampleStream.encode_frame([(1.5, create_device_values(4999, 12, 5000, 100, True)),
+                                                       (1.6, create_device_values(5001, 12, 5000, 100, False))]) +
+                            SampleStream.encode_frame([]) +
+                            SampleStream.encode_frame([(1.7, create_device_values(5002, 12, 5000, 100, True))]))
+        batches = list(SampleStream.read_batches(stream))
+        self.assertEqual([2, 1], [len(batch) for batch in batches], 'Empty frames should be skipped')
+        self.assertEqual(SampleStream.RECORD_DTYPE, batches[0].dtype, 'Schema should give the record dtype')
+        self.assertEqual([1.5, 1.6], batches[0]['timestamp'].tolist())
+        self.assertEqual([4999, 5001], batches[0]['output_voltage'].tolist())
+        self.assertEqual([SampleStream.FLAG_OUTPUT_ON, 0], batches[0]['flags'].tolist())
+        self.assertEqual(100, batches[1]['target_current'][0])
+
+    def test_other_data_should_be_rejected(self):
+        with self.assertRaises(ValueError):
+            list(SampleStream.read_batches(io.BytesIO(b'PSRECORD' + bytes(8))))
+        frame = SampleStream.encode_frame([(1.5, create_device_values(5000, 12, 5000, 100, True))])
+        truncated = SampleStream.create_header() + frame[:-1]
+        with self.assertRaises(ValueError):
+            list(SampleStream.read_batches(io.BytesIO(truncated)))
+
+    def test_route_should_stream_background_samples(self):
+        wrapper = Wrapper(logging.ERROR, sample_interval=0.02, device=create_simulated_device(SimulatedPs201()))
+        wrapper.start_acquisition()
+        try:
+            chunks = DeviceApi(wrapper).sample_stream(seconds='0.5', batch_interval='0.1')
+            batches = list(SampleStream.read_batches(io.BytesIO(b''.join(chunks))))
+        finally:
+            wrapper.stop_acquisition()
+        timestamps = [timestamp for batch in batches for timestamp in batch['timestamp']]
+        self.assertGreater(len(timestamps), 2, 'Samples acquired while streaming should be sent')
+        self.assertEqual(sorted(set(timestamps)), timestamps, 'Every sample should be sent once and in order')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+__author__ = 'mannsi'
+
+import unittest
+
+import numpy
+
+from ps_controller.acquisition.Statistics import RunningStatistics, SampleStatistics, StatisticsWindows, TOTAL
+from test.Mocks import create_device_values
+
+
+class TestStatistics(unittest.TestCase):
+    def test_running_statistics_should_match_numpy(self):
+        values = numpy.random.RandomState(1).normal(1000.0, 25.0, 5000)
+        statistics = RunningStatistics()
+        for value in values:
+            statistics.add(value)
+        result = statistics.to_dict()
+        self.assertAlmostEqual(values.mean(), result['mean'], places=6, msg='Mean should match')
+        self.assertAlmostEqual(values.std(), result['ripple_rms'], places=6, msg='Deviation should match')
+        self.assertEqual(values.max() - values.min(), result['ripple'], 'Ripple should be the peak to peak range')
+
+    def test_charge_and_energy_should_integrate_over_real_timestamps(self):
+        statistics = SampleStatistics()
+        # 5 V and 100 mA for an hour, sampled irregularly
+        timestamps = numpy.cumsum(numpy.random.RandomState(2).uniform(0.01, 2.0, 5000))
+        timestamps = timestamps * 3600.0 / timestamps[-1]
+        for timestamp in timestamps:
+            statistics.add(timestamp, create_device_values(5000, 100))
+        result = statistics.to_dict()
+        duration = timestamps[-1] - timestamps[0]
+        self.assertAlmostEqual(100 * duration / 3600, result['charge_mAh'], places=6, msg='Charge should match')
+        self.assertAlmostEqual(0.5 * duration / 3600, result['energy_Wh'], places=6, msg='Energy should match')
+
+    def test_long_gaps_should_not_be_integrated(self):
+        statistics = SampleStatistics(max_gap=5.0)
+        for timestamp in (0.0, 1.0, 100.0, 101.0):
+            statistics.add(timestamp, create_device_values(1000, 3600))
+        result = statistics.to_dict()
+        self.assertEqual(1, result['gaps'], 'Gap should be counted')
+        self.assertAlmostEqual(2.0, result['charge_mAh'], msg='Only the two one second intervals should count')
+
+    def test_reset_window_should_start_over(self):
+        windows = StatisticsWindows()
+        windows.add(0.0, create_device_values(1000, 10))
+        windows.reset("run")
+        windows.add(1.0, create_device_values(2000, 20))
+        result = windows.to_dict()
+        self.assertEqual(2, result[TOTAL]['samples'], 'Total window should keep all samples')
+        self.assertEqual(1, result['run']['samples'], 'Reset window should only have later samples')
+        self.assertTrue(windows.remove("run"), 'Window should be removed')
@@ -0,0 +1,52 @@
+__author__ = 'mannsi'
+
+import unittest
+
+from ps_controller.jobs import Job
+from ps_controller.jobs.Sweep import SweepJob
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from test.Mocks import create_simulated_device
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.simulated_device = SimulatedPs201(load_resistance=100.0, time_constant=0.01)
+        self.device = create_simulated_device(self.simulated_device)
+        self.device.set_output_on(True)
+
+    def test_sweep_should_record_settled_output_of_every_point(self):
+        set_points = [(1000, 500), (2000, 500), (5000, 10)]
+        job = SweepJob(self.device, set_points, voltage_tolerance=5, current_tolerance=1, read_interval=0.005)
+        job.start()
+        self.assertTrue(job.join(10), 'Sweep should finish')
+        self.assertEqual(Job.FINISHED, job.state(), 'Sweep should succeed')
+
+        results = job.results()
+        self.assertEqual(3, len(results), 'Every set point should be recorded')
+        self.assertTrue(results['settled'].all(), 'Every set point should settle')
+        self.assertAlmostEqual(2000, results['output_voltage'][1], delta=10, msg='Output should reach target')
+        self.assertAlmostEqual(10, results['output_current'][2], delta=1, msg='Output should be current limited')
+
+    def test_cancelled_sweep_should_stop(self):
+        job = SweepJob(self.device, [(1000, 500)] * 1000, read_interval=0.005)
+        job.start()
+        job.cancel()
+        self.assertTrue(job.join(5), 'Cancelled sweep should stop')
+        self.assertEqual(Job.CANCELLED, job.state(), 'Sweep should be cancelled')
+        self.assertTrue(len(job.results()) < 1000, 'Remaining points should be skipped')
+
+    def test_set_points_that_are_not_pairs_should_be_rejected(self):
+        for set_points in ({"a": 1}, 5, [1000, 500, 2000], [[1000, 500, 1]], [], [[1000, 500], [2000]]):
+            with self.assertRaises((TypeError, ValueError), msg=repr(set_points)):
+                SweepJob(self.device, set_points)
+        with self.assertRaises(ValueError):
+            SweepJob(self.device, [(1000, 500)], settle_count=0)
+
+    def test_point_without_readings_should_be_recorded_as_not_settled(self):
+        self.device.get_all_values = lambda: None
+        job = SweepJob(self.device, [(1000, 500)], settle_timeout=0.05, read_interval=0.005)
+        job.start()
+        self.assertTrue(job.join(5), 'Sweep should finish')
+        self.assertEqual(Job.FINISHED, job.state(), 'Sweep should succeed')
+        self.assertEqual([False], job.results()['settled'].tolist())
+        self.assertEqual([0], job.results()['readings'].tolist())
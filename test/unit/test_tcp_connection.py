@@ -0,0 +1,57 @@
+__author__ = 'mannsi'
+
+import socket
+import unittest
+
+from ps_controller import PsControllerException
+from ps_controller.connection.SerialTcpBridge import SerialTcpBridge
+from ps_controller.device.DeviceFactory import DeviceFactory
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_controller.simulation.SimulatedSerialLink import SimulatedSerialLink
+from test.Mocks import MockLogger
+
+
+class TestTcpConnection(unittest.TestCase):
+    def setUp(self):
+        self.simulated_device = SimulatedPs201()
+        self.bridge = SerialTcpBridge(SimulatedSerialLink(self.simulated_device, baudrate=None, timeout=0.005),
+                                      MockLogger(), host="127.0.0.1", port=0)
+        self.bridge.start()
+        self.address = "127.0.0.1:{0}".format(self.bridge.address()[1])
+
+    def tearDown(self):
+        self.bridge.stop()
+
+    def test_device_should_be_controlled_through_bridge(self):
+        devices = DeviceFactory().get_devices("tcp", MockLogger(), addresses=[self.address])
+        self.assertEqual([self.address], list(devices), 'Bridge address should be the device id')
+        device = devices[self.address]
+        self.assertTrue(device.connect(), 'Device should connect through the bridge')
+        device.set_target_voltage(3000)
+        device.set_output_on(True)
+        device_values = device.get_all_values()
+        self.assertEqual(3000, device_values.target_voltage, 'Target should be set through the bridge')
+        self.assertTrue(device_values.output_is_on, 'Output should be turned on through the bridge')
+        device.disconnect()
+
+    def test_connection_should_reconnect_after_losing_bridge_client(self):
+        device = DeviceFactory().create_device("tcp", MockLogger(), self.address)
+        self.assertTrue(device.connect(), 'Device should connect through the bridge')
+        self.bridge._close_client()
+        with self.assertRaises(PsControllerException):
+            device.get_all_values()
+        self.assertFalse(device.connected(), 'Lost connection should be noticed')
+        self.assertTrue(device.connect(), 'Device should connect again')
+        self.assertEqual(0, device.get_all_values().target_voltage, 'Device should answer after reconnecting')
+
+    def test_connect_should_fail_without_bridge(self):
+        unused = socket.socket()
+        unused.bind(("127.0.0.1", 0))
+        address = "127.0.0.1:{0}".format(unused.getsockname()[1])
+        unused.close()
+        device = DeviceFactory().create_device("tcp", MockLogger(), address)
+        self.assertFalse(device.connect(), 'Connecting without a bridge should fail')
+
+    def test_tcp_device_should_need_address(self):
+        with self.assertRaises(ValueError):
+            DeviceFactory().create_device("tcp", MockLogger())
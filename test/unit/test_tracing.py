@@ -0,0 +1,44 @@
+__author__ = 'mannsi'
+
+import unittest
+
+from ps_controller.simulation.SimulatedPs201 import SimulatedPs201
+from ps_controller.tracing import Tracing
+from ps_controller.tracing.TraceBuffer import TraceBuffer
+from test.Mocks import create_simulated_device
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.device = create_simulated_device(SimulatedPs201())
+        self.buffer = TraceBuffer(capacity=10)
+        Tracing.add_hook(self.buffer)
+
+    def tearDown(self):
+        Tracing.remove_hook(self.buffer)
+
+    def test_transaction_should_be_traced_by_phase(self):
+        self.device.get_all_values()
+        trace = self.buffer.slowest(1, "WRT")[0].to_dict()
+        self.assertIsNone(trace['error'], 'Transaction should succeed')
+        span_names = [span['name'] for span in trace['spans']]
+        device_spans = [name for name in span_names if not name.startswith("connection.")]
+        self.assertEqual(["lock_wait", "encode", "write", "acknowledge", "verify_acknowledge", "response",
+                          "verify_response"], device_spans,
+                         'Every phase should have a span')
+        self.assertEqual(2, span_names.count("connection.first_byte"), 'Reads of the connection should be traced')
+        phases_ms = sum(span['duration_ms'] for span in trace['spans'] if span['name'] in device_spans)
+        self.assertTrue(phases_ms > 0.9 * trace['duration_ms'], 'Phases should cover the transaction')
+
+    def test_ring_buffer_should_keep_recent_traces_slowest_first(self):
+        for i in range(15):
+            self.device.set_target_voltage(i * 100)
+        self.assertEqual(10, len(self.buffer), 'Only the capacity should be kept')
+        durations = [trace.duration() for trace in self.buffer.slowest(5)]
+        self.assertEqual(sorted(durations, reverse=True), durations, 'Slowest traces should come first')
+
+    def test_nothing_should_be_traced_without_hook(self):
+        Tracing.remove_hook(self.buffer)
+        self.device.get_all_values()
+        self.assertEqual(0, len(self.buffer), 'Nothing should be traced')
+        self.assertIsNone(Tracing.current(), 'No trace should be left running')